@@ -1,90 +1,88 @@
 # Import the required libraries
-from zipfile import ZipFile
+import logging
 import pandas as pd
 import numpy as np
 import os
-import pickle
 import sys
-import plotly.express as px
-import plotly.graph_objects as go
-import fuzzywuzzy as fw
-from fuzzywuzzy import fuzz
+import functions_distance as dcf
+import functions_incremental as finc
+import functions_io as fio
+import functions_profiling as fp
+import functions_stage_cache as fsc
 
-# import seaborn as sns
-import openpyxl
+# the columns of the final dataset
+used_columns = dcf.USED_COLUMNS
 
-# from functions_cleaning import *
-import geopy
-from geopy import distance
-import statsmodels.formula.api as sm
-from scipy.stats import linregress
-import functions_distance as dcf
+np.set_printoptions(threshold=sys.maxsize)
 
 
-used_columns = [
-    "organization_location_name",
-    "advertiser_type_value",
-    "advertiser_type_label",
-    "posting_count",
-    "date",
-    "duration",
-    "via_intermediary",
-    "language",
-    "job_title",
-    "profession_value",
-    "profession_isco_code_value",
-    "profession_isco_code_label",
-    "location",
-    "location_name",
-    "region_value",
-    "region_label",
-    "education_level_value",
-    "education_level_label",
-    "contract_type_value",
-    "contract_type_label",
-    "working_hours_type_value",
-    "working_hours_type_label",
-    "hours_per_week_from",
-    "hours_per_week_to",
-    "salary",
-    "organization_industry_value",
-    "organization_industry_label",
-    "organization_size_value",
-    "organization_size_label",
-    "location_coordinates",
-    "organization_ID",
-    "contract_type_label_cluster",
-    "salary_dummy",
-    "Applicant_language_cluster",
-    "education_level_cluster",
-    "quarter_of_date",
-    "month_of_date",
-    "log_duration",
-    "Latitudal_coordinates_organization",
-    "Longitudinal_coordinates_organization",
-    "Fuzzy_Rating",
-    "latitudal_coordinates_job",
-    "longitudinal_coordinates_job",
-    "distance_between_job_and_organization",
-    "profession_isco_code_value_agg_1",
-    "profession_isco_code_value_agg_2",
-]
+# The pool of the fuzzy matching starts its workers with spawn on macOS and Windows, which
+# imports this script again in every worker. The guard keeps the workers from running it.
+if __name__ == "__main__":
+    # report the progress of the matching steps
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    # Paths for accessing files dynamically
+    sub_path = os.getcwd()
+    path_cwd = os.path.dirname(sub_path)
+    path_dta_cleaned = os.path.join(path_cwd, "Data_cleaned")
+    path_dta = os.path.join(path_cwd, "Data")
 
-np.set_printoptions(threshold=sys.maxsize)
-# Paths for accessing files dynamically
-sub_path = os.getcwd()
-path_cwd = os.path.dirname(sub_path)
-path_dta_cleaned = os.path.join(path_cwd, "Data_cleaned")
-path_dta = os.path.join(path_cwd, "Data")
+    # the final dataset is also exported to excel, which is slow for the full dataset
+    export_excel = False
+
+    # time, memory and dropped rows of every stage
+    stats = fp.PipelineStats(
+        log_path=os.path.join(path_dta_cleaned, "distance_stats.jsonl")
+    )
+
+    # the incremental mode computes the distances only for the postings added to the store
+    # of data_cleaning_script.py since the last run
+    incremental = False
+    path_store = os.path.join(path_dta_cleaned, "incremental_store")
+    cache_path = os.path.join(path_dta_cleaned, "city_names_match_cache.sqlite")
+
+    # with the stage cache, only the stages after the first changed input or parameter are
+    # computed again, e.g. only the last stages after a change of used_columns
+    use_stage_cache = False
+    path_stage_cache = os.path.join(path_dta_cleaned, "stage_cache")
 
-# read in the paths
-data = pd.DataFrame(pd.read_csv(path_dta_cleaned + "/vacancies_cleaned.csv"))
-city_gps_match_data = pd.DataFrame(pd.read_excel(path_dta + "/Cities_gps.xlsx"))
+    # read in the paths
+    city_gps_match_data = pd.DataFrame(pd.read_excel(path_dta + "/Cities_gps.xlsx"))
 
-data = dcf.create_distance_measures(
-    data=data, city_gps_match_data=city_gps_match_data, used_columns=used_columns
-)
-filepath = "/Users/luisenriquekaiser/Desktop/Inhalte/Uni_Bonn/Seminar/Project/Data_cleaned/dataset_final.xlsx"
-# if not os.path.exists(os.path.dirname(filepath)):
-#    os.makedirs(os.path.dirname(filepath))
-data[0].to_excel(filepath)
+    if incremental:
+        store = finc.IncrementalStore(path_store)
+        data = store.update_distances(
+            city_gps_match_data=city_gps_match_data,
+            used_columns=used_columns,
+            cache_path=cache_path,
+            workers=os.cpu_count(),
+            stats=stats,
+        )
+        store.save()
+    elif use_stage_cache:
+        data = fsc.cached_distance_measures(
+            cache=fsc.StageCache(path_stage_cache),
+            data=fio.read_dataset(path_dta_cleaned + "/vacancies_cleaned.parquet"),
+            city_gps_match_data=city_gps_match_data,
+            used_columns=used_columns,
+            cache_path=cache_path,
+            workers=os.cpu_count(),
+            stats=stats,
+        )
+    else:
+        data = fio.read_dataset(path_dta_cleaned + "/vacancies_cleaned.parquet")
+        data = dcf.create_distance_measures(
+            data=data,
+            city_gps_match_data=city_gps_match_data,
+            used_columns=used_columns,
+            cache_path=cache_path,
+            workers=os.cpu_count(),
+            stats=stats,
+        )
+    print(stats.to_frame())
+    filepath = "/Users/luisenriquekaiser/Desktop/Inhalte/Uni_Bonn/Seminar/Project/Data_cleaned/dataset_final.parquet"
+    # if not os.path.exists(os.path.dirname(filepath)):
+    #    os.makedirs(os.path.dirname(filepath))
+    fio.write_dataset(data=data[0], path=filepath)
+    if export_excel:
+        fio.write_dataset(data=data[0], path=os.path.splitext(filepath)[0] + ".xlsx")
@@ -0,0 +1,48 @@
+# The pipeline modules can be imported from the directory of the scripts, like the
+# notebooks and scripts do (import functions_cleaning as fc), or as a package from the
+# directory above (from Python_Scripts import functions_cleaning as fc).
+# The modules are imported on first use, so importing the package does not import
+# pandas, and the cleaning modules do not import the plotting or regression libraries.
+import importlib
+import os
+import sys
+
+# the modules import each other by their names, like in the directory of the scripts
+__directory = os.path.dirname(os.path.abspath(__file__))
+if __directory not in sys.path:
+    sys.path.append(__directory)
+
+MODULES = [
+    "functions_benchmark",
+    "functions_cleaning",
+    "functions_codes",
+    "functions_cube",
+    "functions_distance",
+    "functions_dtypes",
+    "functions_geodesic",
+    "functions_incremental",
+    "functions_io",
+    "functions_match_cache",
+    "functions_matching",
+    "functions_profiling",
+    "functions_regression",
+    "functions_robustness",
+    "functions_shared_memory",
+    "functions_spatial",
+    "functions_stage_cache",
+    "functions_statistics",
+    "functions_tiles",
+]
+
+
+def __getattr__(name):
+    # the same module objects as "import functions_cleaning", not a second copy
+    if name in MODULES:
+        module = importlib.import_module(name)
+        globals()[name] = module
+        return module
+    raise AttributeError("module " + __name__ + " has no attribute " + name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(MODULES))
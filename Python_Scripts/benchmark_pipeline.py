@@ -0,0 +1,50 @@
+# Benchmark of the cleaning and the distance computation on synthetic data.
+# Example: python benchmark_pipeline.py --rows 200000 --cities 5000 --output benchmark.json
+import argparse
+import json
+import functions_benchmark as fb
+import functions_distance as dcf
+
+# The pool of the fuzzy matching starts its workers with spawn on macOS and Windows, which
+# imports this script again in every worker. The guard keeps the workers from running it.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Times the steps of the pipeline on synthetic vacancies."
+    )
+    parser.add_argument("--rows", type=int, default=100000, help="number of vacancies")
+    parser.add_argument("--cities", type=int, default=2000, help="number of cities")
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the synthetic data"
+    )
+    parser.add_argument("--repeats", type=int, default=1, help="repetitions per step")
+    parser.add_argument("--workers", type=int, default=1, help="processes for matching")
+    parser.add_argument(
+        "--distance-method", default="vincenty", choices=["vincenty", "haversine"]
+    )
+    parser.add_argument("--output", default="benchmark.json", help="path of the report")
+    arguments = parser.parse_args()
+
+    report = fb.run_benchmark(
+        n_rows=arguments.rows,
+        n_cities=arguments.cities,
+        used_columns=dcf.USED_COLUMNS,
+        seed=arguments.seed,
+        repeats=arguments.repeats,
+        workers=arguments.workers,
+        distance_method=arguments.distance_method,
+    )
+    with open(arguments.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    # short summary of the report
+    for step in report["cleaning"]["steps"]:
+        print(f"{step['step']:<40}{step['seconds']:>10.3f} s")
+    print(
+        f"{'full_dataset_cleaning':<40}{report['cleaning']['full_dataset_cleaning']['seconds']:>10.3f} s"
+    )
+    for stage in report["distance"]["stages"]:
+        print(f"{stage['stage']:<40}{stage['seconds']:>10.3f} s")
+    print(
+        f"{'create_distance_measures':<40}{report['distance']['create_distance_measures']['seconds']:>10.3f} s"
+    )
+    print(f"{'end to end':<40}{report['end_to_end']['seconds']:>10.3f} s")
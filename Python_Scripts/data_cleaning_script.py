@@ -1,37 +1,87 @@
 # Import the required libraries
-from zipfile import ZipFile
 import pandas as pd
 import numpy as np
 import os
-import pickle
 import sys
-import plotly.express as px
-import plotly.graph_objects as go
-import fuzzywuzzy as fw
-from fuzzywuzzy import fuzz
-import openpyxl
-import geopy
-from geopy import distance
-import statsmodels.formula.api as sm
-import plotly.graph_objects as go
-from scipy.stats import linregress
 import functions_cleaning as fc
-
+import functions_incremental as finc
+import functions_io as fio
+import functions_profiling as fp
+import functions_stage_cache as fsc
 
 np.set_printoptions(threshold=sys.maxsize)
 
 
-# Paths for accessing files dynamically
-sub_path = os.getcwd()
-path_cwd = os.path.dirname(sub_path)
-path_dta = os.path.join(path_cwd, "Data")
-# read in the paths
-data = pd.DataFrame(pd.read_csv(path_dta + "/vacancies.csv"))
-data = fc.full_dataset_cleaning(dataset=data)
-filepath = "/Users/luisenriquekaiser/Desktop/Inhalte/Uni_Bonn/Seminar/Project/Data_cleaned/vacancies_cleaned.csv"
-# Check if the folder exists, create it if necessary
-if not os.path.exists(os.path.dirname(filepath)):
-    os.makedirs(os.path.dirname(filepath))
-
-# Save the data to the file
-data.to_csv(filepath)
+# The pool of parallel_dataset_cleaning starts its workers with spawn on macOS and Windows,
+# which imports this script again in every worker. The guard keeps the workers from running it.
+if __name__ == "__main__":
+    # Paths for accessing files dynamically
+    sub_path = os.getcwd()
+    path_cwd = os.path.dirname(sub_path)
+    path_dta = os.path.join(path_cwd, "Data")
+    # Check if the folder exists, create it if necessary
+    filepath = "/Users/luisenriquekaiser/Desktop/Inhalte/Uni_Bonn/Seminar/Project/Data_cleaned/vacancies_cleaned.parquet"
+    if not os.path.exists(os.path.dirname(filepath)):
+        os.makedirs(os.path.dirname(filepath))
+
+    # time, memory and dropped rows of every cleaning step
+    stats = fp.PipelineStats(
+        log_path=os.path.join(os.path.dirname(filepath), "cleaning_stats.jsonl")
+    )
+
+    # only the columns used by the cleaning and the distance computation are read, with
+    # explicit dtypes, so that pandas does not parse and infer the other columns
+    columns = list(fc.RAW_DTYPES)
+
+    # With the incremental mode, only the new or changed postings of a weekly drop are cleaned
+    # and merged into the store, which keeps the cleaned postings of the earlier drops.
+    incremental = False
+    path_store = os.path.join(os.path.dirname(filepath), "incremental_store")
+
+    # With the stage cache, the cleaned dataset is loaded instead of computed, if the raw file
+    # and the cleaning code did not change. The whole file is cleaned in the memory.
+    use_stage_cache = False
+    path_stage_cache = os.path.join(os.path.dirname(filepath), "stage_cache")
+
+    # With more than one worker, the whole file is read and cleaned in partitions on a
+    # process pool (parallel_dataset_cleaning), which needs the memory for the whole file.
+    workers = 1
+
+    if incremental:
+        store = finc.IncrementalStore(path_store)
+        store.add_postings(
+            pd.read_csv(
+                path_dta + "/vacancies_new.csv", usecols=columns, dtype=fc.RAW_DTYPES
+            ),
+            stats=stats,
+        )
+        store.save()
+        fio.write_dataset(data=store.cleaned_dataset(), path=filepath)
+    elif use_stage_cache:
+        cleaned, key = fsc.cached_dataset_cleaning(
+            cache=fsc.StageCache(path_stage_cache),
+            input_path=path_dta + "/vacancies.csv",
+            columns=columns,
+            stats=stats,
+            workers=workers,
+        )
+        fio.write_dataset(data=cleaned, path=filepath)
+    elif workers > 1:
+        cleaned = fc.parallel_dataset_cleaning(
+            dataset=pd.read_csv(
+                path_dta + "/vacancies.csv", usecols=columns, dtype=fc.RAW_DTYPES
+            ),
+            workers=workers,
+            stats=stats,
+        )
+        fio.write_dataset(data=cleaned, path=filepath)
+    else:
+        # read, clean and save the data in chunks, the whole file does not fit in the memory
+        fc.stream_dataset_cleaning(
+            input_path=path_dta + "/vacancies.csv",
+            output_path=filepath,
+            columns=columns,
+            dtypes=fc.RAW_DTYPES,
+            stats=stats,
+        )
+    print(stats.to_frame())
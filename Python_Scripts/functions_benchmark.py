@@ -0,0 +1,459 @@
+# Import the required libraries
+import os
+import platform
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import functions_cleaning as fc
+import functions_distance as dcf
+import functions_io as fio
+import functions_profiling as fp
+
+# the cleaning steps in the order of the original full_dataset_cleaning
+CLEANING_STEPS = [
+    "__clean_duration",
+    "__clean_posting_count",
+    "__clean_contract_type",
+    "__clean_salary_dummy",
+    "__clean_advertiser_type_value",
+    "__clean_profession_code",
+    "__clean_job_ID",
+    "__clean_org_ID",
+    "__clean_working_hours",
+    "__clean_orga_industry_label",
+    "__clean_language",
+    "__clean_education_level",
+    "__clean_dates",
+    "__clean_firm_size",
+    "__clean_isco_code",
+]
+
+# parts of the synthetic city names
+NAME_PREFIXES = ["", "", "", "Bad ", "Neu", "Alt", "Groß", "Klein", "Ober", "Unter"]
+NAME_STEMS = [
+    "Bruck",
+    "Lind",
+    "Esch",
+    "Wald",
+    "Stein",
+    "Mühl",
+    "Rosen",
+    "Kirch",
+    "Hag",
+    "Eich",
+    "Buch",
+    "Brunn",
+    "Tann",
+    "Hof",
+    "Wies",
+    "Hohen",
+    "Schön",
+    "Fried",
+    "Ried",
+    "Sonn",
+    "Berg",
+    "Lauf",
+    "Salz",
+    "Königs",
+    "Würz",
+    "Gött",
+    "Nürn",
+    "Lüne",
+    "Bam",
+    "Fürst",
+]
+NAME_SUFFIXES = [
+    "heim",
+    "dorf",
+    "burg",
+    "hausen",
+    "stadt",
+    "feld",
+    "bach",
+    "berg",
+    "au",
+    "ingen",
+    "rode",
+    "hagen",
+    "felde",
+    "büttel",
+    "see",
+    "brück",
+    "stedt",
+    "weiler",
+]
+
+
+def generate_gazetteer(n_cities, seed=0):
+    """
+    This function generates a synthetic list of german cities with gps coordinates, with
+    the same columns as Cities_gps.xlsx.
+    Input:  - n_cities(int): The number of cities
+            - seed(int): The seed of the random generator
+    Output: - gps_df(pd.df): The columns Stadt, Breitengrad and Längengrad
+    Raises: None
+    """
+    rng = np.random.default_rng(seed)
+    names = set()
+    while len(names) < n_cities:
+        name = (
+            rng.choice(NAME_PREFIXES)
+            + rng.choice(NAME_STEMS)
+            + rng.choice(NAME_SUFFIXES)
+        )
+        # larger gazetteers need more combinations
+        if len(names) > len(NAME_PREFIXES) * len(NAME_STEMS) * len(NAME_SUFFIXES) / 4:
+            name = name + " " + str(rng.integers(1, 1000))
+        names.add(name)
+    names = sorted(names)
+    rng.shuffle(names)
+    return pd.DataFrame(
+        {
+            "Stadt": names,
+            "Breitengrad": rng.uniform(47.3, 55.0, n_cities).round(5),
+            "Längengrad": rng.uniform(5.9, 15.0, n_cities).round(5),
+        }
+    )
+
+
+def __misspell(names, rng):
+    # typical variations of the scraped location names: case, spaces, typos and districts
+    names = names.copy()
+    variation = rng.integers(0, 6, len(names))
+    for i in np.flatnonzero(variation > 0):
+        name = names[i]
+        if variation[i] == 1:
+            name = name.upper()
+        elif variation[i] == 2:
+            name = "  " + name.lower() + " "
+        elif variation[i] == 3 and len(name) > 4:
+            position = rng.integers(1, len(name) - 1)
+            name = name[:position] + name[position + 1 :]
+        elif variation[i] == 4:
+            name = name + " - Innenstadt"
+        else:
+            name = name.replace("ü", "ue").replace("ö", "oe").replace("ß", "ss")
+        names[i] = name
+    return names
+
+
+def generate_vacancies(n_rows, gps_df, seed=0):
+    """
+    This function generates synthetic vacancies with all the columns, which are used by
+    full_dataset_cleaning and create_distance_measures. The values follow the labels of
+    the scraped dataset, including values, which are removed by the cleaning.
+    Input:  - n_rows(int): The number of vacancies
+            - gps_df(pd.df): The gazetteer, from which the organization locations are drawn
+            - seed(int): The seed of the random generator
+    Output: - data(pd.df): The synthetic vacancies, as read from vacancies.csv
+    Raises: None
+    """
+    rng = np.random.default_rng(seed)
+    n_cities = len(gps_df)
+    # few cities host most of the headquarters
+    weights = 1 / np.arange(1, n_cities + 1)
+    city_index = rng.choice(n_cities, n_rows, p=weights / weights.sum())
+    names = gps_df["Stadt"].to_numpy(dtype=object)[city_index]
+    names = __misspell(names, rng)
+    names[rng.random(n_rows) < 0.02] = np.nan
+
+    # jobs are located around the headquarter or somewhere else in germany
+    job_city = np.where(
+        rng.random(n_rows) < 0.6, city_index, rng.integers(0, n_cities, n_rows)
+    )
+    latitude = gps_df["Breitengrad"].to_numpy()[job_city] + rng.normal(0, 0.05, n_rows)
+    longitude = gps_df["Längengrad"].to_numpy()[job_city] + rng.normal(0, 0.05, n_rows)
+    coordinates = np.char.add(
+        np.char.add(latitude.round(6).astype(str), ","), longitude.round(6).astype(str)
+    ).astype(object)
+    coordinates[rng.random(n_rows) < 0.03] = np.nan
+
+    def choice(values, p=None):
+        return rng.choice(np.array(values, dtype=object), n_rows, p=p)
+
+    data = pd.DataFrame(
+        {
+            "job_id": np.where(
+                rng.random(n_rows) < 0.01, np.nan, np.arange(1, n_rows + 1)
+            ),
+            "organization_ID": rng.integers(1, max(n_rows // 20, 2), n_rows).astype(
+                float
+            ),
+            "organization_location_name": names,
+            "advertiser_type_value": rng.integers(1, 4, n_rows),
+            "advertiser_type_label": choice(
+                ["Direct employer", "Recruitment agency", None], [0.8, 0.17, 0.03]
+            ),
+            "posting_count": rng.integers(1, 30, n_rows).astype(float),
+            "date": pd.to_datetime("2018-01-01")
+            + pd.to_timedelta(rng.integers(0, 365, n_rows), unit="D"),
+            "duration": np.where(
+                rng.random(n_rows) < 0.02,
+                np.nan,
+                rng.gamma(1.5, 40, n_rows).round() + 1,
+            ),
+            "via_intermediary": rng.random(n_rows) < 0.1,
+            "language": choice(
+                ["de", "en", "fr", "pl", "xx", None],
+                [0.75, 0.18, 0.02, 0.02, 0.02, 0.01],
+            ),
+            "job_title": choice(["Softwareentwickler", "Pflegekraft", "Buchhalter"]),
+            "profession_value": rng.integers(1, 1000, n_rows),
+            "profession_isco_code_value": choice(
+                [2512.0, 2221.0, 3313.0, 7233.0, 5223.0, 9999999999.0, None],
+                [0.25, 0.2, 0.2, 0.15, 0.15, 0.03, 0.02],
+            ),
+            "profession_isco_code_label": choice(["Software developers", "Nurses"]),
+            "location": rng.integers(1, 10000, n_rows),
+            "location_name": names,
+            "region_value": rng.integers(1, 17, n_rows),
+            "region_label": choice(["Bayern", "Berlin", "Hessen", "Sachsen"]),
+            "education_level_value": rng.integers(1, 8, n_rows),
+            "education_level_label": choice(
+                [
+                    "Bachelor",
+                    "Master",
+                    "Dissertation",
+                    "MBO",
+                    "HBO",
+                    "Unbekannt",
+                    "Grundschule",
+                ],
+                [0.25, 0.15, 0.02, 0.3, 0.18, 0.08, 0.02],
+            ),
+            "contract_type_value": rng.integers(1, 8, n_rows),
+            "contract_type_label": choice(
+                [
+                    "Permanent contract",
+                    "Temporary contract",
+                    "Possibly permanent contract",
+                    "Internship / Graduation position",
+                    "Apprenticeship",
+                    "Secondment / Interim",
+                    "Freelance",
+                ],
+                [0.45, 0.2, 0.1, 0.08, 0.07, 0.05, 0.05],
+            ),
+            "working_hours_type_value": rng.integers(1, 3, n_rows),
+            "working_hours_type_label": choice(
+                ["Regular working hours", "Part-time"], [0.85, 0.15]
+            ),
+            "hours_per_week_from": rng.integers(20, 41, n_rows),
+            "hours_per_week_to": rng.integers(30, 41, n_rows),
+            "salary": np.where(
+                rng.random(n_rows) < 0.7, np.nan, rng.uniform(2000, 6000, n_rows)
+            ),
+            "organization_industry_value": rng.integers(1, 20, n_rows),
+            "organization_industry_label": choice(
+                ["Information technology", "Health care", "Retail", None],
+                [0.4, 0.3, 0.27, 0.03],
+            ),
+            "organization_size_value": rng.integers(1, 7, n_rows),
+            "organization_size_label": choice(
+                ["5000+", "1000-4999", "500-999", "100-499", "Unbekannt", None],
+                [0.3, 0.25, 0.2, 0.15, 0.07, 0.03],
+            ),
+            "location_coordinates": coordinates,
+        }
+    )
+    return data
+
+
+def __timed(function, repeats):
+    # the fastest of the repetitions is the least disturbed one
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def benchmark_cleaning(data, repeats=1):
+    """
+    This function times every __clean_* step of functions_cleaning, called one after
+    the other, and full_dataset_cleaning as a whole.
+    Input:  - data(pd.df): The raw vacancies
+            - repeats(int): The number of repetitions, the fastest one is reported
+    Output: - report(dict): Seconds and rows before and after every step
+    Raises: None
+    """
+    steps = []
+    current, seconds = __timed(
+        lambda: getattr(fc, "__delete_rows_with_unique_values")(
+            dataframe=data.copy(), column_name="organization_location_name"
+        ),
+        repeats,
+    )
+    steps.append(
+        {
+            "step": "__delete_rows_with_unique_values",
+            "seconds": seconds,
+            "rows_in": len(data),
+            "rows_out": len(current),
+        }
+    )
+    for name in CLEANING_STEPS:
+        step = getattr(fc, name)
+        rows_in = len(current)
+        current, seconds = __timed(lambda: step(data=current.copy()), repeats)
+        steps.append(
+            {
+                "step": name,
+                "seconds": seconds,
+                "rows_in": rows_in,
+                "rows_out": len(current),
+            }
+        )
+    cleaned, seconds = __timed(lambda: fc.full_dataset_cleaning(dataset=data), repeats)
+    return {
+        "steps": steps,
+        "full_dataset_cleaning": {
+            "seconds": seconds,
+            "rows_in": len(data),
+            "rows_out": len(cleaned),
+        },
+        "cleaned": cleaned,
+    }
+
+
+def benchmark_distance(data, gps_df, used_columns, repeats=1, **options):
+    """
+    This function times every stage of create_distance_measures and the whole function.
+    The match cache is not used, so that the fuzzy matching is always timed.
+    Input:  - data(pd.df): The cleaned vacancies
+            - gps_df(pd.df): The gazetteer
+            - used_columns(list): The columns of the final dataset
+            - repeats(int): The number of repetitions, the fastest one is reported
+            - options: Further parameters of create_distance_measures, like workers
+    Output: - report(dict): Seconds and rows before and after every stage
+    Raises: None
+    """
+    options.setdefault("match_output_path", None)
+    stages = []
+    state = dcf.new_distance_state(
+        data=data.copy(),
+        city_gps_match_data=gps_df.copy(),
+        used_columns=used_columns,
+        matcher=None,
+        distance_method=options.get("distance_method", "vincenty"),
+        cache_path=None,
+        match_output_path=options["match_output_path"],
+        workers=options.get("workers", 1),
+        compact=options.get("compact", True),
+        spatial_fallback_km=options.get("spatial_fallback_km"),
+        min_fuzzy_rating=options.get("min_fuzzy_rating", dcf.MIN_FUZZY_RATING),
+    )
+    for name, stage in dcf.DISTANCE_STAGES:
+        rows_in = len(state["data"])
+        saved = dict(state, data=state["data"].copy())
+
+        def run():
+            trial = dict(saved, data=saved["data"].copy())
+            stage(trial)
+            return trial
+
+        state, seconds = __timed(run, repeats)
+        stages.append(
+            {
+                "stage": name,
+                "seconds": seconds,
+                "rows_in": rows_in,
+                "rows_out": len(state["data"]),
+            }
+        )
+    result, seconds = __timed(
+        lambda: dcf.create_distance_measures(
+            data=data.copy(),
+            city_gps_match_data=gps_df.copy(),
+            used_columns=used_columns,
+            **options,
+        ),
+        repeats,
+    )
+    return {
+        "stages": stages,
+        "create_distance_measures": {
+            "seconds": seconds,
+            "rows_in": len(data),
+            "rows_out": len(result[0]),
+        },
+    }
+
+
+def benchmark_end_to_end(data, gps_df, used_columns, **options):
+    """
+    This function times the whole pipeline on files: the vacancies are written to a csv
+    file, cleaned with stream_dataset_cleaning into parquet, read again, the distances are
+    computed and the final dataset is written to parquet.
+    Input:  - data(pd.df): The raw vacancies
+            - gps_df(pd.df): The gazetteer
+            - used_columns(list): The columns of the final dataset
+            - options: Further parameters of create_distance_measures, like workers
+    Output: - report(dict): Seconds of the run and rows of the final dataset
+    Raises: None
+    """
+    options.setdefault("match_output_path", None)
+    with tempfile.TemporaryDirectory() as directory:
+        raw_path = os.path.join(directory, "vacancies.csv")
+        cleaned_path = os.path.join(directory, "vacancies_cleaned.parquet")
+        final_path = os.path.join(directory, "dataset_final.parquet")
+        data.to_csv(raw_path, index=False)
+        start = time.perf_counter()
+        fc.stream_dataset_cleaning(input_path=raw_path, output_path=cleaned_path)
+        cleaned = fio.read_dataset(cleaned_path)
+        final = dcf.create_distance_measures(
+            data=cleaned,
+            city_gps_match_data=gps_df.copy(),
+            used_columns=used_columns,
+            **options,
+        )
+        fio.write_dataset(data=final[0], path=final_path)
+        seconds = time.perf_counter() - start
+    return {"seconds": seconds, "rows_out": len(final[0])}
+
+
+def run_benchmark(n_rows, n_cities, used_columns, seed=0, repeats=1, **options):
+    """
+    This function generates the synthetic data and runs all benchmarks.
+    Input:  - n_rows(int): The number of synthetic vacancies
+            - n_cities(int): The number of cities in the synthetic gazetteer
+            - used_columns(list): The columns of the final dataset
+            - seed(int): The seed of the random generator
+            - repeats(int): The number of repetitions of the single steps
+            - options: Further parameters of create_distance_measures, like workers
+    Output: - report(dict): The report, which can be saved as json
+    Raises: None
+    """
+    gps_df = generate_gazetteer(n_cities=n_cities, seed=seed)
+    data = generate_vacancies(n_rows=n_rows, gps_df=gps_df, seed=seed)
+    cleaning = benchmark_cleaning(data=data, repeats=repeats)
+    cleaned = cleaning.pop("cleaned")
+    distance = benchmark_distance(
+        data=cleaned,
+        gps_df=gps_df,
+        used_columns=used_columns,
+        repeats=repeats,
+        **options,
+    )
+    end_to_end = benchmark_end_to_end(
+        data=data, gps_df=gps_df, used_columns=used_columns, **options
+    )
+    return {
+        "parameters": dict(
+            n_rows=n_rows, n_cities=n_cities, seed=seed, repeats=repeats, **options
+        ),
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "cleaning": cleaning,
+        "distance": distance,
+        "end_to_end": end_to_end,
+        # the highest memory of the whole run, not of one of the benchmarks
+        "process_peak_memory_mb": fp.peak_rss_mb(),
+    }
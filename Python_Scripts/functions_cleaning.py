@@ -1,23 +1,13 @@
 # Import the required libraries
-from zipfile import ZipFile
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-import os
-import pickle
-import sys
-import plotly.express as px
-import plotly.graph_objects as go
-import fuzzywuzzy as fw
-from fuzzywuzzy import fuzz
-
-# import seaborn as sns
-import openpyxl
-
-# from functions_cleaning import *
-import geopy
-from geopy import distance
-import statsmodels.formula.api as sm
-from scipy.stats import linregress
+import functions_codes as fcd
+import functions_dtypes as fd
+import functions_io as fio
+import functions_profiling as fp
+import functions_shared_memory as fsm
 
 
 def __delete_rows_with_unique_values(dataframe, column_name):
@@ -201,34 +191,682 @@ def __clean_isco_code(data):
     deletion_boolean_vector = data["profession_isco_code_value"] == 9999999999
     rows_to_drop = data.index[deletion_boolean_vector]
     data = data.drop(index=rows_to_drop)
-    data["profession_isco_code_value_agg_1"] = pd.to_numeric(
-        data["profession_isco_code_value"].apply(lambda x: str(x)[:3])
+    # the three and the two digit groups of the codes
+    for name, values in ISCO_AGGREGATION(data["profession_isco_code_value"]).items():
+        data[name] = values
+    return data
+
+
+# values, which are kept by the cleaning steps
+CONTRACT_TYPES = [
+    "Permanent contract",
+    "Internship / Graduation position",
+    "Possibly permanent contract",
+    "Apprenticeship",
+    "Temporary contract",
+    "Secondment / Interim",
+]
+PERMANENT_CONTRACT_TYPES = [
+    "Permanent contract",
+    "Internship / Graduation position",
+    "Possibly permanent contract",
+]
+LANGUAGES = [
+    "de",
+    "en",
+    "zh",
+    "fr",
+    "cs",
+    "es",
+    "nl",
+    "hu",
+    "sv",
+    "no",
+    "da",
+    "sk",
+    "ru",
+    "pl",
+    "pt",
+    "it",
+    "ro",
+    "ja",
+    "el",
+]
+EXCLUDED_EDUCATION_LEVELS = ["Unbekannt", "Grundschule"]
+UNIVERSITY_DEGREES = ["Bachelor", "Master", "Dissertation"]
+FIRM_SIZES = ["5000+", "1000-4999", "500-999"]
+# the aggregation levels of the ISCO codes: the first three and the first two digits
+ISCO_AGGREGATION = fcd.code_aggregation({1: 3, 2: 2})
+
+# The columns of vacancies.csv, which are used by the cleaning and the distance computation,
+# with the dtypes they are read with. The columns, which the cleaning converts to numbers
+# itself, are read as text, so that text values in them are dropped and not an error.
+RAW_DTYPES = {
+    "job_id": "object",
+    "organization_ID": "object",
+    "organization_location_name": "object",
+    "advertiser_type_value": "float64",
+    "advertiser_type_label": "object",
+    "posting_count": "object",
+    "date": "object",
+    "duration": "object",
+    "via_intermediary": "boolean",
+    "language": "object",
+    "job_title": "object",
+    "profession_value": "float64",
+    "profession_isco_code_value": "object",
+    "profession_isco_code_label": "object",
+    "location": "float64",
+    "location_name": "object",
+    "region_value": "float64",
+    "region_label": "object",
+    "education_level_value": "float64",
+    "education_level_label": "object",
+    "contract_type_value": "float64",
+    "contract_type_label": "object",
+    "working_hours_type_value": "float64",
+    "working_hours_type_label": "object",
+    "hours_per_week_from": "float64",
+    "hours_per_week_to": "float64",
+    "salary": "float64",
+    "organization_industry_value": "float64",
+    "organization_industry_label": "object",
+    "organization_size_value": "float64",
+    "organization_size_label": "object",
+    "location_coordinates": "object",
+}
+
+
+# The row filters of the cleaning plan. Every filter gets the values of its column for the
+# rows, which survived the previous steps, and returns which of them to keep, together
+# with the converted columns computed at this step (for the kept rows).
+def __keep_non_unique(values):
+    value_counts = values.value_counts()
+    return values.isin(value_counts.index[value_counts != 1]), {}
+
+
+def __keep_non_unique_counted(value_counts):
+    # the same filter with the counts of the whole dataset, used for chunks of the dataset
+    return lambda values: (values.isin(value_counts.index[value_counts != 1]), {})
+
+
+def __keep_numeric(values):
+    numeric = pd.to_numeric(values, errors="coerce")
+    keep = numeric.notna()
+    return keep, {values.name: numeric[keep]}
+
+
+def __keep_not_missing_then_numeric(values):
+    keep = values.notna()
+    return keep, {values.name: pd.to_numeric(values[keep], errors="coerce")}
+
+
+def __keep_not_missing(values):
+    return values.notna(), {}
+
+
+def __keep_equal_to(accepted):
+    return lambda values: (values == accepted, {})
+
+
+def __keep_in(accepted):
+    return lambda values: (values.isin(accepted), {})
+
+
+def __keep_not_in(rejected):
+    return lambda values: (~values.isin(rejected), {})
+
+
+def __keep_all_convert_dates(values):
+    dates = pd.to_datetime(values, errors="coerce")
+    derived = {
+        "date": dates,
+        "quarter_of_date": dates.dt.quarter,
+        "month_of_date": dates.dt.month,
+    }
+    return pd.Series(True, index=values.index), derived
+
+
+def __keep_meaningful_isco(values):
+    codes = pd.to_numeric(values, errors="coerce")
+    keep = codes != 9999999999
+    codes = codes[keep]
+    derived = {"profession_isco_code_value": codes}
+    derived.update(ISCO_AGGREGATION(codes))
+    return keep, derived
+
+
+# The derived columns of the cleaning plan, computed on the surviving rows only.
+def __derive_log_duration(data):
+    # every observation above 365 is set as 365
+    data["duration"] = data["duration"].mask(data["duration"] > 365, 365)
+    data["log_duration"] = np.log(data["duration"])
+
+
+def __derive_posting_count(data):
+    # top code
+    data["posting_count"] = data["posting_count"].mask(data["posting_count"] > 20, 20)
+
+
+def __derive_contract_cluster(data):
+    data["contract_type_label_cluster"] = np.where(
+        data["contract_type_label"].isin(PERMANENT_CONTRACT_TYPES),
+        "Permanent",
+        "Non_Permanent",
     )
-    data["profession_isco_code_value_agg_2"] = pd.to_numeric(
-        data["profession_isco_code_value"].apply(lambda x: str(x)[:2])
+
+
+def __derive_salary_dummy(data):
+    data["salary_dummy"] = data["salary"].notnull()
+
+
+def __derive_language_cluster(data):
+    data["Applicant_language_cluster"] = np.where(
+        data["language"] == "de", "German", "International"
     )
-    return data
 
 
-def full_dataset_cleaning(dataset):
-    # call the individual cleaning steps in one function. 
-    data = dataset
-    data = __delete_rows_with_unique_values(
-        dataframe=data, column_name="organization_location_name"
+def __derive_education_cluster(data):
+    data["education_level_cluster"] = np.where(
+        data["education_level_label"].isin(UNIVERSITY_DEGREES),
+        "University degree",
+        "Non university degree",
     )
-    data = __clean_duration(data=data)
-    data = __clean_posting_count(data=data)
-    data = __clean_contract_type(data=data)
-    data = __clean_salary_dummy(data=data)
-    data = __clean_advertiser_type_value(data=data)
-    data = __clean_profession_code(data=data)
-    data = __clean_job_ID(data=data)
-    data = __clean_org_ID(data=data)
-    data = __clean_working_hours(data=data)
-    data = __clean_orga_industry_label(data=data)
-    data = __clean_language(data=data)
-    data = __clean_education_level(data=data)
-    data = __clean_dates(data=data)
-    data = __clean_firm_size(data=data)
-    data = __clean_isco_code(data=data)
+
+
+# The cleaning plan: the steps of full_dataset_cleaning in their original order.
+# "filter" selects the rows, "derive" adds the columns computed from the surviving rows.
+CLEANING_PLAN = [
+    {
+        "step": "unique_values",
+        "column": "organization_location_name",
+        "filter": __keep_non_unique,
+        "derive": None,
+    },
+    {
+        "step": "duration",
+        "column": "duration",
+        "filter": __keep_numeric,
+        "derive": __derive_log_duration,
+    },
+    {
+        "step": "posting_count",
+        "column": "posting_count",
+        "filter": __keep_numeric,
+        "derive": __derive_posting_count,
+    },
+    {
+        "step": "contract_type",
+        "column": "contract_type_label",
+        "filter": __keep_in(CONTRACT_TYPES),
+        "derive": __derive_contract_cluster,
+    },
+    {
+        "step": "working_hours",
+        "column": "working_hours_type_label",
+        "filter": __keep_equal_to("Regular working hours"),
+        "derive": None,
+    },
+    {
+        "step": "salary_dummy",
+        "column": None,
+        "filter": None,
+        "derive": __derive_salary_dummy,
+    },
+    {
+        "step": "advertiser_type_value",
+        "column": "advertiser_type_label",
+        "filter": __keep_equal_to("Direct employer"),
+        "derive": None,
+    },
+    {
+        "step": "profession_code",
+        "column": "profession_isco_code_value",
+        "filter": __keep_not_missing_then_numeric,
+        "derive": None,
+    },
+    {
+        "step": "job_ID",
+        "column": "job_id",
+        "filter": __keep_not_missing_then_numeric,
+        "derive": None,
+    },
+    {
+        "step": "org_ID",
+        "column": "organization_ID",
+        "filter": __keep_not_missing_then_numeric,
+        "derive": None,
+    },
+    {
+        "step": "orga_industry_label",
+        "column": "organization_industry_label",
+        "filter": __keep_not_missing,
+        "derive": None,
+    },
+    {
+        "step": "language",
+        "column": "language",
+        "filter": __keep_in(LANGUAGES),
+        "derive": __derive_language_cluster,
+    },
+    {
+        "step": "education_level",
+        "column": "education_level_label",
+        "filter": __keep_not_in(EXCLUDED_EDUCATION_LEVELS),
+        "derive": __derive_education_cluster,
+    },
+    {
+        "step": "dates",
+        "column": "date",
+        "filter": __keep_all_convert_dates,
+        "derive": None,
+    },
+    {
+        "step": "firm_size",
+        "column": "organization_size_label",
+        "filter": __keep_in(FIRM_SIZES),
+        "derive": None,
+    },
+    {
+        "step": "isco_code",
+        "column": "profession_isco_code_value",
+        "filter": __keep_meaningful_isco,
+        "derive": None,
+    },
+]
+
+
+# The steps of the cleaning plan, which only look at the row itself. All steps except the
+# unique values of the location names, which depend on the whole dataset.
+ROW_CLEANING_PLAN = [step for step in CLEANING_PLAN if step["step"] != "unique_values"]
+
+
+def __run_cleaning_plan(dataset, plan, stats=None, accumulate=False):
+    """
+    This function runs a cleaning plan on the dataset. First all row filters are evaluated
+    column by column on the rows, which survived the previous filters, which gives one
+    boolean mask for the whole plan. Then the surviving rows are copied once and the
+    converted and derived columns are added, in the order of the plan.
+    The result is the same as running the steps one after the other on the dataframe.
+    Input:  - dataset(pd.df): The raw dataset, it is not changed
+            - plan(list): The steps of the plan, see CLEANING_PLAN
+            - stats(PipelineStats): Collects the time, memory and rows of every step, if given.
+              The time of a step is the time of its filter and of its derived columns.
+            - accumulate(bool): Add the statistics to the earlier ones of the same steps
+    Output: - data(pd.df): The cleaned dataset
+    Raises: - KeyError if a column of the plan does not exist
+    """
+    mask = np.ones(len(dataset), dtype=bool)
+    # the converted values of a column, with the positions of the rows they belong to
+    current = {}
+    converted = []
+    # seconds, rows before, rows after and memory increase of every step
+    timings = []
+    rows = len(dataset)
+    measure_memory = stats is not None
+    rss = fp.start_memory() if measure_memory else None
+    for step in plan:
+        start = time.perf_counter()
+        rows_in = rows
+        step_converted = {}
+        if step["filter"] is not None:
+            column = step["column"]
+            if column in current:
+                positions, values = current[column]
+                values = values[mask[positions]]
+            else:
+                values = dataset[column][mask]
+            positions = np.flatnonzero(mask)
+            keep, derived = step["filter"](values)
+            keep = np.asarray(keep, dtype=bool)
+            mask[positions[~keep]] = False
+            rows = int(keep.sum())
+            for name, values in derived.items():
+                step_converted[name] = (positions[keep], values)
+            current.update(step_converted)
+        converted.append(step_converted)
+        seconds = time.perf_counter() - start
+        increase = None
+        if measure_memory:
+            increase, rss = fp.step_memory(rss)
+        timings.append([seconds, rows_in, rows, increase])
+
+    start = time.perf_counter()
+    data = dataset.take(np.flatnonzero(mask))
+    copy_seconds = time.perf_counter() - start
+    copy_increase = None
+    if measure_memory:
+        copy_increase, rss = fp.step_memory(rss)
+    for step, step_converted, timing in zip(plan, converted, timings):
+        start = time.perf_counter()
+        for name, (positions, values) in step_converted.items():
+            data[name] = values[mask[positions]].set_axis(data.index)
+        if step["derive"] is not None:
+            step["derive"](data)
+        timing[0] += time.perf_counter() - start
+        if measure_memory:
+            # the larger increase of the filter and of the derived columns of the step
+            increase, rss = fp.step_memory(rss)
+            if timing[3] is None or (increase is not None and increase > timing[3]):
+                timing[3] = increase
+
+    if stats is not None:
+        for step, (seconds, rows_in, rows_out, increase) in zip(plan, timings):
+            stats.add(
+                pipeline="cleaning",
+                step=step["step"],
+                seconds=seconds,
+                rows_in=rows_in,
+                rows_out=rows_out,
+                accumulate=accumulate,
+                memory_increase_mb=increase,
+            )
+        stats.add(
+            pipeline="cleaning",
+            step="copy_surviving_rows",
+            seconds=copy_seconds,
+            rows_in=len(dataset),
+            rows_out=len(data),
+            accumulate=accumulate,
+            memory_increase_mb=copy_increase,
+        )
     return data
+
+
+def __combine_dtypes(dtype1, dtype2):
+    """
+    This function gives the dtype, which pandas would infer for a column, when it reads
+    two parts of the column with the given dtypes at once.
+    """
+    if dtype1 == dtype2:
+        return dtype1
+    if pd.api.types.is_numeric_dtype(dtype1) and pd.api.types.is_numeric_dtype(dtype2):
+        if not pd.api.types.is_bool_dtype(dtype1) and not pd.api.types.is_bool_dtype(
+            dtype2
+        ):
+            return np.dtype("float64")
+    return np.dtype("object")
+
+
+def __compact_dtypes(cleaned, stats=None, accumulate=False):
+    # convert the cleaned rows to the compact dtypes, measured as the last step of the plan
+    start = time.perf_counter()
+    cleaned = fd.compact_dtypes(cleaned)
+    if stats is not None:
+        stats.add(
+            pipeline="cleaning",
+            step="compact_dtypes",
+            seconds=time.perf_counter() - start,
+            rows_in=len(cleaned),
+            rows_out=len(cleaned),
+            accumulate=accumulate,
+        )
+    return cleaned
+
+
+def stream_dataset_cleaning(
+    input_path,
+    output_path,
+    columns=None,
+    dtypes=None,
+    chunksize=500000,
+    stats=None,
+    compact=True,
+    firm_sizes=None,
+):
+    """
+    This function cleans a csv file, which is too large for the memory, in chunks and
+    writes the cleaned rows to the output file chunk by chunk.
+    The first pass reads the file chunkwise to count the organization location names for
+    __delete_rows_with_unique_values over the whole file and to find the dtype of every
+    column without a given dtype, as pandas would infer it for the whole file. If the dtypes
+    of all columns are given, the first pass reads only the location names. The second pass
+    reads the chunks with these dtypes, runs the cleaning plan on every chunk and appends
+    the result to the output file. The rows are the same as with full_dataset_cleaning on the
+    whole file. The dtypes of a column can differ between the chunks, like Int16 in the first
+    chunk and float64 in a later one with fractional values. The parquet file gets the wider
+    one for all rows (see functions_io.ParquetChunkWriter), like write_dataset of the whole
+    cleaned file.
+    Input:  - input_path(string): The path of the raw csv file
+            - output_path(string): The path of the cleaned file, it is overwritten. A parquet
+              file (.parquet) keeps the dtypes of the cleaned columns, otherwise csv is written.
+            - columns(list): The columns to read, all columns if None. They have to
+              include the columns used by CLEANING_PLAN, like the keys of RAW_DTYPES.
+            - dtypes(dict): The dtypes of the columns, like RAW_DTYPES, the dtypes of the
+              other columns are inferred
+            - chunksize(int): The number of rows read at once
+            - stats(PipelineStats): Collects the time, memory and rows of every step, summed
+              over the chunks, if given
+            - compact(bool): Convert the cleaned rows to the compact dtypes of
+              functions_dtypes.compact_dtypes before they are written
+            - firm_sizes(list): The organization sizes, which are kept, FIRM_SIZES if None
+    Output: - rows(int): The number of rows written to the output file
+    Raises: - KeyError if a column of the plan is not read
+    """
+    # first pass: counts of the location names and dtypes of the whole file
+    start = time.perf_counter()
+    value_counts = pd.Series(dtype="int64")
+    given = {} if dtypes is None else dict(dtypes)
+    # the other columns are only parsed, if their dtypes have to be inferred
+    infer = columns is None or any(column not in given for column in columns)
+    dtypes = dict(given)
+    for chunk in pd.read_csv(
+        input_path,
+        usecols=columns if infer else ["organization_location_name"],
+        dtype=given,
+        chunksize=chunksize,
+    ):
+        value_counts = value_counts.add(
+            chunk["organization_location_name"].value_counts(), fill_value=0
+        )
+        for column, dtype in chunk.dtypes.items():
+            if column in given:
+                continue
+            dtypes[column] = (
+                __combine_dtypes(dtypes[column], dtype) if column in dtypes else dtype
+            )
+
+    if stats is not None:
+        rows_read = int(value_counts.sum())
+        stats.add(
+            pipeline="cleaning",
+            step="count_values",
+            seconds=time.perf_counter() - start,
+            rows_in=rows_read,
+            rows_out=rows_read,
+        )
+    plan = __counted_plan(value_counts, firm_sizes)
+    # second pass: clean every chunk and write it to the output file
+    rows = 0
+    parquet = output_path.lower().endswith(".parquet")
+    if parquet:
+        writer = fio.ParquetChunkWriter(output_path)
+    reader = pd.read_csv(input_path, usecols=columns, dtype=dtypes, chunksize=chunksize)
+    for i, chunk in enumerate(reader):
+        cleaned = __run_cleaning_plan(
+            dataset=chunk, plan=plan, stats=stats, accumulate=True
+        )
+        if compact:
+            cleaned = __compact_dtypes(cleaned, stats=stats, accumulate=True)
+        start = time.perf_counter()
+        if parquet:
+            writer.write(cleaned)
+        else:
+            cleaned.to_csv(output_path, mode="w" if i == 0 else "a", header=i == 0)
+        rows += len(cleaned)
+        if stats is not None:
+            stats.add(
+                pipeline="cleaning",
+                step="write_output",
+                seconds=time.perf_counter() - start,
+                rows_in=len(cleaned),
+                rows_out=len(cleaned),
+                accumulate=True,
+            )
+    if parquet:
+        writer.close()
+    return rows
+
+
+def __counted_plan(value_counts, firm_sizes):
+    # the cleaning plan with the counts of the location names of the whole dataset
+    return [
+        (
+            dict(step, filter=__keep_non_unique_counted(value_counts))
+            if step["step"] == "unique_values"
+            else step
+        )
+        for step in __plan_with_firm_sizes(CLEANING_PLAN, firm_sizes)
+    ]
+
+
+# the state of a worker process of parallel_dataset_cleaning, it is set once per worker
+_worker_state = None
+
+
+def __init_worker(description, value_counts, firm_sizes):
+    global _worker_state
+    columns, blocks = fsm.attach_frame(description)
+    _worker_state = {
+        "columns": columns,
+        "blocks": blocks,
+        "plan": __counted_plan(value_counts, firm_sizes),
+    }
+
+
+def __clean_partition(bounds):
+    # the rows of a partition are read from the shared memory, only the result is pickled
+    start, stop = bounds
+    stats = fp.PipelineStats()
+    cleaned = __run_cleaning_plan(
+        dataset=fsm.read_rows(_worker_state["columns"], start, stop),
+        plan=_worker_state["plan"],
+        stats=stats,
+    )
+    return cleaned, stats.to_frame()
+
+
+def parallel_dataset_cleaning(
+    dataset, workers, partitions=None, stats=None, compact=True, firm_sizes=None
+):
+    """
+    This function cleans the dataset like full_dataset_cleaning on several processes.
+    The columns are copied once into shared memory (see functions_shared_memory), the
+    workers read their partitions, contiguous ranges of rows, from there. The location
+    names are counted once on the whole dataset, so every partition drops the same unique
+    names as full_dataset_cleaning. The cleaned partitions are put back together in the
+    order of the rows and get the index of the dataset.
+    Input:  - dataset(pd.df): The raw dataset, it is not changed
+            - workers(int): The number of processes, full_dataset_cleaning is used if 1
+            - partitions(int): The number of partitions, four per worker if None
+            - stats(PipelineStats): Collects the time, memory and rows of every step, summed
+              over the partitions, if given. The memory increase of the cleaning
+              steps is the largest one of the worker processes.
+            - compact, firm_sizes: see full_dataset_cleaning
+    Output: - cleaned(pd.df): The cleaned dataset
+    Raises: - KeyError if a column of the cleaning plan does not exist
+    """
+    if workers is None or workers <= 1:
+        return full_dataset_cleaning(
+            dataset=dataset, stats=stats, compact=compact, firm_sizes=firm_sizes
+        )
+    start = time.perf_counter()
+    value_counts = dataset["organization_location_name"].value_counts()
+    if partitions is None:
+        partitions = workers * 4
+    edges = np.linspace(0, len(dataset), partitions + 1).astype(np.int64)
+    bounds = [(a, b) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+    with fsm.SharedFrame(dataset) as shared:
+        if stats is not None:
+            stats.add(
+                pipeline="cleaning",
+                step="share_columns",
+                seconds=time.perf_counter() - start,
+                rows_in=len(dataset),
+                rows_out=len(dataset),
+            )
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=__init_worker,
+            initargs=(shared.description(), value_counts, firm_sizes),
+        ) as executor:
+            results = list(executor.map(__clean_partition, bounds))
+
+    start = time.perf_counter()
+    cleaned = pd.concat([result[0] for result in results])
+    cleaned.index = dataset.index[cleaned.index.to_numpy()]
+    if stats is not None:
+        # the memory of this process for combining, before the records of the workers
+        combine_increase, stats.rss = fp.step_memory(stats.rss)
+        for result in results:
+            for record in result[1].itertuples():
+                stats.add(
+                    pipeline=record.pipeline,
+                    step=record.step,
+                    seconds=record.seconds,
+                    rows_in=record.rows_in,
+                    rows_out=record.rows_out,
+                    accumulate=True,
+                    memory_increase_mb=(
+                        None
+                        if pd.isna(record.memory_increase_mb)
+                        else record.memory_increase_mb
+                    ),
+                )
+        stats.add(
+            pipeline="cleaning",
+            step="combine_partitions",
+            seconds=time.perf_counter() - start,
+            rows_in=len(cleaned),
+            rows_out=len(cleaned),
+            memory_increase_mb=combine_increase,
+        )
+    if compact:
+        cleaned = __compact_dtypes(cleaned, stats=stats)
+    return cleaned
+
+
+def row_dataset_cleaning(dataset, stats=None, compact=True, firm_sizes=None):
+    # the cleaning steps of full_dataset_cleaning without the unique location names.
+    # The rows, which full_dataset_cleaning keeps, are the rows of the result, whose
+    # organization_location_name appears more than once in the raw dataset.
+    cleaned = __run_cleaning_plan(
+        dataset=dataset,
+        plan=__plan_with_firm_sizes(ROW_CLEANING_PLAN, firm_sizes),
+        stats=stats,
+    )
+    if compact:
+        cleaned = __compact_dtypes(cleaned, stats=stats)
+    return cleaned
+
+
+def __plan_with_firm_sizes(plan, firm_sizes):
+    # the plan with the firm sizes, which are kept by the firm_size step
+    if firm_sizes is None:
+        return plan
+    return [
+        (
+            dict(step, filter=__keep_in(list(firm_sizes)))
+            if step["step"] == "firm_size"
+            else step
+        )
+        for step in plan
+    ]
+
+
+def full_dataset_cleaning(dataset, stats=None, compact=True, firm_sizes=None):
+    # call the individual cleaning steps in one function.
+    # The steps are combined in the cleaning plan, which filters all rows at once and
+    # gives the same result as calling the __clean_* functions one after the other.
+    # If a PipelineStats object is given, it collects the time, memory and rows per step.
+    # With compact, the cleaned dataset gets the compact dtypes of functions_dtypes
+    # (categoricals, small integers, float32 coordinates), which need much less memory.
+    # firm_sizes replaces FIRM_SIZES, the organization sizes which are kept.
+    cleaned = __run_cleaning_plan(
+        dataset=dataset,
+        plan=__plan_with_firm_sizes(CLEANING_PLAN, firm_sizes),
+        stats=stats,
+    )
+    if compact:
+        cleaned = __compact_dtypes(cleaned, stats=stats)
+    return cleaned
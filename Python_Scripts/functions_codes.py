@@ -0,0 +1,73 @@
+# Import the required libraries
+import numpy as np
+import pandas as pd
+
+# 10, 100, ..., 10**18: the smallest numbers with 2, 3, ..., 19 digits
+POWERS_OF_TEN = 10 ** np.arange(1, 19, dtype=np.int64)
+
+
+def code_digits(codes):
+    """
+    This function returns the number of digits of integer codes, 1 for the code 0.
+    Input:  - codes(np.array): The codes as non negative int64
+    Output: - digits(np.array): The number of digits of every code
+    Raises: None
+    """
+    return np.searchsorted(POWERS_OF_TEN, codes, side="right") + 1
+
+
+def code_prefixes(values, lengths):
+    """
+    This function computes the leading digits of hierarchical codes, like the ISCO codes,
+    where the first digits give the broader group. The prefixes are computed arithmetically
+    on the whole code array at once: the prefix of length k of a code with d digits is
+    code // 10**(d - k), codes with at most k digits stay as they are.
+    Decimals are cut off before, the sign is kept. Missing or not numeric values stay
+    missing.
+    Input:  - values(pd.Series): The codes
+            - lengths(list): The number of leading digits of every prefix
+    Output: - prefixes(dict): The prefixes for every length, as int64 Series or as float64
+              Series if values are missing, with the index of values
+    Raises: None
+    """
+    numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+    # codes, which do not fit into int64, are treated as missing
+    valid = np.isfinite(numbers) & (np.abs(numbers) < 2.0**63)
+    codes = np.zeros(len(numbers), dtype=np.int64)
+    codes[valid] = np.trunc(np.abs(numbers[valid])).astype(np.int64)
+    signs = np.where(numbers < 0, -1, 1)
+    digits = code_digits(codes)
+    prefixes = {}
+    for length in lengths:
+        shift = np.maximum(digits - length, 0)
+        prefix = signs * (codes // 10 ** shift.astype(np.int64))
+        if valid.all():
+            prefixes[length] = pd.Series(prefix, index=values.index)
+        else:
+            prefixes[length] = pd.Series(
+                np.where(valid, prefix, np.nan), index=values.index
+            )
+    return prefixes
+
+
+def code_aggregation(levels, name="{column}_agg_{level}"):
+    """
+    This function returns a column transformer, which adds the aggregation levels of a
+    hierarchical code column, like the filters of the cleaning plan add converted columns.
+    Input:  - levels(dict): The number of leading digits of every aggregation level,
+              like {1: 3, 2: 2} for the three and the two digit groups
+            - name(string): The name of the new columns, formatted with the name of
+              the code column and the level
+    Output: - transformer(function): Gets the code column and returns a dictionary with
+              the name and the values of every aggregation level
+    Raises: None
+    """
+
+    def transformer(values):
+        prefixes = code_prefixes(values, lengths=list(levels.values()))
+        return {
+            name.format(column=values.name, level=level): prefixes[length]
+            for level, length in levels.items()
+        }
+
+    return transformer
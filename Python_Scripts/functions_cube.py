@@ -0,0 +1,294 @@
+# Import the required libraries
+import numpy as np
+import pandas as pd
+import functions_io as fio
+
+# the distance bins of the interaction plots of the analysis notebook
+DISTANCE_BINS = [0, 100, 200, 300, 400, 500, 600, 700, 800, 900]
+DISTANCE_LABELS = [
+    "0-100",
+    "101-200",
+    "201-300",
+    "301-400",
+    "401-500",
+    "501-600",
+    "601-700",
+    "701-800",
+    "801-900",
+]
+
+# the groupings of the plots of the analysis notebook. The groupings of the interaction
+# plots (distance bins or language with one cluster) are roll-ups of the first one.
+GROUPING_SETS = [
+    [
+        "distance_bins",
+        "Applicant_language_cluster",
+        "contract_type_label_cluster",
+        "education_level_cluster",
+        "salary_dummy",
+    ],
+    ["region_value"],
+    ["quarter_of_date"],
+    ["profession_isco_code_value_agg_2"],
+    ["organization_ID"],
+]
+
+
+def add_distance_bins(data, bins=DISTANCE_BINS, labels=DISTANCE_LABELS):
+    """
+    This function adds the column distance_bins, the bin of the distance between job and
+    organization, like the interaction plots of the analysis notebook.
+    Input:  - data(pd.df): The final dataset
+            - bins(list): The edges of the bins in km
+            - labels(list): The names of the bins
+    Output: - data(pd.df): The dataset with the column distance_bins
+    Raises: None
+    """
+    return data.assign(
+        distance_bins=pd.cut(
+            data["distance_between_job_and_organization"],
+            bins=bins,
+            labels=labels,
+            include_lowest=True,
+        )
+    )
+
+
+def __group_values(uniques):
+    # the values of a grouping column as they are stored and their dtype in the cube.
+    # Categoricals keep the order of their categories, intervals become ordered strings.
+    # Integers and booleans become nullable, since the column is missing for the other
+    # groupings and for the rows with a missing value.
+    if isinstance(uniques, pd.CategoricalIndex):
+        return np.asarray(uniques, dtype=object), uniques.dtype
+    if isinstance(uniques, pd.IntervalIndex):
+        missing = np.asarray(uniques.isna())
+        labels = np.asarray(uniques.astype(str), dtype=object)
+        labels[missing] = np.nan
+        return labels, pd.CategoricalDtype(labels[~missing])
+    dtype = uniques.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in "iub":
+        dtype = pd.api.types.pandas_dtype(
+            "boolean"
+            if dtype.kind == "b"
+            else dtype.name.replace("uint", "UInt").replace("int", "Int")
+        )
+    return np.asarray(uniques, dtype=object), dtype
+
+
+def build_cube(data, value_column="log_duration", grouping_sets=GROUPING_SETS):
+    """
+    This function computes the count, mean and sum of squared deviations of a value for
+    every group of every grouping set, so that the grouped plots can be drawn from this
+    small table instead of the dataset. Every grouping column is factorized once, the
+    groups of a grouping set are then counted with np.bincount on the combined codes.
+    The groupings of subsets of a grouping set are computed from the cube by cube_table.
+    A missing grouping column is a group of its own, so that the roll-ups of cube_table
+    keep the rows, which are missing only in the other columns of the grouping set. Rows
+    with a missing value are not used.
+    Input:  - data(pd.df): The final dataset, with distance_bins (see add_distance_bins)
+            - value_column(string): The value, whose mean is plotted
+            - grouping_sets(list): The grouping columns of every grouping set
+    Output: - cube(pd.df): One row per group: "grouping" (the grouping columns joined by
+              "|"), the grouping columns (missing for the other groupings), "count",
+              "mean" and "m2"
+    Raises: - KeyError if a column does not exist
+    """
+    values = pd.to_numeric(data[value_column], errors="coerce").to_numpy(
+        dtype=np.float64
+    )
+    has_value = ~np.isnan(values)
+    # the sums of the deviations from the mean of all rows stay small
+    shift = values[has_value].mean() if has_value.any() else 0.0
+    deviations = np.where(has_value, values - shift, 0.0)
+
+    codes = {}
+    uniques = {}
+    dtypes = {}
+    for column in dict.fromkeys(column for group in grouping_sets for column in group):
+        codes[column], column_uniques = pd.factorize(
+            data[column], sort=True, use_na_sentinel=False
+        )
+        uniques[column], dtypes[column] = __group_values(column_uniques)
+
+    tables = []
+    for group in grouping_sets:
+        valid = has_value
+        key = np.zeros(len(data), dtype=np.int64)
+        for column in group:
+            key = key * len(uniques[column]) + codes[column]
+        groups, inverse = np.unique(key[valid], return_inverse=True)
+        count = np.bincount(inverse, minlength=len(groups))
+        sums = np.bincount(inverse, weights=deviations[valid], minlength=len(groups))
+        squares = np.bincount(
+            inverse, weights=deviations[valid] ** 2, minlength=len(groups)
+        )
+        table = {"grouping": "|".join(group)}
+        # the codes of every column back from the combined key, last column first
+        remainder = groups
+        for column in reversed(group):
+            table[column] = uniques[column][remainder % len(uniques[column])]
+            remainder = remainder // len(uniques[column])
+        table["count"] = count
+        table["mean"] = sums / count + shift
+        table["m2"] = squares - sums**2 / count
+        tables.append(pd.DataFrame(table))
+    cube = pd.concat(tables, ignore_index=True)
+    for column, dtype in dtypes.items():
+        # the dtypes of the dataset, also when the cube is written to parquet
+        if isinstance(dtype, pd.CategoricalDtype):
+            cube[column] = pd.Categorical(cube[column], dtype=dtype)
+        else:
+            cube[column] = cube[column].astype(dtype)
+    columns = ["grouping"] + list(uniques) + ["count", "mean", "m2"]
+    return cube[columns]
+
+
+def cube_table(cube, grouping, confidence=0.95):
+    """
+    This function returns the statistics of a grouping from the cube. A grouping, which is
+    not a grouping set of the cube, is rolled up from the smallest grouping set, which
+    contains all its columns: the counts are added and the means and the sums of squared
+    deviations are combined exactly. Like DataFrame.groupby, the groups with a missing
+    value of a grouping column are dropped.
+    Input:  - cube(pd.df): The result of build_cube or a cube read with read_cube
+            - grouping(list): The grouping columns, [] for all rows
+            - confidence(float): The level of the confidence intervals
+    Output: - table(pd.df): One row per group in the order of the values: the grouping
+              columns, "count", "mean", "variance", "std_error", "ci_low" and "ci_high".
+              The confidence interval is the t interval of the mean, nan for one row.
+    Raises: - KeyError if no grouping set contains the grouping columns
+    """
+    grouping = list(grouping)
+    sets = [name.split("|") for name in cube["grouping"].unique()]
+    containing = [group for group in sets if set(grouping) <= set(group)]
+    if not containing:
+        raise KeyError("No grouping set contains " + str(grouping))
+    source = min(containing, key=len)
+    rows = cube[cube["grouping"] == "|".join(source)]
+    rows = rows[rows[grouping].notna().all(axis=1).to_numpy()]
+    if grouping:
+        codes = rows.groupby(grouping, sort=True, observed=True).ngroup().to_numpy()
+    else:
+        codes = np.zeros(len(rows), dtype=np.int64)
+    # the groups are rolled up: the counts are added, the means and the sums of squared
+    # deviations are combined with the deviations of the group means
+    first = pd.Series(np.arange(len(rows))).groupby(codes).first().to_numpy()
+    count = np.bincount(codes, weights=rows["count"])
+    mean = np.bincount(codes, weights=rows["count"] * rows["mean"]) / count
+    m2 = np.bincount(
+        codes,
+        weights=rows["m2"] + rows["count"] * (rows["mean"] - mean[codes]) ** 2,
+    )
+    table = (
+        rows[grouping]
+        .iloc[first]
+        .reset_index(drop=True)
+        .assign(count=count.astype(np.int64), mean=mean, m2=m2)
+    )
+
+    # scipy.stats takes long to import, it is only imported for the intervals
+    from scipy import stats
+
+    count = table["count"].to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = table["m2"].to_numpy() / (count - 1)
+        std_error = np.sqrt(variance / count)
+        margin = stats.t.ppf(0.5 + confidence / 2, count - 1) * std_error
+    return table.drop(columns="m2").assign(
+        variance=variance,
+        std_error=std_error,
+        ci_low=table["mean"] - margin,
+        ci_high=table["mean"] + margin,
+    )
+
+
+def write_cube(cube, path):
+    """
+    This function writes the cube, see functions_io.write_dataset.
+    """
+    fio.write_dataset(data=cube, path=path)
+
+
+def read_cube(path):
+    """
+    This function reads a cube written by write_cube.
+    """
+    return fio.read_dataset(path)
+
+
+def plot_means(
+    cube,
+    x,
+    hue=None,
+    ax=None,
+    errorbar="ci",
+    confidence=0.95,
+    color="#7fc4d4",
+    xticks=True,
+):
+    """
+    This function draws the mean of the value with error bars for the groups of x, from
+    the cube and without the dataset: a bar plot like sns.barplot, or with hue one dodged
+    point per group of hue, like the interaction plots with so.Dot and so.Range.
+    matplotlib is only imported, when a plot is drawn.
+    Input:  - cube(pd.df): The result of build_cube or read_cube
+            - x(string): The grouping column on the x axis
+            - hue(string): The grouping column of the colors, no colors if None
+            - ax(matplotlib axes): The axes of the plot, a new figure if None
+            - errorbar(string): "ci" for the confidence interval of the mean, "sd" for the
+              standard deviation, no error bars if None
+            - confidence(float): The level of the confidence intervals
+            - color(string): The color of the bars without hue
+            - xticks(bool): Label the groups on the x axis, False for many groups
+    Output: - ax(matplotlib axes): The axes of the plot
+    Raises: - KeyError if no grouping set contains the columns
+            - ValueError if the errorbar is unknown
+    """
+    if errorbar not in ("ci", "sd", None):
+        raise ValueError("Unknown errorbar: " + str(errorbar))
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        ax = plt.subplots()[1]
+    grouping = [x] if hue is None else [x, hue]
+    table = cube_table(cube, grouping, confidence=confidence)
+    x_values = pd.unique(table[x])
+    positions = pd.Series(np.arange(len(x_values)), index=x_values)
+    if errorbar == "ci":
+        table = table.assign(low=table["ci_low"], high=table["ci_high"])
+    else:
+        spread = np.sqrt(table["variance"]) if errorbar == "sd" else np.nan
+        table = table.assign(low=table["mean"] - spread, high=table["mean"] + spread)
+    if hue is None:
+        ax.bar(
+            positions[table[x]].to_numpy(),
+            table["mean"],
+            yerr=np.asarray(
+                [table["mean"] - table["low"], table["high"] - table["mean"]]
+            ),
+            color=color,
+        )
+    else:
+        hue_values = pd.unique(table[hue])
+        width = 0.8 / len(hue_values)
+        for i, value in enumerate(hue_values):
+            rows = table[table[hue] == value]
+            ax.errorbar(
+                positions[rows[x]].to_numpy() - 0.4 + width * (i + 0.5),
+                rows["mean"],
+                yerr=np.asarray(
+                    [rows["mean"] - rows["low"], rows["high"] - rows["mean"]]
+                ),
+                fmt="o",
+                label=str(value),
+            )
+        ax.legend(title=hue)
+    if xticks:
+        ax.set_xticks(np.arange(len(x_values)))
+        ax.set_xticklabels([str(value) for value in x_values])
+    else:
+        ax.set_xticks([])
+    ax.set_xlabel(x)
+    ax.set_ylabel("mean")
+    return ax
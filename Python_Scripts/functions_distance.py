@@ -1,20 +1,68 @@
 # Import the required libraries
-from zipfile import ZipFile
+import logging
 import pandas as pd
 import numpy as np
-import os
-import pickle
-import sys
-import plotly.express as px
-import plotly.graph_objects as go
-import fuzzywuzzy as fw
-from fuzzywuzzy import fuzz
-import openpyxl
-import geopy
-from geopy import distance
-import statsmodels.formula.api as sm
-import plotly.graph_objects as go
-from scipy.stats import linregress
+import functions_matching as fm
+import functions_geodesic as fg
+import functions_match_cache as fmc
+import functions_io as fio
+import functions_dtypes as fd
+import functions_spatial as fsp
+
+logger = logging.getLogger(__name__)
+
+# the columns, which are kept in the final dataset
+USED_COLUMNS = [
+    "organization_location_name",
+    "advertiser_type_value",
+    "advertiser_type_label",
+    "posting_count",
+    "date",
+    "duration",
+    "via_intermediary",
+    "language",
+    "job_title",
+    "profession_value",
+    "profession_isco_code_value",
+    "profession_isco_code_label",
+    "location",
+    "location_name",
+    "region_value",
+    "region_label",
+    "education_level_value",
+    "education_level_label",
+    "contract_type_value",
+    "contract_type_label",
+    "working_hours_type_value",
+    "working_hours_type_label",
+    "hours_per_week_from",
+    "hours_per_week_to",
+    "salary",
+    "organization_industry_value",
+    "organization_industry_label",
+    "organization_size_value",
+    "organization_size_label",
+    "location_coordinates",
+    "organization_ID",
+    "contract_type_label_cluster",
+    "salary_dummy",
+    "Applicant_language_cluster",
+    "education_level_cluster",
+    "quarter_of_date",
+    "month_of_date",
+    "log_duration",
+    "Latitudal_coordinates_organization",
+    "Longitudinal_coordinates_organization",
+    "Fuzzy_Rating",
+    "latitudal_coordinates_job",
+    "longitudinal_coordinates_job",
+    "distance_between_job_and_organization",
+    "profession_isco_code_value_agg_1",
+    "profession_isco_code_value_agg_2",
+]
+
+# the lowest fuzzy rating of a matched city name, which is expected to be mapped rightly
+MIN_FUZZY_RATING = 85
 
 
 def __fill_in_gps_coordinates(df1, column1, df2, column2):
@@ -24,22 +72,34 @@ def __fill_in_gps_coordinates(df1, column1, df2, column2):
     df2: the Pandas dataframe containing the column to search for matching values
     column2: the name of the column in df2 to search for matching values
     update_column: the name of the column in df1 to update with values from df2
+
+    The values are looked up with one keyed join, the first row of df2 is used if a value
+    appears more than once. Rows without a match keep -1. The number of matched and missed
+    rows is written to the log.
     """
+    # index df2 by the key, keeping the first row for every value
+    lookup = df2.dropna(subset=[column2]).drop_duplicates(
+        subset=[column2], keep="first"
+    )
+    lookup = lookup.set_index(column2)
+    keys = df1[column1]
+    found = keys.isin(lookup.index)
     # initialize the longitudinal and the latidudinal columns
-    df1["Latitudal_coordinates_organization"] = -1
-    df1["Longitudinal_coordinates_organization"] = -1
-    df1["Fuzzy_Rating"] = -1
-    for index, row in df1.iterrows():
-        value = row[column1]
-        matches = df2[df2[column2] == value]
-        if not matches.empty:
-            df1.at[index, "Latitudal_coordinates_organization"] = matches.iloc[0][
-                "Latitudal_coordinates_organization"
-            ]
-            df1.at[index, "Longitudinal_coordinates_organization"] = matches.iloc[0][
-                "Longitudinal_coordinates_organization"
-            ]
-            df1.at[index, "Fuzzy_Rating"] = matches.iloc[0]["fuzzy_rating"]
+    df1["Latitudal_coordinates_organization"] = keys.map(
+        lookup["Latitudal_coordinates_organization"]
+    ).where(found, -1)
+    df1["Longitudinal_coordinates_organization"] = keys.map(
+        lookup["Longitudinal_coordinates_organization"]
+    ).where(found, -1)
+    df1["Fuzzy_Rating"] = (
+        keys.map(lookup["fuzzy_rating"]).where(found, -1).astype(np.int64)
+    )
+    matched = int(found.sum())
+    logger.info(
+        "GPS coordinates filled in: %d rows matched, %d rows missed",
+        matched,
+        len(df1) - matched,
+    )
     return df1
 
 
@@ -63,6 +123,26 @@ def __delete_rows_with_unique_values(dataframe, column_name):
     return dataframe
 
 
+# replace ÄÖÜß with ae,oe,ue, ss
+UMLAUT_TRANSLATION = str.maketrans(
+    {
+        "Ä": "ae",
+        "ä": "ae",
+        "Ö": "oe",
+        "ö": "oe",
+        "Ü": "ue",
+        "ü": "ue",
+        "ß": "ss",
+        "ẞ": "ss",
+    }
+)
+
+
+def __harmonize_name(name):
+    # lowercase, replace the umlauts and remove leading, trailing and multiple spaces
+    return " ".join(name.lower().translate(UMLAUT_TRANSLATION).split())
+
+
 def __harmonize_strings(df, column_name):
     """
     This function harmonizes the strings of the column given to it,
@@ -72,104 +152,128 @@ def __harmonize_strings(df, column_name):
         - removal of umlauts
         - make everything lowercase
         - removes rows with na
+    Every different string is harmonized only once, the result is mapped back to
+    the rows with the codes of the strings. Values, which are not strings, become na.
     Input: df(Pd.Datafr)
     """
-    # remove trailing or leading spaces
-    series = df[str(column_name)]
-    df[column_name] = series.str.strip()
-    # making the string lowercase
-    df[column_name] = df[column_name].str.lower()
-    # replace ÄÖÜß with ae,oe,ue, ss
-    dictOfStrings = {
-        "Ä": "Ae",
-        "ä": "ae",
-        "Ö": "Oe",
-        "ö": "oe",
-        "Ü": "ue",
-        "ü": "ue",
-        "ß": "ss",
-    }
-    for word, replacement in dictOfStrings.items():
-        df[column_name] = df[column_name].replace(word, replacement)
+    codes, uniques = pd.factorize(df[str(column_name)])
+    harmonized = [
+        __harmonize_name(name) if isinstance(name, str) else np.nan for name in uniques
+    ]
+    # the code -1 of the missing values takes the last element, which is na
+    harmonized = np.array(harmonized + [np.nan], dtype=object)
+    df[column_name] = harmonized[codes]
     df = df[df[column_name].notna()]
     return df
 
 
-def __find_gps_coordinates(df, gps_df, column_name_df, column_name_gps):
+def __find_gps_coordinates(
+    df, gps_df, column_name_df, column_name_gps, matcher=None, workers=1
+):
     """
     This function should find the city in Germany,
     given to the function in a spreadshet with gps coordinates. - it works with substrings as well.
     The function is based on a fuzyy searching algorithm, which works with a special distance measure
-    between strings.
+    between strings. The search itself is done by a CityMatcher, which is built only once
+    from the gazetteer and gives the same result as comparing every name with every city.
     Input:  - df(pd.df): The dataframe with the city names
             - gps_df : The dataframe with all german cities and their respective names
             - column_name_df(string): The name of the column with the city names
             - column_name_gps: The name of the column with the gps data
+            - matcher(CityMatcher): A matcher built from gps_df[column_name_gps], built here if None
+            - workers(int): The number of processes used for the matching
     Output:  - df: A dataframe with two new columns indicating the longitudinal and the latitudinal position of the cities
     Raises: None
     """
+    if matcher is None:
+        matcher = fm.CityMatcher(gps_df[column_name_gps])
+    indices, ratings = fm.parallel_match_many(
+        matcher=matcher, names=df[column_name_df], workers=workers
+    )
+    matched = indices != -1
     # initialize the longitudinal and the latidudinal columns
-    df["Latitudal_coordinates_organization"] = -1
-    df["Longitudinal_coordinates_organization"] = -1
-    df["best_match_name"] = "Nothing"
-    df["fuzzy_rating"] = 0
-    # loop through all elements in the column with the city names
-    for i, name_df in enumerate(df[column_name_df]):
-        # check, if the city name is in the list of german city names
-        # initialize the highest fuzz ratio and the index of the highest fuzz ratio
-        index_highest_fuzzy_ratio = -1
-        highest_fuzz = 0
-        # loop through the column with all the city names
-        for j, name_gps in enumerate(gps_df[column_name_gps]):
-            ratio = fuzz.ratio(str(name_df), str(name_gps))
-            if ratio > highest_fuzz:
-                highest_fuzz = ratio
-                index_highest_fuzzy_ratio = j
-            # for the highest fuzz index, get the gps coordinates
-
-        if index_highest_fuzzy_ratio != -1:
-            df.loc[i, "Latitudal_coordinates_organization"] = gps_df.loc[
-                index_highest_fuzzy_ratio, "Breitengrad"
-            ]
-            df.loc[i, "Longitudinal_coordinates_organization"] = gps_df.loc[
-                index_highest_fuzzy_ratio, "Längengrad"
-            ]
-            df.loc[i, "best_match_name"] = gps_df.loc[
-                index_highest_fuzzy_ratio, column_name_gps
-            ]
-            df.loc[i, "fuzzy_rating"] = highest_fuzz
-
+    latitudes = np.full(len(df), -1.0)
+    longitudes = np.full(len(df), -1.0)
+    best_match_names = np.full(len(df), "Nothing", dtype=object)
+    # for the highest fuzz index, get the gps coordinates
+    matched_rows = gps_df.iloc[indices[matched]]
+    latitudes[matched] = matched_rows["Breitengrad"].to_numpy()
+    longitudes[matched] = matched_rows["Längengrad"].to_numpy()
+    best_match_names[matched] = matched_rows[column_name_gps].to_numpy()
+    df["Latitudal_coordinates_organization"] = latitudes
+    df["Longitudinal_coordinates_organization"] = longitudes
+    df["best_match_name"] = best_match_names
+    df["fuzzy_rating"] = ratings
     return df
 
 
-def __find_best_match(df1, df2, col1, col2):
+def __find_best_match(df1, df2, col1, col2, workers=1):
     # create a dictionary to store the best match for each element in df1[col1]
     best_matches = {}
-
-    # loop through all the elements in df1[col1]
-    for element in df1[col1]:
-        # initialize the highest fuzz ratio and the best match
-        highest_fuzz = 0
-        best_match = None
-
-        # loop through all the elements in df2[col2]
-        for candidate in df2[col2]:
-            # calculate the fuzz ratio between the current element and candidate
-            ratio = fuzz.ratio(element, candidate)
-
-            # if the current candidate has a higher fuzz ratio than the current highest_fuzz,
-            # update the highest_fuzz and the best_match
-            if ratio > highest_fuzz:
-                highest_fuzz = ratio
-                best_match = candidate
-
-        # add the best match for the current element to the best_matches dictionary
-        best_matches[element] = best_match
+    # the matcher gives the candidate with the highest fuzz ratio, the first one for ties
+    matcher = fm.CityMatcher(df2[col2])
+    indices, ratings = fm.parallel_match_many(
+        matcher=matcher, names=df1[col1], workers=workers
+    )
+    for element, index in zip(df1[col1], indices):
+        best_matches[element] = df2[col2].iloc[index] if index != -1 else None
 
     # return the dictionary of best matches
     return best_matches
 
 
+def __resolve_city_names(city_names, gps_df, matcher=None, cache_path=None, workers=1):
+    """
+    This function finds the gps coordinates for the unique city names. If a cache file
+    is given, the names which were already matched against the same gazetteer are read
+    from the cache and only the new names go through __find_gps_coordinates.
+    Input:  - city_names(pd.df): The dataframe with the unique, harmonized city names
+            - gps_df(pd.df): The dataframe with all german cities and their gps coordinates
+            - matcher(CityMatcher): A matcher built from gps_df["Stadt"], built if needed
+            - cache_path(string): The path of the SQLite match cache, no cache is used if None
+            - workers(int): The number of processes used for the matching
+    Output: - city_names: The dataframe with the gps coordinates, in the order of the input
+    Raises: None
+    """
+    if cache_path is None:
+        return __find_gps_coordinates(
+            df=city_names,
+            gps_df=gps_df,
+            column_name_df="organization_location_name",
+            column_name_gps="Stadt",
+            matcher=matcher,
+            workers=workers,
+        )
+    cache = fmc.MatchCache(cache_path)
+    gazetteer_hash = fmc.gazetteer_hash(gps_df=gps_df, column_name_gps="Stadt")
+    cached = cache.lookup(city_names["organization_location_name"], gazetteer_hash)
+    new_names = city_names[
+        ~city_names["organization_location_name"].isin(
+            cached["organization_location_name"]
+        )
+    ].reset_index(drop=True)
+    logger.info(
+        "City names: %d read from the match cache, %d new names to match",
+        len(cached),
+        len(new_names),
+    )
+    if len(new_names) > 0:
+        new_names = __find_gps_coordinates(
+            df=new_names,
+            gps_df=gps_df,
+            column_name_df="organization_location_name",
+            column_name_gps="Stadt",
+            matcher=matcher,
+            workers=workers,
+        )
+        cache.store(matches=new_names, gazetteer_hash=gazetteer_hash)
+    # bring the names back into the order of the input
+    matches = pd.concat([cached, new_names], ignore_index=True)
+    return city_names[["organization_location_name"]].merge(
+        matches, on="organization_location_name", how="left"
+    )
+
+
 def __drop_not_used_columns(data, used_columns):
     all_columns = data.columns
     delta = [col for col in all_columns if col not in used_columns]
@@ -178,60 +282,279 @@ def __drop_not_used_columns(data, used_columns):
     return data
 
 
-def create_distance_measures(data, city_gps_match_data, used_columns):
+# The stages of create_distance_measures. Every stage gets the state of the computation,
+# a dictionary with the dataframes "data", "city_gps_match_data" and "city_names" and the
+# parameters of create_distance_measures in "options", and updates it.
+def __stage_harmonize_strings(state):
     ###### harmonizing the organization location name.
-    data = __harmonize_strings(df=data, column_name="organization_location_name")
-
+    state["data"] = __harmonize_strings(
+        df=state["data"], column_name="organization_location_name"
+    )
     ## hamonize the strings of the gps - city name spreadsheet
-    city_gps_match_data = __harmonize_strings(
-        df=city_gps_match_data, column_name="Stadt"
+    state["city_gps_match_data"] = __harmonize_strings(
+        df=state["city_gps_match_data"], column_name="Stadt"
     )
-    data = __delete_rows_with_unique_values(
-        dataframe=data, column_name="organization_location_name"
+
+
+def __stage_filter_locations(state):
+    state["data"] = __delete_rows_with_unique_values(
+        dataframe=state["data"], column_name="organization_location_name"
     )
-    data = data.dropna(subset=["location_coordinates"])
+    __stage_drop_missing_coordinates(state)
+
+
+def __stage_drop_missing_coordinates(state):
+    state["data"] = state["data"].dropna(subset=["location_coordinates"])
+
+
+def __stage_match_city_names(state):
+    options = state["options"]
     # create a dataframe with city names without duplicates, which is easier to loop over later
     city_names = pd.DataFrame(
-        {"organization_location_name": data["organization_location_name"].unique()}
+        {
+            "organization_location_name": state["data"][
+                "organization_location_name"
+            ].unique()
+        }
     )
     ## find the gps coordinates for all the unique city names
-    city_names = __find_gps_coordinates(
-        df=city_names,
-        gps_df=city_gps_match_data,
-        column_name_df="organization_location_name",
-        column_name_gps="Stadt",
+    city_names = __resolve_city_names(
+        city_names=city_names,
+        gps_df=state["city_gps_match_data"],
+        matcher=options["matcher"],
+        cache_path=options["cache_path"],
+        workers=options["workers"],
     )
-    city_names.to_excel("city_names_match.xlsx")
+    if options["match_output_path"] is not None:
+        fio.write_dataset(data=city_names, path=options["match_output_path"])
+    state["city_names"] = city_names
+
 
+def __stage_fill_in_coordinates(state):
     ## map the gps coordinates back
-    data = __fill_in_gps_coordinates(
-        df1=data,
-        df2=city_names,
+    state["data"] = __fill_in_gps_coordinates(
+        df1=state["data"],
+        df2=state["city_names"],
         column1="organization_location_name",
         column2="organization_location_name",
     )
 
+
+def __stage_spatial_fallback(state):
+    """
+    This stage matches the city names with a low fuzzy rating again, but only against the
+    cities of the gazetteer near the location of the job, with the token set ratio, which
+    ignores additional words in the name (see GazetteerIndex.match_nearby). A row is
+    rescued if the best nearby city has a rating of at least the minimal fuzzy rating, it
+    gets the coordinates and the rating of this city. Only used if
+    options["spatial_fallback_km"] is set, the number of rescued rows is written to the
+    log and to state["rescued_rows"].
+    The rescued rows have an organization near the job by construction, so they are not a
+    random sample of the dropped rows and shift the distances down.
+    """
+    radius_km = state["options"]["spatial_fallback_km"]
+    state["rescued_rows"] = 0
+    if radius_km is None:
+        return
+    min_fuzzy_rating = state["options"]["min_fuzzy_rating"]
+    if min_fuzzy_rating is None:
+        min_fuzzy_rating = MIN_FUZZY_RATING
+    data = state["data"]
+    low = np.flatnonzero(data["Fuzzy_Rating"].to_numpy() < min_fuzzy_rating)
+    if len(low) == 0:
+        return
+    latitudes, longitudes = __split_coordinates(
+        data["location_coordinates"].iloc[low], errors="coerce"
+    )
+    gps_df = state["city_gps_match_data"]
+    index = fsp.GazetteerIndex(
+        names=gps_df["Stadt"],
+        latitudes=gps_df["Breitengrad"],
+        longitudes=gps_df["Längengrad"],
+    )
+    indices, ratings = index.match_nearby(
+        names=data["organization_location_name"].iloc[low],
+        latitudes=latitudes,
+        longitudes=longitudes,
+        radius_km=radius_km,
+    )
+    rescued = ratings >= min_fuzzy_rating
+    rows = low[rescued]
+    matched_rows = gps_df.iloc[indices[rescued]]
+    for column, values in [
+        ("Latitudal_coordinates_organization", matched_rows["Breitengrad"]),
+        ("Longitudinal_coordinates_organization", matched_rows["Längengrad"]),
+        ("Fuzzy_Rating", ratings[rescued]),
+    ]:
+        updated = data[column].to_numpy().copy()
+        updated[rows] = np.asarray(values)
+        data[column] = updated
+    state["rescued_rows"] = len(rows)
+    logger.info(
+        "Spatial fallback: %d of %d rows with a fuzzy rating below %d rescued",
+        len(rows),
+        len(low),
+        min_fuzzy_rating,
+    )
+
+
+def __stage_filter_fuzzy_rating(state):
     # Only consider those rows, with a fuzzy rating above 85, since these I expect to b emapped rightly.
-    data = data[data["Fuzzy_Rating"] >= 85]
-    data["latitudal_coordinates_job"] = pd.to_numeric(
-        data["location_coordinates"].str.split(",", expand=True)[0]
-    )
-    data["longitudinal_coordinates_job"] = pd.to_numeric(
-        data["location_coordinates"].str.split(",", expand=True)[1]
-    )
-    data["distance_between_job_and_organization"] = -1
-    for i in range(len(data)):
-        cords1 = (
-            data["latitudal_coordinates_job"].iloc[i],
-            data["longitudinal_coordinates_job"].iloc[i],
-        )
-        cords2 = (
-            data["Latitudal_coordinates_organization"].iloc[i],
-            data["Longitudinal_coordinates_organization"].iloc[i],
-        )
-        data["distance_between_job_and_organization"].iloc[i] = geopy.distance.geodesic(
-            cords1, cords2
-        ).km
+    # The threshold is options["min_fuzzy_rating"], no row is dropped if it is None.
+    min_fuzzy_rating = state["options"]["min_fuzzy_rating"]
+    if min_fuzzy_rating is None:
+        return
+    data = state["data"]
+    state["data"] = data[data["Fuzzy_Rating"] >= min_fuzzy_rating]
+
+
+def __split_coordinates(values, errors="raise"):
+    # float64 also for compact (arrow string or categorical) coordinate columns
+    coordinates = values.astype(object).str.split(",", expand=True)
+    if coordinates.shape[1] < 2:
+        coordinates[1] = np.nan
+    latitudes = pd.to_numeric(coordinates[0], errors=errors).astype(np.float64)
+    longitudes = pd.to_numeric(coordinates[1], errors=errors).astype(np.float64)
+    return latitudes.to_numpy(), longitudes.to_numpy()
+
+
+def __stage_job_coordinates(state):
+    data = state["data"]
+    latitudes, longitudes = __split_coordinates(data["location_coordinates"])
+    data["latitudal_coordinates_job"] = latitudes
+    data["longitudinal_coordinates_job"] = longitudes
+
 
-    data = __drop_not_used_columns(data=data, used_columns=used_columns)
-    return [data, city_names]
+def __stage_distances(state):
+    data = state["data"]
+    data["distance_between_job_and_organization"] = fg.geodesic_distances(
+        data["latitudal_coordinates_job"].to_numpy(),
+        data["longitudinal_coordinates_job"].to_numpy(),
+        data["Latitudal_coordinates_organization"].to_numpy(),
+        data["Longitudinal_coordinates_organization"].to_numpy(),
+        method=state["options"]["distance_method"],
+    )
+
+
+def __stage_drop_columns(state):
+    state["data"] = __drop_not_used_columns(
+        data=state["data"], used_columns=state["options"]["used_columns"]
+    )
+
+
+def __stage_compact_dtypes(state):
+    if state["options"]["compact"]:
+        state["data"] = fd.compact_dtypes(state["data"])
+
+
+DISTANCE_STAGES = [
+    ("harmonize_strings", __stage_harmonize_strings),
+    ("filter_locations", __stage_filter_locations),
+    ("match_city_names", __stage_match_city_names),
+    ("fill_in_coordinates", __stage_fill_in_coordinates),
+    ("spatial_fallback", __stage_spatial_fallback),
+    ("filter_fuzzy_rating", __stage_filter_fuzzy_rating),
+    ("job_coordinates", __stage_job_coordinates),
+    ("distances", __stage_distances),
+    ("drop_columns", __stage_drop_columns),
+    ("compact_dtypes", __stage_compact_dtypes),
+]
+
+# The stages, which only look at the row itself: all stages without the unique location
+# names, which depend on the whole dataset. Used by the incremental mode.
+ROW_DISTANCE_STAGES = [
+    ("harmonize_strings", __stage_harmonize_strings),
+    ("drop_missing_coordinates", __stage_drop_missing_coordinates),
+    ("match_city_names", __stage_match_city_names),
+    ("fill_in_coordinates", __stage_fill_in_coordinates),
+    ("spatial_fallback", __stage_spatial_fallback),
+    ("filter_fuzzy_rating", __stage_filter_fuzzy_rating),
+    ("job_coordinates", __stage_job_coordinates),
+    ("distances", __stage_distances),
+    ("drop_columns", __stage_drop_columns),
+    ("compact_dtypes", __stage_compact_dtypes),
+]
+
+
+def new_distance_state(data, city_gps_match_data, **options):
+    """
+    This function creates the state, which the stages of create_distance_measures work on.
+    Input:  - data(pd.df): The cleaned vacancy dataset
+            - city_gps_match_data(pd.df): All german cities with their gps coordinates
+            - options: The parameters of create_distance_measures except data and
+              city_gps_match_data
+    Output: - state(dict): The state for the stages in DISTANCE_STAGES
+    Raises: None
+    """
+    return {
+        "data": data,
+        "city_gps_match_data": city_gps_match_data,
+        "city_names": None,
+        "options": options,
+    }
+
+
+def create_distance_measures(
+    data,
+    city_gps_match_data,
+    used_columns,
+    matcher=None,
+    distance_method="vincenty",
+    cache_path=None,
+    match_output_path="city_names_match.parquet",
+    workers=1,
+    stats=None,
+    compact=True,
+    spatial_fallback_km=None,
+    min_fuzzy_rating=MIN_FUZZY_RATING,
+):
+    """
+    This function computes the distance between the location of the job and the
+    headquarter of the organization, which posted the vacancy.
+    Input:  - data(pd.df): The cleaned vacancy dataset
+            - city_gps_match_data(pd.df): All german cities with their gps coordinates
+            - used_columns(list): The columns, which are kept in the final dataset
+            - matcher(CityMatcher): An already built matcher for the harmonized city names
+              of city_gps_match_data, which can be reused between runs. Built here if None.
+            - distance_method(string): "vincenty" for distances equal to geopy (below 1 mm)
+              or "haversine" for faster spherical distances (error at most about 0.6%)
+            - cache_path(string): The path of a SQLite file, in which the matched city names
+              are kept between runs. Only names not in the cache are matched. No cache if None.
+            - match_output_path(string): The file, in which the matched city names are saved,
+              in the format of the file extension (see functions_io.write_dataset). Not saved if None.
+            - workers(int): The number of processes used for the fuzzy matching of the city
+              names. The result is the same as with one process.
+            - stats(PipelineStats): Collects the time, memory and rows of every stage, if given
+            - compact(bool): Convert the final dataset to the compact dtypes of
+              functions_dtypes.compact_dtypes, with float32 coordinates. The distances
+              are computed before with float64 coordinates.
+            - spatial_fallback_km(float): Match the city names with a fuzzy rating below
+              min_fuzzy_rating again against the cities within this radius of the job and
+              keep the rows with a good match. Not used if None. The rescued organizations
+              are near the job by construction, which biases the distances of these rows.
+            - min_fuzzy_rating(int): The lowest fuzzy rating of the matched city names,
+              rows with a lower rating are dropped. No row is dropped if None.
+    Output: - [data, city_names]: The final dataset and the matched city names
+    Raises: None
+    """
+    state = new_distance_state(
+        data=data,
+        city_gps_match_data=city_gps_match_data,
+        used_columns=used_columns,
+        matcher=matcher,
+        distance_method=distance_method,
+        cache_path=cache_path,
+        match_output_path=match_output_path,
+        workers=workers,
+        compact=compact,
+        spatial_fallback_km=spatial_fallback_km,
+        min_fuzzy_rating=min_fuzzy_rating,
+    )
+    for name, stage in DISTANCE_STAGES:
+        if stats is None:
+            stage(state)
+        else:
+            with stats.measure("distance", name, len(state["data"])) as result:
+                stage(state)
+                result["rows_out"] = len(state["data"])
+    return [state["data"], state["city_names"]]
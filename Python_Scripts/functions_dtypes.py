@@ -0,0 +1,139 @@
+# Import the required libraries
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# the nullable integer types, from the smallest to the largest
+INTEGER_DTYPES = ["Int8", "Int16", "Int32", "Int64"]
+
+# The compact dtype of the columns of the cleaned and the final dataset. Integer columns get
+# the given nullable integer type, or a larger one if their values do not fit into it.
+COMPACT_DTYPES = {
+    "job_id": "Int64",
+    "organization_ID": "Int32",
+    "posting_count": "Int8",
+    "quarter_of_date": "Int8",
+    "month_of_date": "Int8",
+    "profession_isco_code_value": "Int32",
+    "profession_isco_code_value_agg_1": "Int16",
+    "profession_isco_code_value_agg_2": "Int8",
+    "hours_per_week_from": "Int16",
+    "hours_per_week_to": "Int16",
+    "Fuzzy_Rating": "Int8",
+    "salary_dummy": "bool",
+    "via_intermediary": "bool",
+    "organization_location_name": "category",
+    "language": "category",
+    "location": "category",
+    "location_name": "category",
+    "job_title": "string[pyarrow]",
+    "location_coordinates": "string[pyarrow]",
+    "Latitudal_coordinates_organization": "float32",
+    "Longitudinal_coordinates_organization": "float32",
+    "latitudal_coordinates_job": "float32",
+    "longitudinal_coordinates_job": "float32",
+}
+
+# the dtypes of the columns not in COMPACT_DTYPES, given by the end of the column name
+COMPACT_DTYPES_BY_SUFFIX = {
+    "_label": "category",
+    "_cluster": "category",
+    "_value": "Int32",
+}
+
+
+def compact_dtype(column):
+    """
+    This function returns the compact dtype of a column, or None if the column is kept as it is.
+    Input:  - column(string): The name of the column
+    Output: - dtype(string): The compact dtype of the column
+    Raises: None
+    """
+    if column in COMPACT_DTYPES:
+        return COMPACT_DTYPES[column]
+    for suffix, dtype in COMPACT_DTYPES_BY_SUFFIX.items():
+        if str(column).endswith(suffix):
+            return dtype
+    return None
+
+
+def __to_integer(values, dtype):
+    """
+    This function converts a numeric column to the nullable integer type dtype. A larger
+    integer type is used if the values do not fit and the column is kept as it is if it
+    has values, which are not whole numbers.
+    """
+    if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return values
+    present = values.dropna().to_numpy(dtype=np.float64)
+    if len(present) > 0 and not np.array_equal(present, np.round(present)):
+        logger.warning(
+            "%s has values, which are not whole numbers, it is kept as %s",
+            values.name,
+            values.dtype,
+        )
+        return values
+    low = present.min() if len(present) > 0 else 0
+    high = present.max() if len(present) > 0 else 0
+    for candidate in INTEGER_DTYPES[INTEGER_DTYPES.index(dtype) :]:
+        info = np.iinfo(candidate.lower())
+        if info.min <= low and high <= info.max:
+            if candidate != dtype:
+                logger.warning(
+                    "%s does not fit into %s, it is stored as %s",
+                    values.name,
+                    dtype,
+                    candidate,
+                )
+            return values.astype(candidate)
+    return values
+
+
+def compact_dtypes(data):
+    """
+    This function converts the columns of the vacancy dataset to compact dtypes, which take
+    much less memory than the object and float64 columns of the cleaning:
+        - the labels, clusters and other repetitive text columns become categoricals
+        - the text columns with mostly different values become arrow strings
+        - codes, counts and IDs become nullable small integers
+        - the dummies stay booleans and the coordinates become float32
+    The values stay the same, except for the coordinates, which are rounded to float32
+    (below 1 m in Germany). Columns, which are not in COMPACT_DTYPES and have no known
+    suffix, like the duration and the distance, are kept as they are.
+    Input:  - data(pd.df): The dataframe
+    Output: - data(pd.df): The dataframe with the compact dtypes
+    Raises: None
+    """
+    converted = {}
+    for column in data.columns:
+        dtype = compact_dtype(column)
+        values = data[column]
+        if dtype is None or values.dtype == dtype:
+            continue
+        if dtype in INTEGER_DTYPES:
+            converted[column] = __to_integer(values, dtype)
+        elif dtype == "bool":
+            # the dummies are only converted if they have no missing values
+            if values.notna().all():
+                converted[column] = values.astype(bool)
+        elif dtype == "float32":
+            converted[column] = pd.to_numeric(values, errors="coerce").astype(
+                np.float32
+            )
+        elif dtype == "category" and pd.api.types.is_numeric_dtype(values):
+            # only text columns become categoricals, numeric codes are kept
+            continue
+        else:
+            converted[column] = values.astype(dtype)
+    if not converted:
+        return data
+    return data.assign(**converted)
+
+
+def memory_usage_mb(data):
+    """
+    This function returns the memory of a dataframe in MB, including the strings.
+    """
+    return data.memory_usage(deep=True).sum() / 1024**2
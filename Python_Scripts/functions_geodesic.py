@@ -0,0 +1,148 @@
+# Import the required libraries
+import numpy as np
+
+# WGS-84 ellipsoid, the same one geopy.distance.geodesic uses by default
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+# mean earth radius in km for the haversine formula
+MEAN_EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_distances(lat1, lon1, lat2, lon2):
+    """
+    This function computes the great circle distance between two arrays of points
+    on a sphere with the mean earth radius. It is the fastest method, but it ignores
+    the flattening of the earth. The error compared to the ellipsoidal distance of geopy
+    is at most about 0.6% of the distance (around 0.35% for distances within Germany).
+    Input:  - lat1, lon1(np.array): The coordinates of the first points in degrees
+            - lat2, lon2(np.array): The coordinates of the second points in degrees
+    Output: - distances(np.array): The distances in km
+    Raises: None
+    """
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2)
+    )
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * MEAN_EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def vincenty_distances(lat1, lon1, lat2, lon2, max_iterations=200, tolerance=1e-12):
+    """
+    This function computes the distance between two arrays of points on the WGS-84
+    ellipsoid with the inverse formula of Vincenty, iterated for all points at once.
+    Compared to the Karney algorithm used by geopy.distance.geodesic the error is below
+    1 mm. For nearly antipodal points the iteration does not converge, these few
+    points are computed with geopy instead, so the result is always defined.
+    Input:  - lat1, lon1(np.array): The coordinates of the first points in degrees
+            - lat2, lon2(np.array): The coordinates of the second points in degrees
+            - max_iterations(int): The maximal number of iterations
+            - tolerance(float): The convergence criterion for the longitude on the auxiliary sphere
+    Output: - distances(np.array): The distances in km
+    Raises: None
+    """
+    lat1, lon1, lat2, lon2 = (
+        np.asarray(x, dtype=np.float64) for x in (lat1, lon1, lat2, lon2)
+    )
+    f = WGS84_F
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+    sin_U2, cos_U2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    sin_sigma = np.zeros_like(L)
+    cos_sigma = np.ones_like(L)
+    sigma = np.zeros_like(L)
+    cos_sq_alpha = np.ones_like(L)
+    cos_2sigma_m = np.zeros_like(L)
+    # missing coordinates are not iterated and stay missing
+    active = ~np.isnan(L + U1 + U2)
+    converged = ~active
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(max_iterations):
+            if not active.any():
+                break
+            sin_lam, cos_lam = np.sin(lam[active]), np.cos(lam[active])
+            s_U1, c_U1 = sin_U1[active], cos_U1[active]
+            s_U2, c_U2 = sin_U2[active], cos_U2[active]
+            s_sigma = np.sqrt(
+                (c_U2 * sin_lam) ** 2 + (c_U1 * s_U2 - s_U1 * c_U2 * cos_lam) ** 2
+            )
+            c_sigma = s_U1 * s_U2 + c_U1 * c_U2 * cos_lam
+            sig = np.arctan2(s_sigma, c_sigma)
+            # coincident points have a distance of zero
+            sin_alpha = np.where(s_sigma == 0, 0.0, c_U1 * c_U2 * sin_lam / s_sigma)
+            c_sq_alpha = 1 - sin_alpha**2
+            # points on the equator
+            c_2sigma_m = np.where(
+                c_sq_alpha == 0, 0.0, c_sigma - 2 * s_U1 * s_U2 / c_sq_alpha
+            )
+            C = f / 16 * c_sq_alpha * (4 + f * (4 - 3 * c_sq_alpha))
+            lam_new = L[active] + (1 - C) * f * sin_alpha * (
+                sig
+                + C * s_sigma * (c_2sigma_m + C * c_sigma * (-1 + 2 * c_2sigma_m**2))
+            )
+            sin_sigma[active] = s_sigma
+            cos_sigma[active] = c_sigma
+            sigma[active] = sig
+            cos_sq_alpha[active] = c_sq_alpha
+            cos_2sigma_m[active] = c_2sigma_m
+            done = np.abs(lam_new - lam[active]) < tolerance
+            lam[active] = lam_new
+            positions = np.flatnonzero(active)
+            converged[positions[done]] = True
+            active[positions[done]] = False
+
+    u_sq = cos_sq_alpha * (WGS84_A**2 - WGS84_B**2) / WGS84_B**2
+    A = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    B = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = (
+        B
+        * sin_sigma
+        * (
+            cos_2sigma_m
+            + B
+            / 4
+            * (
+                cos_sigma * (-1 + 2 * cos_2sigma_m**2)
+                - B
+                / 6
+                * cos_2sigma_m
+                * (-3 + 4 * sin_sigma**2)
+                * (-3 + 4 * cos_2sigma_m**2)
+            )
+        )
+    )
+    distances = WGS84_B * A * (sigma - delta_sigma) / 1000
+    distances[np.isnan(L + U1 + U2)] = np.nan
+    # fall back to the algorithm of Karney for points, where Vincenty did not converge.
+    # geopy is only imported, if such points exist (nearly antipodal points)
+    not_converged = np.flatnonzero(~converged)
+    if len(not_converged) > 0:
+        from geopy import distance
+    for i in not_converged:
+        distances[i] = distance.geodesic((lat1[i], lon1[i]), (lat2[i], lon2[i])).km
+    return distances
+
+
+def geodesic_distances(lat1, lon1, lat2, lon2, method="vincenty"):
+    """
+    This function computes the distances between two arrays of points in one call.
+    Input:  - lat1, lon1(np.array): The coordinates of the first points in degrees
+            - lat2, lon2(np.array): The coordinates of the second points in degrees
+            - method(string): "vincenty" for the ellipsoidal distance, which agrees with
+              geopy.distance.geodesic to below 1 mm, or "haversine" for the faster spherical
+              distance with an error of at most about 0.6%
+    Output: - distances(np.array): The distances in km
+    Raises: - ValueError if the method is unknown
+    """
+    if method == "vincenty":
+        return vincenty_distances(lat1, lon1, lat2, lon2)
+    if method == "haversine":
+        return haversine_distances(lat1, lon1, lat2, lon2)
+    raise ValueError("Unknown distance method: " + str(method))
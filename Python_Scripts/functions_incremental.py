@@ -0,0 +1,370 @@
+# Import the required libraries
+import json
+import logging
+import os
+import numpy as np
+import pandas as pd
+import functions_cleaning as fc
+import functions_distance as dcf
+import functions_dtypes as fd
+import functions_io as fio
+import functions_match_cache as fmc
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalStore:
+    """
+    This class keeps the cleaned postings and their distances between runs, so that a new
+    drop of vacancies only cleans and geocodes the new or changed postings. The postings
+    are identified by their job_id, a later version of a posting replaces the earlier one.
+
+    The only cleaning rule, which depends on the whole dataset, is the deletion of the
+    location names, which appear only once (__delete_rows_with_unique_values). The store
+    keeps the number of postings of every location name and updates it with every drop,
+    the postings are cleaned without this rule and the rule is applied when the cleaned
+    dataset is put together. The same is done with the harmonized location names of the
+    distance computation: the store keeps the number of postings of every pair of raw and
+    harmonized location name, so the harmonized names are counted among the cleaned
+    postings without a scan of the postings. The result is the same as cleaning and
+    geocoding the latest version of all postings at once, with the index of the datasets
+    being the job_id.
+    Raw rows without a job_id can not be updated and are not kept, they would be dropped
+    by the cleaning anyway, but they do not count for the location names.
+
+    The files of the store (parquet) are:
+        - raw_keys: the hash of the raw row and the raw location name of every posting
+        - city_counts: the number of postings of every raw location name
+        - postings: the postings after the cleaning steps, which only look at the row
+        - distance_keys: the raw hash, the raw and the harmonized location name of every
+          posting, for which the distances were computed
+        - name_counts: the number of postings of every pair of raw and harmonized
+          location name among the distance_keys
+        - distances: the postings after the distance stages, which only look at the row
+        - settings.json: the gazetteer and the parameters of the computed distances
+
+    Input:  - directory(string): The directory of the store, created if it does not exist
+    Raises: None
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.raw_keys = self.__read(
+            "raw_keys.parquet",
+            pd.DataFrame(
+                {
+                    "row_hash": pd.Series(dtype="uint64"),
+                    "organization_location_name": pd.Series(dtype=object),
+                }
+            ),
+        )
+        self.city_counts = self.__read(
+            "city_counts.parquet", pd.DataFrame({"count": pd.Series(dtype="int64")})
+        )["count"]
+        self.postings = self.__read("postings.parquet", pd.DataFrame())
+        self.distance_keys = self.__read(
+            "distance_keys.parquet",
+            pd.DataFrame(
+                {
+                    "row_hash": pd.Series(dtype="uint64"),
+                    "raw_location_name": pd.Series(dtype=object),
+                    "organization_location_name": pd.Series(dtype=object),
+                }
+            ),
+        )
+        self.name_counts = self.__read(
+            "name_counts.parquet", self.__pair_counts(self.distance_keys.iloc[0:0])
+        )["count"]
+        self.distances = self.__read("distances.parquet", pd.DataFrame())
+        settings_path = os.path.join(directory, "settings.json")
+        self.settings = None
+        if os.path.exists(settings_path):
+            with open(settings_path) as file:
+                self.settings = json.load(file)
+
+    def __read(self, name, empty):
+        path = os.path.join(self.directory, name)
+        return fio.read_dataset(path) if os.path.exists(path) else empty
+
+    def add_postings(self, data, stats=None):
+        """
+        This function cleans the new and changed postings of a drop and merges them into
+        the store. Postings, which are already in the store with the same values, are skipped.
+        Input:  - data(pd.df): The raw vacancies of the drop, with the columns of vacancies.csv
+                - stats(PipelineStats): Collects the time, memory and rows of every step, if given
+        Output: - changed(int): The number of new or changed postings
+        Raises: - KeyError if a column of the cleaning plan does not exist
+        """
+        keys = pd.to_numeric(data["job_id"], errors="coerce").to_numpy()
+        present = ~np.isnan(keys)
+        if not present.all():
+            logger.warning(
+                "%d postings without job_id are skipped", int((~present).sum())
+            )
+        # the last version of a posting in the drop wins
+        present &= ~pd.Series(keys).duplicated(keep="last").to_numpy()
+        data = data[present]
+        keys = keys[present]
+        hashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+
+        known = np.asarray(pd.Index(keys).isin(self.raw_keys.index))
+        changed = np.ones(len(keys), dtype=bool)
+        changed[known] = (
+            self.raw_keys["row_hash"].loc[keys[known]].to_numpy() != hashes[known]
+        )
+        data = data[changed].set_axis(pd.Index(keys[changed]))
+        logger.info(
+            "Postings: %d new or changed, %d unchanged",
+            len(data),
+            len(keys) - len(data),
+        )
+        if len(data) == 0:
+            return 0
+
+        # update the counts of the location names with the new and the replaced postings
+        replaced = self.raw_keys.loc[self.raw_keys.index.intersection(data.index)]
+        delta = (
+            data["organization_location_name"]
+            .value_counts()
+            .sub(replaced["organization_location_name"].value_counts(), fill_value=0)
+        )
+        counts = self.city_counts.add(delta, fill_value=0)
+        self.city_counts = counts[counts > 0].astype("int64").rename("count")
+
+        new_keys = pd.DataFrame(
+            {
+                "row_hash": hashes[changed],
+                "organization_location_name": data["organization_location_name"]
+                .astype(object)
+                .to_numpy(),
+            },
+            index=data.index,
+        )
+        self.raw_keys = self.__replace(self.raw_keys, new_keys)
+
+        # postings, which do not pass the cleaning any more, are removed
+        cleaned = fc.row_dataset_cleaning(dataset=data, stats=stats)
+        self.postings = self.__replace(
+            self.postings.drop(index=data.index, errors="ignore"), cleaned, compact=True
+        )
+        return len(data)
+
+    def __replace(self, frame, new_rows, compact=False):
+        # the rows of frame with the keys of new_rows are replaced, new keys are appended
+        frame = frame.drop(index=new_rows.index, errors="ignore")
+        if len(frame) == 0:
+            return new_rows
+        if len(new_rows) == 0:
+            return frame
+        frame = pd.concat([frame, new_rows])
+        # categoricals with different categories become objects in concat
+        return fd.compact_dtypes(frame) if compact else frame
+
+    def __pair_counts(self, distance_keys):
+        # the number of postings of every pair of raw and harmonized location name
+        return (
+            distance_keys.groupby(["raw_location_name", "organization_location_name"])
+            .size()
+            .astype("int64")
+            .rename("count")
+            .to_frame()
+        )
+
+    def __cleaned_keys(self):
+        # the postings, whose raw location name appears more than once
+        if len(self.postings) == 0:
+            return self.postings.index
+        counts = (
+            self.postings["organization_location_name"]
+            .astype(object)
+            .map(self.city_counts)
+            .fillna(0)
+            .to_numpy()
+        )
+        return self.postings.index[counts >= 2]
+
+    def cleaned_dataset(self):
+        """
+        This function returns the cleaned dataset, like full_dataset_cleaning on the latest
+        version of all postings, with the job_id as index.
+        """
+        return self.postings.loc[self.__cleaned_keys()]
+
+    def update_distances(
+        self,
+        city_gps_match_data,
+        used_columns,
+        matcher=None,
+        distance_method="vincenty",
+        cache_path=None,
+        workers=1,
+        compact=True,
+        stats=None,
+        spatial_fallback_km=None,
+        min_fuzzy_rating=dcf.MIN_FUZZY_RATING,
+    ):
+        """
+        This function computes the distances of the postings, which were added or changed
+        since the last call. All distances are computed again if the gazetteer or the
+        parameters changed. The parameters are the ones of create_distance_measures.
+        Input:  - city_gps_match_data(pd.df): All german cities with their gps coordinates
+                - used_columns(list): The columns, which are kept in the final dataset
+                - matcher(CityMatcher): An already built matcher, built if None
+                - distance_method(string): "vincenty" or "haversine"
+                - cache_path(string): The path of the SQLite match cache, no cache if None
+                - workers(int): The number of processes used for the fuzzy matching
+                - compact(bool): Convert the final dataset to the compact dtypes
+                - stats(PipelineStats): Collects the time, memory and rows of every stage
+                - spatial_fallback_km(float): The radius of the spatial fallback for city
+                  names with a low fuzzy rating, not used if None
+                - min_fuzzy_rating(int): The lowest fuzzy rating of the matched city names
+        Output: - [data, city_names]: The final dataset and the city names matched in this call
+        Raises: None
+        """
+        settings = {
+            "gazetteer_hash": fmc.gazetteer_hash(
+                gps_df=city_gps_match_data, column_name_gps="Stadt"
+            ),
+            "distance_method": distance_method,
+            "used_columns": list(used_columns),
+            "compact": compact,
+            "spatial_fallback_km": spatial_fallback_km,
+            "min_fuzzy_rating": min_fuzzy_rating,
+        }
+        if settings != self.settings:
+            logger.info("Gazetteer or parameters changed, all distances are computed")
+            self.distance_keys = self.distance_keys.iloc[0:0]
+            self.name_counts = self.name_counts.iloc[0:0]
+            self.distances = pd.DataFrame()
+            self.settings = settings
+
+        # postings, which are new, changed or removed since the distances were computed
+        raw_hashes = self.raw_keys["row_hash"].loc[self.postings.index]
+        computed = np.asarray(self.postings.index.isin(self.distance_keys.index))
+        pending = ~computed
+        pending[computed] = (
+            self.distance_keys["row_hash"].loc[self.postings.index[computed]].to_numpy()
+            != raw_hashes.to_numpy()[computed]
+        )
+        pending_keys = self.postings.index[pending]
+        stale = self.distance_keys.index.difference(self.postings.index[computed])
+        removed = self.distance_keys.index.intersection(stale.union(pending_keys))
+        self.__update_name_counts(removed=self.distance_keys.loc[removed])
+        self.distance_keys = self.distance_keys.drop(index=removed)
+        self.distances = self.distances.drop(
+            index=self.distances.index.intersection(stale.union(pending_keys))
+        )
+        logger.info("Distances: %d postings to compute", len(pending_keys))
+
+        city_names = None
+        if len(pending_keys) > 0:
+            state = dcf.new_distance_state(
+                data=self.postings.loc[pending_keys].copy(),
+                city_gps_match_data=city_gps_match_data.copy(),
+                used_columns=used_columns,
+                matcher=matcher,
+                distance_method=distance_method,
+                cache_path=cache_path,
+                match_output_path=None,
+                workers=workers,
+                compact=compact,
+                spatial_fallback_km=spatial_fallback_km,
+                min_fuzzy_rating=min_fuzzy_rating,
+            )
+            for name, stage in dcf.ROW_DISTANCE_STAGES:
+                rows_in = len(state["data"])
+                if stats is None:
+                    stage(state)
+                else:
+                    with stats.measure("distance", name, rows_in) as result:
+                        stage(state)
+                        result["rows_out"] = len(state["data"])
+                if name == "harmonize_strings":
+                    harmonized = state["data"]["organization_location_name"]
+            new_keys = pd.DataFrame(
+                {
+                    "row_hash": raw_hashes.loc[pending_keys].to_numpy(),
+                    "raw_location_name": self.raw_keys["organization_location_name"]
+                    .loc[pending_keys]
+                    .to_numpy(),
+                    "organization_location_name": harmonized.reindex(
+                        pending_keys
+                    ).to_numpy(),
+                },
+                index=pending_keys,
+            )
+            self.__update_name_counts(added=new_keys)
+            self.distance_keys = self.__replace(self.distance_keys, new_keys)
+            self.distances = self.__replace(
+                self.distances, state["data"], compact=compact
+            )
+            city_names = state["city_names"]
+        return [self.final_dataset(), city_names]
+
+    def __update_name_counts(self, added=None, removed=None):
+        # the counts of the pairs of location names with the added and removed distance keys
+        counts = self.name_counts
+        if added is not None:
+            counts = counts.add(self.__pair_counts(added)["count"], fill_value=0)
+        if removed is not None:
+            counts = counts.sub(self.__pair_counts(removed)["count"], fill_value=0)
+        self.name_counts = counts[counts > 0].astype("int64").rename("count")
+
+    def final_dataset(self):
+        """
+        This function returns the final dataset, like create_distance_measures on the
+        cleaned dataset, with the job_id as index.
+        """
+        # the postings of a harmonized name among the cleaned postings are the postings of
+        # its pairs, whose raw location name appears more than once
+        raw_counts = (
+            self.city_counts.reindex(self.name_counts.index.get_level_values(0))
+            .fillna(0)
+            .to_numpy()
+        )
+        harmonized_counts = self.name_counts[raw_counts >= 2].groupby(level=1).sum()
+        names = (
+            self.distance_keys["organization_location_name"]
+            .reindex(self.__cleaned_keys())
+            .dropna()
+        )
+        counts = names.map(harmonized_counts).fillna(0).to_numpy()
+        kept = names.index[counts >= 2]
+        order = self.postings.index[
+            self.postings.index.isin(kept)
+            & self.postings.index.isin(self.distances.index)
+        ]
+        return self.distances.loc[order]
+
+    def save(self):
+        """
+        This function writes the store to its directory.
+        """
+        fio.write_dataset(
+            data=self.raw_keys,
+            path=os.path.join(self.directory, "raw_keys.parquet"),
+        )
+        fio.write_dataset(
+            data=self.city_counts.to_frame(),
+            path=os.path.join(self.directory, "city_counts.parquet"),
+        )
+        fio.write_dataset(
+            data=self.postings,
+            path=os.path.join(self.directory, "postings.parquet"),
+        )
+        fio.write_dataset(
+            data=self.distance_keys,
+            path=os.path.join(self.directory, "distance_keys.parquet"),
+        )
+        fio.write_dataset(
+            data=self.name_counts.to_frame(),
+            path=os.path.join(self.directory, "name_counts.parquet"),
+        )
+        fio.write_dataset(
+            data=self.distances,
+            path=os.path.join(self.directory, "distances.parquet"),
+        )
+        if self.settings is not None:
+            with open(os.path.join(self.directory, "settings.json"), "w") as file:
+                json.dump(self.settings, file, indent=2)
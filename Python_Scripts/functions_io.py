@@ -0,0 +1,194 @@
+# Import the required libraries
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def to_columnar(data):
+    """
+    This function prepares a dataframe for the columnar formats: the label columns
+    are stored as categoricals, since they only have a few different values.
+    Input:  - data(pd.df): The dataframe
+    Output: - data(pd.df): The dataframe with categorical label columns
+    Raises: None
+    """
+    label_columns = [
+        column
+        for column in data.columns
+        if str(column).endswith("_label") and data[column].dtype == object
+    ]
+    if label_columns:
+        data = data.astype({column: "category" for column in label_columns})
+    return data
+
+
+def write_dataset(data, path):
+    """
+    This function writes a dataframe in the format given by the file extension.
+    Parquet (.parquet) and Feather (.feather) keep the dtypes, like the categorical label
+    columns, dates and booleans. Csv (.csv) and Excel (.xlsx) are kept for the export.
+    Input:  - data(pd.df): The dataframe
+            - path(string): The path of the file
+    Output: None
+    Raises: - ValueError if the file extension is unknown
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        to_columnar(data).to_parquet(path)
+    elif extension == ".feather":
+        # feather can not store the index, it is kept as a column
+        to_columnar(data).reset_index().to_feather(path)
+    elif extension == ".csv":
+        data.to_csv(path)
+    elif extension == ".xlsx":
+        data.to_excel(path)
+    else:
+        raise ValueError("Unknown file format: " + str(path))
+
+
+def __arrow_strings(data):
+    # pandas reads the arrow string columns back as python strings, which need much more memory
+    strings = [
+        column
+        for column, dtype in data.dtypes.items()
+        if isinstance(dtype, pd.StringDtype) and dtype.storage == "python"
+    ]
+    if strings:
+        data = data.astype({column: "string[pyarrow]" for column in strings})
+    return data
+
+
+def read_dataset(path, columns=None):
+    """
+    This function reads a dataframe written by write_dataset.
+    Input:  - path(string): The path of the file
+            - columns(list): The columns to read, all columns if None
+    Output: - data(pd.df): The dataframe
+    Raises: - ValueError if the file extension is unknown
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        return __arrow_strings(pd.read_parquet(path, columns=columns))
+    if extension == ".feather":
+        data = __arrow_strings(pd.read_feather(path))
+        data = data.set_index(data.columns[0]).rename_axis(None)
+        return data if columns is None else data[columns]
+    if extension == ".csv":
+        return pd.read_csv(path, usecols=columns)
+    if extension == ".xlsx":
+        return pd.read_excel(path, usecols=columns)
+    raise ValueError("Unknown file format: " + str(path))
+
+
+def iter_dataset(path, columns=None, chunksize=500000):
+    """
+    This function reads a dataframe written by write_dataset chunk by chunk, so that a file,
+    which does not fit into the memory, can be processed. Parquet is read by record batches
+    with only the given columns, csv with pandas chunks, the other formats at once.
+    Input:  - path(string): The path of the file
+            - columns(list): The columns to read, all columns if None
+            - chunksize(int): The number of rows of a chunk
+    Output: - chunks(generator): The chunks as dataframes, with the dtypes of read_dataset
+    Raises: - ValueError if the file extension is unknown
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        file = pq.ParquetFile(path)
+        for batch in file.iter_batches(batch_size=chunksize, columns=columns):
+            yield __arrow_strings(batch.to_pandas())
+    elif extension == ".csv":
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+    else:
+        yield read_dataset(path, columns=columns)
+
+
+class ParquetChunkWriter:
+    """
+    This class writes a dataframe chunk by chunk into one parquet file. Text columns are
+    always stored as strings and label columns as categoricals. The schema is taken from
+    the first chunk and widened, when a later chunk needs a larger type, like a column,
+    which is Int16 in the first chunk and float64 in a later one (see
+    functions_dtypes.compact_dtypes). Then the rows written so far are rewritten once with
+    the wider schema, so the file has the same dtypes as write_dataset of all chunks at once.
+
+    Input:  - path(string): The path of the parquet file, it is overwritten
+    Raises: None
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.schema = None
+        self.writer = None
+        # the pandas dtype of every column of the schema, for the metadata of the file
+        self.dtypes = None
+
+    def __arrow_schema(self, table):
+        # the schema of a chunk without the pandas metadata, text as strings
+        fields = []
+        for field in table.schema:
+            if pa.types.is_null(field.type) or pa.types.is_string(field.type):
+                field = field.with_type(pa.string())
+            elif pa.types.is_dictionary(field.type) and (
+                pa.types.is_null(field.type.value_type)
+                or pa.types.is_string(field.type.value_type)
+            ):
+                field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+            fields.append(field)
+        return pa.schema(fields)
+
+    def __open(self, data, schema, dtypes):
+        # a writer with the schema and the pandas metadata of the given dtypes
+        metadata = pa.Schema.from_pandas(
+            data.iloc[:0].astype(dtypes), preserve_index=True
+        ).metadata
+        self.schema = schema.with_metadata(metadata)
+        self.dtypes = dtypes
+        self.writer = pq.ParquetWriter(self.path, self.schema)
+
+    def write(self, data):
+        """
+        This function appends the rows of a chunk to the file.
+        Input:  - data(pd.df): The chunk, with the same columns as the first chunk
+        Output: None
+        Raises: - pa.ArrowTypeError if a column has types, which can not be combined, like
+                  numbers in one chunk and text in another
+        """
+        data = to_columnar(data)
+        table = pa.Table.from_pandas(data, preserve_index=True)
+        schema = self.__arrow_schema(table)
+        dtypes = data.dtypes.to_dict()
+        if self.schema is None:
+            self.__open(data, schema, dtypes)
+        else:
+            current = pa.schema(list(self.schema))
+            wider = pa.unify_schemas([current, schema], promote_options="permissive")
+            if not wider.equals(current):
+                self.__widen(data, wider, schema, dtypes)
+        table = table.select(self.schema.names).cast(self.schema)
+        self.writer.write_table(table)
+
+    def __widen(self, data, wider, schema, dtypes):
+        # the pandas dtype of a widened column is the one of the chunk with the wider type
+        widened = dict(dtypes)
+        for column in dtypes:
+            field = wider.field(str(column))
+            if field.type.equals(self.schema.field(str(column)).type):
+                widened[column] = self.dtypes[column]
+            elif not field.type.equals(schema.field(str(column)).type):
+                widened[column] = field.type.to_pandas_dtype()
+        # the rows written so far are copied into a new file with the wider schema
+        self.writer.close()
+        previous = self.path + ".previous"
+        os.replace(self.path, previous)
+        self.__open(data, wider, widened)
+        for batch in pq.ParquetFile(previous).iter_batches():
+            self.writer.write_table(pa.Table.from_batches([batch]).cast(self.schema))
+        os.remove(previous)
+
+    def close(self):
+        if self.writer is None:
+            # nothing was written, write an empty file
+            pd.DataFrame().to_parquet(self.path)
+        else:
+            self.writer.close()
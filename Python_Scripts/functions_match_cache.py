@@ -0,0 +1,89 @@
+# Import the required libraries
+import hashlib
+import sqlite3
+import pandas as pd
+
+MATCH_COLUMNS = [
+    "Latitudal_coordinates_organization",
+    "Longitudinal_coordinates_organization",
+    "best_match_name",
+    "fuzzy_rating",
+]
+
+
+def gazetteer_hash(gps_df, column_name_gps):
+    """
+    This function computes a hash of the gazetteer, so that cached matches are only
+    reused for exactly the same (harmonized) city names and gps coordinates.
+    Input:  - gps_df(pd.df): The dataframe with all german cities and their gps coordinates
+            - column_name_gps(string): The name of the column with the city names
+    Output: - hash(string): The hex digest of the gazetteer
+    Raises: None
+    """
+    content = gps_df[[column_name_gps, "Breitengrad", "Längengrad"]]
+    row_hashes = pd.util.hash_pandas_object(content, index=False)
+    return hashlib.sha256(row_hashes.to_numpy().tobytes()).hexdigest()
+
+
+class MatchCache:
+    """
+    This class stores the result of the fuzzy matching of city names in a SQLite file.
+    Every match is keyed by the harmonized city name and the hash of the gazetteer it was
+    matched against, so a changed gazetteer never returns stale matches.
+
+    Input:  - path(string): The path of the SQLite file, which is created if it does not exist
+    Raises: None
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS city_matches (
+                    gazetteer_hash TEXT NOT NULL,
+                    organization_location_name TEXT NOT NULL,
+                    Latitudal_coordinates_organization REAL,
+                    Longitudinal_coordinates_organization REAL,
+                    best_match_name TEXT,
+                    fuzzy_rating INTEGER,
+                    PRIMARY KEY (gazetteer_hash, organization_location_name)
+                )
+                """)
+
+    def lookup(self, names, gazetteer_hash):
+        """
+        This function returns the cached matches for the given city names.
+        Input:  - names(list or pd.Series): The harmonized city names
+                - gazetteer_hash(string): The hash of the gazetteer
+        Output: - matches(pd.df): One row per cached name, with the column
+                  organization_location_name and the match columns
+        Raises: None
+        """
+        with sqlite3.connect(self.path) as connection:
+            cached = pd.read_sql_query(
+                "SELECT * FROM city_matches WHERE gazetteer_hash = ?",
+                connection,
+                params=(gazetteer_hash,),
+            )
+        cached = cached.drop(columns=["gazetteer_hash"])
+        return cached[cached["organization_location_name"].isin(pd.Series(names))]
+
+    def store(self, matches, gazetteer_hash):
+        """
+        This function writes new matches to the cache.
+        Input:  - matches(pd.df): The output of __find_gps_coordinates, with the column
+                  organization_location_name and the match columns
+                - gazetteer_hash(string): The hash of the gazetteer
+        Output: None
+        Raises: None
+        """
+        rows = matches[["organization_location_name"] + MATCH_COLUMNS].copy()
+        rows.insert(0, "gazetteer_hash", gazetteer_hash)
+        rows["organization_location_name"] = rows["organization_location_name"].astype(
+            str
+        )
+        with sqlite3.connect(self.path) as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO city_matches VALUES (?, ?, ?, ?, ?, ?)",
+                rows.astype(object).itertuples(index=False, name=None),
+            )
@@ -0,0 +1,141 @@
+# Import the required libraries
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from fuzzywuzzy import fuzz
+
+
+class CityMatcher:
+    """
+    This class finds the best fuzzy match for a city name in the list of german
+    cities (the gazetteer). It returns exactly the same match as comparing the name
+    with fuzz.ratio against every city in the gazetteer, but it is built only once
+    and prunes most of the candidates before the expensive fuzz.ratio is computed.
+
+    The index stores for every city the count of each character and the length of
+    the name. Since fuzz.ratio is 2*M/T, where M is the number of matching characters
+    and T the sum of both lengths, the character overlap between the two names gives an
+    upper bound on the ratio. Candidates are visited in order of this bound and the search
+    stops as soon as no remaining candidate can beat the best ratio found so far.
+    Ties are resolved like the brute force loop: the first city in the gazetteer wins.
+
+    Input:  - names(list or pd.Series): The city names of the gazetteer, in gazetteer order
+    Raises: None
+    """
+
+    def __init__(self, names):
+        self.names = [str(name) for name in names]
+        # the alphabet contains all characters, which appear in the gazetteer
+        alphabet = sorted(set("".join(self.names)))
+        self.char_position = {char: i for i, char in enumerate(alphabet)}
+        self.char_counts = np.zeros((len(self.names), len(alphabet)), dtype=np.int16)
+        for i, name in enumerate(self.names):
+            for char in name:
+                self.char_counts[i, self.char_position[char]] += 1
+        self.lengths = np.array([len(name) for name in self.names], dtype=np.int64)
+        # first position of every name, used for exact matches and empty strings
+        self.first_position = {}
+        for i, name in enumerate(self.names):
+            self.first_position.setdefault(name, i)
+
+    def _upper_bounds(self, name):
+        """
+        Returns the upper bound of fuzz.ratio(name, city) for every city in the gazetteer.
+        """
+        query_counts = np.zeros(self.char_counts.shape[1], dtype=np.int16)
+        for char in name:
+            position = self.char_position.get(char)
+            if position is not None:
+                query_counts[position] += 1
+        overlap = np.minimum(self.char_counts, query_counts).sum(axis=1)
+        total_length = self.lengths + len(name)
+        # ceil instead of round keeps the bound above the rounded ratio of fuzzywuzzy
+        return np.ceil(100 * (2.0 * overlap / total_length))
+
+    def match(self, name):
+        """
+        This function finds the best match for one city name.
+        Input:  - name(string): The city name to be matched
+        Output: - (index, rating): The position of the best match in the gazetteer and its
+                  fuzzy rating. The index is -1, if no city has a rating above 0.
+        Raises: None
+        """
+        name = str(name)
+        if len(self.names) == 0:
+            return -1, 0
+        # fuzz.ratio is 100 for equal strings and 0 if one of the strings is empty
+        if len(name) == 0:
+            return self.first_position.get(name, -1), (
+                100 if name in self.first_position else 0
+            )
+        bounds = self._upper_bounds(name)
+        # visit the candidates with the highest bound first, in gazetteer order for equal bounds
+        order = np.lexsort((np.arange(len(bounds)), -bounds))
+        best_index = -1
+        best_rating = 0
+        for j in order:
+            bound = bounds[j]
+            if bound < best_rating or bound == 0:
+                break
+            if bound == best_rating and j > best_index:
+                continue
+            rating = fuzz.ratio(name, self.names[j])
+            if rating > best_rating or (
+                rating == best_rating and rating > 0 and j < best_index
+            ):
+                best_rating = rating
+                best_index = j
+        return best_index, best_rating
+
+    def match_many(self, names):
+        """
+        This function finds the best matches for a list of city names.
+        Input:  - names(list or pd.Series): The city names to be matched
+        Output: - indices(np.array): The positions of the best matches in the gazetteer (-1 for no match)
+                - ratings(np.array): The fuzzy ratings of the best matches
+        Raises: None
+        """
+        results = [self.match(name) for name in names]
+        indices = np.array([result[0] for result in results], dtype=np.int64)
+        ratings = np.array([result[1] for result in results], dtype=np.int64)
+        return indices, ratings
+
+
+# the matcher of a worker process, it is sent once to every worker
+_worker_matcher = None
+
+
+def __init_worker(matcher):
+    global _worker_matcher
+    _worker_matcher = matcher
+
+
+def __match_shard(names):
+    return _worker_matcher.match_many(names)
+
+
+def parallel_match_many(matcher, names, workers):
+    """
+    This function finds the best matches for a list of city names on several processes.
+    The names are split into contiguous shards and the matcher is sent only once to every
+    worker. Since every name is matched independently and the shards are put back together
+    in their order, the result is exactly the same as matcher.match_many(names).
+    Input:  - matcher(CityMatcher): The matcher of the gazetteer
+            - names(list or pd.Series): The city names to be matched
+            - workers(int): The number of processes, the names are matched in this process if 1
+    Output: - indices(np.array): The positions of the best matches in the gazetteer (-1 for no match)
+            - ratings(np.array): The fuzzy ratings of the best matches
+    Raises: None
+    """
+    names = list(names)
+    if workers is None or workers <= 1 or len(names) == 0:
+        return matcher.match_many(names)
+    # a few shards per worker, so that the workers stay busy until the end
+    shards = np.array_split(np.arange(len(names)), workers * 4)
+    shards = [[names[i] for i in shard] for shard in shards if len(shard) > 0]
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=__init_worker, initargs=(matcher,)
+    ) as executor:
+        results = list(executor.map(__match_shard, shards))
+    indices = np.concatenate([result[0] for result in results])
+    ratings = np.concatenate([result[1] for result in results])
+    return indices, ratings
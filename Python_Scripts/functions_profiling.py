@@ -0,0 +1,239 @@
+# Import the required libraries
+import json
+import logging
+import platform
+import time
+from contextlib import contextmanager
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # not available on windows
+    resource = None
+try:
+    import psutil
+except ImportError:
+    # only needed for the memory of the steps on systems without /proc
+    psutil = None
+
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_mb():
+    """
+    This function returns the highest resident memory of the process so far in MB,
+    or None if it can not be measured on this system.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return peak / 1024**2 if platform.system() == "Darwin" else peak / 1024
+
+
+def __proc_memory():
+    # the current and the highest resident memory since the last reset in MB, linux only
+    try:
+        values = {}
+        with open("/proc/self/status") as file:
+            for line in file:
+                name, _, value = line.partition(":")
+                if name in ("VmRSS", "VmHWM"):
+                    values[name] = int(value.split()[0]) / 1024
+        return values["VmRSS"], values["VmHWM"]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def __reset_peak():
+    # sets the highest resident memory of the process to the current one, linux only
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def start_memory():
+    """
+    This function starts the memory measurement of a step, see step_memory.
+    Output: - rss(float): The resident memory of the process in MB, None if it can not be
+              measured on this system
+    """
+    memory = __proc_memory()
+    if memory is not None and __reset_peak():
+        return memory[0]
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1024**2
+    return memory[0] if memory is not None else None
+
+
+def step_memory(start_rss):
+    """
+    This function measures the memory of a step, which started with start_memory or with
+    the previous call of step_memory, and starts the measurement of the next step.
+    Where the highest resident memory can be reset (linux), the increase is the highest
+    resident memory during the step minus the resident memory at its start. Otherwise it is
+    the resident memory at the end minus the one at the start of the step.
+    Input:  - start_rss(float): The resident memory at the start of the step in MB
+    Output: - increase(float): The increase of the memory during the step in MB, None if it
+              can not be measured on this system
+            - rss(float): The resident memory at the end of the step in MB, the start of
+              the next step
+    """
+    memory = __proc_memory()
+    if memory is not None and __reset_peak():
+        rss, peak = memory
+        start = rss if start_rss is None else start_rss
+        return max(peak - start, 0.0), rss
+    if psutil is not None:
+        rss = psutil.Process().memory_info().rss / 1024**2
+    else:
+        rss = memory[0] if memory is not None else None
+    if rss is None or start_rss is None:
+        return None, rss
+    return rss - start_rss, rss
+
+
+class PipelineStats:
+    """
+    This class collects the statistics of the steps of the pipeline: the wall time, the
+    increase of the resident memory during the step (see step_memory, measured from the
+    previous step on), the resident memory at its end, the rows before and after the step
+    and the rows dropped by it. Pass it to full_dataset_cleaning,
+    stream_dataset_cleaning or create_distance_measures and read it afterwards.
+    The rows dropped per step show immediately, when a new scrape changes the spelling
+    of a label and a filter suddenly removes much more rows.
+
+    Input:  - log_path(string): A file, to which every step is appended as one json line.
+              No file is written if None. Every step is also written to the log.
+    Raises: None
+    """
+
+    def __init__(self, log_path=None):
+        self.records = []
+        self.log_path = log_path
+        self.rss = start_memory()
+
+    def add(
+        self,
+        pipeline,
+        step,
+        seconds,
+        rows_in,
+        rows_out,
+        accumulate=False,
+        memory_increase_mb=None,
+    ):
+        """
+        This function adds the statistics of one step.
+        Input:  - pipeline(string): The name of the pipeline, like "cleaning"
+                - step(string): The name of the step
+                - seconds(float): The wall time of the step
+                - rows_in(int): The rows before the step
+                - rows_out(int): The rows after the step
+                - accumulate(bool): Add the numbers to an earlier record of the same step,
+                  used when the dataset is processed in chunks. The memory increase is the
+                  largest one of the chunks.
+                - memory_increase_mb(float): The memory increase of the step, if it was
+                  measured by the caller, otherwise since the previous step
+        Output: - record(dict): The record of the step
+        Raises: None
+        """
+        increase, self.rss = step_memory(self.rss)
+        if memory_increase_mb is not None:
+            increase = memory_increase_mb
+        record = None
+        if accumulate:
+            for earlier in self.records:
+                if earlier["pipeline"] == pipeline and earlier["step"] == step:
+                    record = earlier
+                    record["seconds"] += seconds
+                    record["rows_in"] += rows_in
+                    record["rows_out"] += rows_out
+                    record["rows_dropped"] += rows_in - rows_out
+                    if record["memory_increase_mb"] is None:
+                        record["memory_increase_mb"] = increase
+                    elif increase is not None:
+                        record["memory_increase_mb"] = max(
+                            record["memory_increase_mb"], increase
+                        )
+                    record["rss_mb"] = self.rss
+                    break
+        if record is None:
+            record = {
+                "pipeline": pipeline,
+                "step": step,
+                "seconds": seconds,
+                "rows_in": rows_in,
+                "rows_out": rows_out,
+                "rows_dropped": rows_in - rows_out,
+                "memory_increase_mb": increase,
+                "rss_mb": self.rss,
+            }
+            self.records.append(record)
+        self.__log(record)
+        return record
+
+    @contextmanager
+    def measure(self, pipeline, step, rows_in):
+        """
+        This function measures the step in a with block. The number of rows after the step
+        has to be set in the yielded dictionary as "rows_out".
+        Example:
+            with stats.measure("distance", "harmonize_strings", len(data)) as result:
+                data = ...
+                result["rows_out"] = len(data)
+        """
+        result = {"rows_out": rows_in}
+        start = time.perf_counter()
+        yield result
+        self.add(
+            pipeline=pipeline,
+            step=step,
+            seconds=time.perf_counter() - start,
+            rows_in=rows_in,
+            rows_out=result["rows_out"],
+        )
+
+    def __log(self, record):
+        logger.info(
+            "%s - %s: %.3f s, %d rows in, %d rows out, %d rows dropped",
+            record["pipeline"],
+            record["step"],
+            record["seconds"],
+            record["rows_in"],
+            record["rows_out"],
+            record["rows_dropped"],
+        )
+        if self.log_path is not None:
+            with open(self.log_path, "a") as file:
+                file.write(json.dumps(record) + "\n")
+
+    def to_frame(self):
+        """
+        This function returns the statistics as a dataframe with one row per step.
+        """
+        return pd.DataFrame(
+            self.records,
+            columns=[
+                "pipeline",
+                "step",
+                "seconds",
+                "rows_in",
+                "rows_out",
+                "rows_dropped",
+                "memory_increase_mb",
+                "rss_mb",
+            ],
+        )
+
+    def to_json(self, path):
+        """
+        This function writes the statistics of all steps to a json file.
+        """
+        with open(path, "w") as file:
+            json.dump(self.records, file, indent=2)
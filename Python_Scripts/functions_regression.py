@@ -0,0 +1,395 @@
+# Import the required libraries
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def demean(x, groups, tolerance=1e-10, max_iterations=1000):
+    """
+    This function removes the fixed effects from a column with the method of alternating
+    projections: the means of the groups of every fixed effect are subtracted one after
+    the other until the means do not change any more. With one fixed effect the first
+    pass is exact.
+    Input:  - x(np.array): The column
+            - groups(list): For every fixed effect the codes (0, 1, ...) and the number of
+              rows of every code, see FixedEffects
+            - tolerance(float): The largest change of a group mean relative to the scale
+              of x, at which the iteration stops
+            - max_iterations(int): The largest number of passes
+    Output: - x(np.array): The demeaned column
+    Raises: None
+    """
+    x = np.array(x, dtype=np.float64)
+    scale = max(np.abs(x).max(initial=0.0), 1.0)
+    for iteration in range(max_iterations):
+        change = 0.0
+        for codes, counts in groups:
+            means = np.bincount(codes, weights=x, minlength=len(counts)) / counts
+            x -= means[codes]
+            change = max(change, np.abs(means).max(initial=0.0))
+        if len(groups) <= 1 or change <= tolerance * scale:
+            break
+    else:
+        logger.warning(
+            "The demeaning did not converge after %d iterations", max_iterations
+        )
+    return x
+
+
+class FixedEffects:
+    """
+    This class keeps the codes of the fixed effects of one estimation sample, which are
+    needed to demean the columns. Only the levels, which appear in the sample, are kept.
+
+    Input:  - codes(list): The codes of every fixed effect for all rows of the dataset
+            - sample(np.array): The boolean mask of the rows in the estimation sample
+    Raises: None
+    """
+
+    def __init__(self, codes, sample):
+        self.groups = []
+        for fixed_effect in codes:
+            _, inverse = np.unique(fixed_effect[sample], return_inverse=True)
+            inverse = inverse.astype(np.int64)
+            self.groups.append((inverse, np.bincount(inverse).astype(np.float64)))
+        if not self.groups:
+            # without fixed effects the mean is removed, like a constant in the model
+            codes = np.zeros(int(sample.sum()), dtype=np.int64)
+            self.groups.append((codes, np.bincount(codes).astype(np.float64)))
+        # the degrees of freedom of the absorbed fixed effects, exact for connected groups
+        self.degrees_of_freedom = sum(len(counts) for _, counts in self.groups) - (
+            len(self.groups) - 1
+        )
+
+
+class SpecificationBatch:
+    """
+    This class fits many fixed effects specifications on the same dataset. The
+    specifications are dictionaries in the format of the analysis notebook:
+        - dependent_variable(string): The dependent variable
+        - covariates(list): The covariates, categorical columns (categories, strings)
+          get a dummy "column.level" (named like linearmodels) for every level except
+          the first one, booleans are 0/1
+        - fixed_effects(list): The columns, which are absorbed
+        - to_categorize(list): Not needed, every column is encoded once by its dtype
+        - interactions(list): Categorical columns, whose dummies (except the first level,
+          like the notebook, which removes the first interaction dummy of every term from
+          the list of data_preparation) are multiplied with the columns of to_interact
+        - to_interact(list): The partners of the interactions
+        - clustering(list): The column, by which the standard errors are clustered
+    The dataset is not changed. Every column is encoded once for all specifications and
+    every column is demeaned once per set of fixed effects and estimation sample, so
+    specifications with the same fixed effects share the demeaning. The estimation
+    sample of a specification are the rows without missing values in its columns.
+
+    Input:  - data(pd.df): The dataset
+            - tolerance(float): The tolerance of the demeaning, see demean
+            - max_iterations(int): The largest number of passes of the demeaning
+    Raises: None
+    """
+
+    def __init__(self, data, tolerance=1e-10, max_iterations=1000):
+        self.data = data
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.encodings = {}
+        self.numerics = {}
+        self.fixed_effects = {}
+        self.demeaned = {}
+
+    def encoding(self, column):
+        """
+        This function returns the codes of the levels of a column in sorted (or category)
+        order, -1 for missing values, and the levels. Every column is encoded only once.
+        """
+        if column not in self.encodings:
+            codes, levels = pd.factorize(self.data[column], sort=True)
+            self.encodings[column] = (codes.astype(np.int64), list(levels))
+        return self.encodings[column]
+
+    def numeric(self, column):
+        """
+        This function returns a column as float64 array, converted only once.
+        """
+        if column not in self.numerics:
+            values = self.data[column]
+            if pd.api.types.is_bool_dtype(values):
+                values = values.astype(np.float64)
+            self.numerics[column] = pd.to_numeric(values, errors="coerce").to_numpy(
+                dtype=np.float64
+            )
+        return self.numerics[column]
+
+    def is_categorical(self, column):
+        """
+        This function tells, if a covariate gets dummies: categoricals and text columns.
+        """
+        values = self.data[column]
+        return isinstance(
+            values.dtype, pd.CategoricalDtype
+        ) or not pd.api.types.is_numeric_dtype(values)
+
+    def design(self, specification):
+        """
+        This function gives the columns of a specification, without any demeaning.
+        Output: - y(tuple): The name and the values of the dependent variable
+                - columns(list): The names and the values of the regressors
+                - missing(np.array): The rows with a missing value in a used column
+        """
+        y_name = specification["dependent_variable"]
+        y = self.numeric(y_name)
+        missing = np.isnan(y)
+        columns = []
+        for covariate in specification["covariates"]:
+            if self.is_categorical(covariate):
+                codes, levels = self.encoding(covariate)
+                missing |= codes == -1
+                for level_code, level in enumerate(levels[1:], start=1):
+                    columns.append(
+                        (f"{covariate}.{level}", (codes == level_code).astype(float))
+                    )
+            else:
+                x = self.numeric(covariate)
+                missing |= np.isnan(x)
+                columns.append((covariate, x))
+        for term in specification.get("interactions", []):
+            codes, levels = self.encoding(term)
+            missing |= codes == -1
+            for partner in specification.get("to_interact", []):
+                x = self.numeric(partner)
+                missing |= np.isnan(x)
+                for level_code, level in enumerate(levels[1:], start=1):
+                    columns.append(
+                        (
+                            f"{term}_{level}*{partner}",
+                            np.where(codes == level_code, x, 0.0),
+                        )
+                    )
+        for fixed_effect in specification["fixed_effects"]:
+            missing |= self.encoding(fixed_effect)[0] == -1
+        for cluster in specification.get("clustering", [])[:1]:
+            missing |= self.encoding(cluster)[0] == -1
+        return (y_name, y), columns, missing
+
+    def __group(self, specification, sample):
+        # the fixed effects of a specification on its sample, built once for all columns
+        sample_key = hashlib.sha1(np.packbits(sample).tobytes()).hexdigest()
+        key = (tuple(sorted(specification["fixed_effects"])), sample_key)
+        if key not in self.fixed_effects:
+            self.fixed_effects[key] = FixedEffects(
+                [self.encoding(column)[0] for column in key[0]], sample
+            )
+        return key
+
+    def __demean_column(self, key, name, values, sample):
+        if (key, name) not in self.demeaned:
+            self.demeaned[(key, name)] = demean(
+                values[sample],
+                self.fixed_effects[key].groups,
+                tolerance=self.tolerance,
+                max_iterations=self.max_iterations,
+            )
+        return self.demeaned[(key, name)]
+
+    def fit(self, specifications, names=None, cov_type=None, debiased=False, workers=1):
+        """
+        This function fits the specifications. First the fixed effects of every
+        specification are built, then every column, which is needed, is demeaned once
+        and last the specifications are estimated. The demeaning and the estimation run
+        on workers threads, numpy releases the GIL in the heavy parts.
+        Input:  - specifications(list): The specification dictionaries
+                - names(list): The names of the specifications, "1", "2", ... if None
+                - cov_type(string): "unadjusted", "robust" or "clustered", "clustered" if
+                  the specification has clustering, otherwise "robust" if None
+                - debiased(bool): Use the small sample corrections, which count the absorbed
+                  fixed effects (like Stata), and the t distribution. If False, the standard
+                  errors have no correction and the p-values use the normal distribution,
+                  like AbsorbingLS(...).fit() of linearmodels in the analysis notebook.
+                - workers(int): The number of threads
+        Output: - results(list): The results of the specifications, see __estimate
+        Raises: - KeyError if a column does not exist
+        """
+        if names is None:
+            names = [str(i + 1) for i in range(len(specifications))]
+        prepared = []
+        for specification in specifications:
+            y, columns, missing = self.design(specification)
+            sample = ~missing
+            key = self.__group(specification, sample)
+            prepared.append((specification, y, columns, sample, key))
+
+        # every column is demeaned once per fixed effects and sample
+        jobs = {}
+        for specification, y, columns, sample, key in prepared:
+            for name, values in [y] + columns:
+                jobs.setdefault((key, name), (key, name, values, sample))
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            list(executor.map(lambda job: self.__demean_column(*job), jobs.values()))
+
+        def estimate(arguments):
+            name, (specification, y, columns, sample, key) = arguments
+            return self.__estimate(
+                name=name,
+                specification=specification,
+                y=self.demeaned[(key, y[0])],
+                columns=[
+                    (column, self.demeaned[(key, column)], values[sample])
+                    for column, values in columns
+                ],
+                sample=sample,
+                fixed_effects=self.fixed_effects[key],
+                cov_type=cov_type,
+                debiased=debiased,
+            )
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            return list(executor.map(estimate, zip(names, prepared)))
+
+    def __estimate(
+        self, name, specification, y, columns, sample, fixed_effects, cov_type, debiased
+    ):
+        """
+        This function estimates one specification on the demeaned columns.
+        Output: - result(dict): name, params, std_errors, tstats, pvalues (pd.Series),
+                  nobs, df_resid, rsquared_within, cov_type, debiased and the dropped
+                  regressors, which are absorbed by the fixed effects
+        """
+        clusters = specification.get("clustering", [])
+        if cov_type is None:
+            cov_type = "clustered" if clusters else "robust"
+        # regressors without variation within the fixed effects are dropped
+        kept = []
+        dropped = []
+        for column, demeaned, original in columns:
+            norm = np.sqrt((original - original.mean()) @ (original - original.mean()))
+            if np.sqrt(demeaned @ demeaned) <= 1e-8 * max(norm, 1.0):
+                dropped.append(column)
+            else:
+                kept.append((column, demeaned))
+        if dropped:
+            logger.warning(
+                "Specification %s: %s absorbed by the fixed effects and dropped",
+                name,
+                ", ".join(dropped),
+            )
+        names = [column for column, _ in kept]
+        x = (
+            np.column_stack([values for _, values in kept])
+            if kept
+            else np.empty((len(y), 0))
+        )
+        nobs, k = x.shape
+        df_resid = nobs - k - fixed_effects.degrees_of_freedom
+        xx_inv = np.linalg.pinv(x.T @ x)
+        params = xx_inv @ (x.T @ y)
+        residuals = y - x @ params
+        if cov_type == "unadjusted":
+            covariance = xx_inv * (residuals @ residuals) / nobs
+            correction = nobs / df_resid
+        elif cov_type == "robust":
+            scores = x * residuals[:, None]
+            covariance = xx_inv @ (scores.T @ scores) @ xx_inv
+            correction = nobs / df_resid
+        elif cov_type == "clustered":
+            codes = np.unique(
+                self.encoding(clusters[0])[0][sample], return_inverse=True
+            )[1]
+            n_clusters = codes.max() + 1
+            scores = np.zeros((n_clusters, k))
+            np.add.at(scores, codes, x * residuals[:, None])
+            covariance = xx_inv @ (scores.T @ scores) @ xx_inv
+            # the small sample corrections of Stata
+            correction = n_clusters / (n_clusters - 1) * (nobs - 1) / df_resid
+        else:
+            raise ValueError("Unknown covariance type: " + str(cov_type))
+        # scipy.stats takes long to import, it is only imported when a model is fitted
+        from scipy import stats
+
+        if debiased:
+            covariance = covariance * correction
+            distribution = stats.t(df_resid)
+        else:
+            distribution = stats.norm()
+        std_errors = np.sqrt(np.diag(covariance))
+        tstats = params / std_errors
+        return {
+            "name": name,
+            "params": pd.Series(params, index=names),
+            "std_errors": pd.Series(std_errors, index=names),
+            "tstats": pd.Series(tstats, index=names),
+            "pvalues": pd.Series(2 * distribution.sf(np.abs(tstats)), index=names),
+            "nobs": nobs,
+            "df_resid": df_resid,
+            "rsquared_within": 1 - (residuals @ residuals) / (y @ y),
+            "cov_type": cov_type,
+            "debiased": debiased,
+            "dropped": dropped,
+        }
+
+
+def fit_specifications(
+    data,
+    specifications,
+    names=None,
+    cov_type=None,
+    debiased=False,
+    workers=1,
+    tolerance=1e-10,
+):
+    """
+    This function fits a list of fixed effects specifications in the format of the analysis
+    notebook with one SpecificationBatch, so that the encodings and the demeaning are
+    shared between the specifications. See SpecificationBatch.fit.
+    Input:  - data(pd.df): The dataset, it is not changed
+            - specifications(list): The specification dictionaries
+            - names(list): The names of the specifications, "1", "2", ... if None
+            - cov_type(string): "unadjusted", "robust" or "clustered"
+            - debiased(bool): Use the small sample corrections, see SpecificationBatch.fit
+            - workers(int): The number of threads
+            - tolerance(float): The tolerance of the demeaning
+    Output: - results(list): The result dictionary of every specification
+    Raises: - KeyError if a column does not exist
+    """
+    batch = SpecificationBatch(data, tolerance=tolerance)
+    return batch.fit(
+        specifications=specifications,
+        names=names,
+        cov_type=cov_type,
+        debiased=debiased,
+        workers=workers,
+    )
+
+
+def results_table(results, digits=4):
+    """
+    This function puts the results of several specifications into one table, with the
+    coefficient and below the standard error in brackets of every regressor, and the
+    number of observations, like the robustness tables of the paper.
+    Input:  - results(list): The results of fit_specifications
+            - digits(int): The number of decimals
+    Output: - table(pd.df): One column per specification
+    Raises: None
+    """
+    columns = {}
+    # the regressors in the order, in which they appear first
+    order = []
+    for result in results:
+        rows = {}
+        for regressor in result["params"].index:
+            pvalue = result["pvalues"][regressor]
+            stars = "".join("*" for level in (0.1, 0.05, 0.01) if pvalue < level)
+            rows[regressor] = f"{result['params'][regressor]:.{digits}f}{stars}"
+            rows[regressor + " (se)"] = (
+                f"({result['std_errors'][regressor]:.{digits}f})"
+            )
+        order += [row for row in rows if row not in order]
+        rows["Observations"] = str(result["nobs"])
+        rows["R2 within"] = f"{result['rsquared_within']:.{digits}f}"
+        columns[result["name"]] = pd.Series(rows)
+    table = pd.DataFrame(columns)
+    # the statistics of the models at the end
+    return table.loc[order + ["Observations", "R2 within"]].fillna("")
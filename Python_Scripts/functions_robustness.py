@@ -0,0 +1,300 @@
+# Import the required libraries
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import functions_distance as dcf
+import functions_regression as freg
+
+logger = logging.getLogger(__name__)
+
+# the covariate, which is replaced by the dummies of the distance bins
+DISTANCE_COLUMN = "distance_between_job_and_organization"
+
+
+def build_robustness_base(
+    cleaned,
+    city_gps_match_data,
+    used_columns,
+    matcher=None,
+    distance_method="vincenty",
+    cache_path=None,
+    workers=1,
+    spatial_fallback_km=None,
+):
+    """
+    This function computes the distances once for all points of a robustness grid. The
+    distance stages, which only look at the row, are run on the cleaned dataset without
+    the filter of the fuzzy rating. The rules, which depend on the grid point (the firm
+    sizes, the unique location names among them and the fuzzy rating), are applied by
+    select_grid_point, so a grid point costs only a filter and the regressions.
+    Input:  - cleaned(pd.df): The cleaned dataset, cleaned with all firm sizes of the grid,
+              for example fc.full_dataset_cleaning(data, firm_sizes=[...])
+            - city_gps_match_data(pd.df): All german cities with their gps coordinates
+            - used_columns(list): The columns, which are kept, they have to include
+              Fuzzy_Rating and organization_size_label
+            - matcher, distance_method, cache_path, workers, spatial_fallback_km: see
+              create_distance_measures
+    Output: - [base, location_counts]: The geocoded rows for all grid points and the
+              number of cleaned rows of every harmonized location name and firm size
+    Raises: None
+    """
+    state = dcf.new_distance_state(
+        data=cleaned.copy(),
+        city_gps_match_data=city_gps_match_data.copy(),
+        used_columns=used_columns,
+        matcher=matcher,
+        distance_method=distance_method,
+        cache_path=cache_path,
+        match_output_path=None,
+        workers=workers,
+        compact=True,
+        spatial_fallback_km=spatial_fallback_km,
+        min_fuzzy_rating=None,
+    )
+    location_counts = None
+    for name, stage in dcf.ROW_DISTANCE_STAGES:
+        stage(state)
+        if name == "harmonize_strings":
+            # create_distance_measures counts the names before any row is dropped
+            location_counts = (
+                state["data"]
+                .groupby(
+                    [
+                        state["data"]["organization_location_name"].astype(object),
+                        state["data"]["organization_size_label"].astype(object),
+                    ]
+                )
+                .size()
+            )
+    logger.info(
+        "Robustness base: %d of %d cleaned rows geocoded",
+        len(state["data"]),
+        len(cleaned),
+    )
+    return [state["data"], location_counts]
+
+
+def select_grid_point(
+    base,
+    location_counts,
+    firm_sizes=None,
+    min_fuzzy_rating=dcf.MIN_FUZZY_RATING,
+    distance_bins=None,
+):
+    """
+    This function selects the rows of one grid point from the base of build_robustness_base.
+    With the firm sizes of the cleaning and the default parameters, the rows are the same
+    as the ones of create_distance_measures.
+    Input:  - base, location_counts: The result of build_robustness_base
+            - firm_sizes(list): The organization sizes, which are kept, all if None
+            - min_fuzzy_rating(int): The lowest fuzzy rating of the matched city names
+            - distance_bins(list): The edges of the distance bins in km. If given, the
+              categorical column "distance_bin" with the bin of every row is added and
+              the rows with a distance outside the edges are dropped.
+    Output: - data(pd.df): The rows of the grid point
+    Raises: None
+    """
+    data = base
+    if firm_sizes is not None:
+        data = data[data["organization_size_label"].isin(list(firm_sizes))]
+        location_counts = location_counts[
+            location_counts.index.get_level_values(1).isin(list(firm_sizes))
+        ]
+    # the location names, which appear only once among the rows of the firm sizes
+    counts = location_counts.groupby(level=0).sum()
+    names = data["organization_location_name"].astype(object)
+    data = data[names.map(counts).fillna(0).to_numpy() >= 2]
+    if min_fuzzy_rating is not None:
+        data = data[data["Fuzzy_Rating"].to_numpy() >= min_fuzzy_rating]
+    if distance_bins is not None:
+        # the bins stay a categorical ordered by the edges, so the first bin is the
+        # reference of the regressions
+        bins = pd.cut(data[DISTANCE_COLUMN], bins=distance_bins, include_lowest=True)
+        data = data.assign(distance_bin=bins)[bins.notna().to_numpy()]
+    return data
+
+
+def expand_grid(grid):
+    """
+    This function gives all combinations of the values of a grid.
+    Input:  - grid(dict): The values of every parameter of select_grid_point, like
+              {"firm_sizes": [...], "min_fuzzy_rating": [80, 85, 90]}
+    Output: - points(list): A dictionary with the parameters of every grid point
+    Raises: None
+    """
+    names = list(grid)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(grid[name] for name in names))
+    ]
+
+
+def __specifications_of_point(specifications, point):
+    # with distance bins, the distance covariate is replaced by the bins
+    if point.get("distance_bins") is None:
+        return specifications
+    return [
+        dict(
+            specification,
+            covariates=[
+                "distance_bin" if covariate == DISTANCE_COLUMN else covariate
+                for covariate in specification["covariates"]
+            ],
+        )
+        for specification in specifications
+    ]
+
+
+def __cluster_sample(data, cluster, rng):
+    # draw the clusters with replacement, a cluster drawn twice becomes two clusters
+    codes, _ = pd.factorize(data[cluster])
+    n_clusters = codes.max() + 1
+    drawn = rng.integers(0, n_clusters, n_clusters)
+    order = np.argsort(codes, kind="stable")
+    starts = np.searchsorted(codes[order], np.arange(n_clusters))
+    sizes = np.bincount(codes, minlength=n_clusters)
+    rows = np.concatenate(
+        [order[starts[c] : starts[c] + sizes[c]] for c in drawn]
+    ).astype(np.int64)
+    sample = data.iloc[rows].reset_index(drop=True)
+    draw_ids = np.repeat(np.arange(n_clusters), sizes[drawn])
+    sample[cluster] = draw_ids
+    return sample
+
+
+# the state of a worker process, it is sent once to every worker
+_worker_state = None
+
+
+def __init_worker(base, location_counts, specifications, names, points, cluster):
+    global _worker_state
+    _worker_state = {
+        "base": base,
+        "location_counts": location_counts,
+        "specifications": specifications,
+        "names": names,
+        "points": points,
+        "cluster": cluster,
+        "selected": {},
+    }
+
+
+def __run_task(task):
+    # a task is a grid point and a replication, replication None is the point estimate
+    point_index, replication, seed = task
+    state = _worker_state
+    point = state["points"][point_index]
+    if point_index not in state["selected"]:
+        # only the data of the last grid point is kept in the worker
+        state["selected"] = {
+            point_index: select_grid_point(
+                state["base"], state["location_counts"], **point
+            )
+        }
+    data = state["selected"][point_index]
+    specifications = __specifications_of_point(state["specifications"], point)
+    if replication is not None:
+        data = __cluster_sample(data, state["cluster"], np.random.default_rng(seed))
+    results = freg.fit_specifications(
+        data=data, specifications=specifications, names=state["names"]
+    )
+    return point_index, replication, results
+
+
+def run_robustness(
+    base,
+    location_counts,
+    specifications,
+    grid,
+    names=None,
+    replications=0,
+    cluster="organization_ID",
+    workers=1,
+    seed=0,
+):
+    """
+    This function estimates the specifications for every point of the grid and, if
+    replications is above 0, the cluster bootstrap of every point. The point estimates and
+    the bootstrap replications are run on a process pool, the base dataset is sent only
+    once to every worker. The bootstrap draws the clusters with replacement, a cluster
+    drawn twice is used as two clusters (also as fixed effect, if it is one). The seeds of
+    the replications are fixed by seed, so the result does not depend on the workers.
+    Input:  - base, location_counts: The result of build_robustness_base
+            - specifications(list): The specification dictionaries of the notebook
+            - grid(dict): The values of the parameters of select_grid_point, see expand_grid
+            - names(list): The names of the specifications, "1", "2", ... if None
+            - replications(int): The number of bootstrap replications per grid point
+            - cluster(string): The column, whose values are drawn in the bootstrap
+            - workers(int): The number of processes, the work is done in this process if 1
+            - seed(int): The seed of the bootstrap
+    Output: - results(pd.df): A tidy table with one row per grid point, specification and
+              regressor: the parameters of the grid point, coefficient, standard error,
+              p value, observations and the bootstrap standard error and 95% percentile
+              interval
+    Raises: - KeyError if a column does not exist
+    """
+    if names is None:
+        names = [str(i + 1) for i in range(len(specifications))]
+    points = expand_grid(grid)
+    seeds = np.random.SeedSequence(seed).spawn(len(points) * max(replications, 1))
+    tasks = []
+    for point_index in range(len(points)):
+        tasks.append((point_index, None, None))
+        for replication in range(replications):
+            tasks.append(
+                (
+                    point_index,
+                    replication,
+                    seeds[point_index * replications + replication],
+                )
+            )
+    initargs = (base, location_counts, specifications, names, points, cluster)
+    if workers is None or workers <= 1:
+        __init_worker(*initargs)
+        outputs = [__run_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=__init_worker, initargs=initargs
+        ) as executor:
+            outputs = list(executor.map(__run_task, tasks, chunksize=4))
+
+    estimates = {}
+    draws = {}
+    for point_index, replication, results in outputs:
+        for result in results:
+            key = (point_index, result["name"])
+            if replication is None:
+                estimates[key] = result
+            else:
+                draws.setdefault(key, []).append(result["params"])
+
+    rows = []
+    for (point_index, name), result in estimates.items():
+        point = points[point_index]
+        bootstrap = pd.DataFrame(draws.get((point_index, name), []))
+        for regressor in result["params"].index:
+            row = {
+                "firm_sizes": "|".join(point.get("firm_sizes") or []) or "all",
+                "min_fuzzy_rating": point.get("min_fuzzy_rating", dcf.MIN_FUZZY_RATING),
+                "distance_bins": (
+                    "|".join(str(edge) for edge in point["distance_bins"])
+                    if point.get("distance_bins") is not None
+                    else "none"
+                ),
+                "specification": name,
+                "regressor": regressor,
+                "coefficient": result["params"][regressor],
+                "std_error": result["std_errors"][regressor],
+                "pvalue": result["pvalues"][regressor],
+                "nobs": result["nobs"],
+            }
+            if regressor in bootstrap.columns:
+                values = bootstrap[regressor].dropna()
+                row["bootstrap_std_error"] = values.std(ddof=1)
+                row["bootstrap_ci_low"] = values.quantile(0.025)
+                row["bootstrap_ci_high"] = values.quantile(0.975)
+                row["replications"] = len(values)
+            rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,193 @@
+# Import the required libraries
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+# The largest number of distinct values of a text column, which are sent to every worker
+# with the description. The text of columns with more distinct values, like job titles, is
+# stored in shared memory too, and a worker decodes only the values of its rows.
+MAX_SENT_UNIQUES = 10000
+
+
+class SharedFrame:
+    """
+    This class copies the columns of a dataframe into shared memory once, so that worker
+    processes can read any range of rows without the dataframe being pickled for every
+    task. Numeric, boolean and datetime columns are stored as they are. All other columns
+    (text, categoricals, nullable integers) are stored as integer codes, their distinct
+    values are part of the description, which is sent once to every worker. The distinct
+    values of a text column with more than MAX_SENT_UNIQUES of them are stored as utf-8
+    bytes and offsets in shared memory instead, so the description stays small.
+    The index is not stored, the rows are identified by their positions.
+    The shared memory is freed by close, or at the end of a with block.
+
+    Input:  - data(pd.df): The dataframe
+    Raises: None
+    """
+
+    def __init__(self, data):
+        self.blocks = []
+        # the description of every column, what attach_frame needs to read it
+        self.columns = []
+        self.rows = len(data)
+        for column in data.columns:
+            values = data[column]
+            dtype = values.dtype
+            text = None
+            if isinstance(dtype, np.dtype) and dtype.kind in "biufmM":
+                array = values.to_numpy()
+                uniques = None
+            else:
+                array, uniques = pd.factorize(values, use_na_sentinel=True)
+                array = array.astype(np.int32 if len(uniques) < 2**31 else np.int64)
+                uniques = np.asarray(uniques, dtype=object)
+                if (
+                    len(uniques) > MAX_SENT_UNIQUES
+                    and pd.api.types.infer_dtype(uniques, skipna=False) == "string"
+                ):
+                    # the text of many distinct values is shared too, not sent
+                    text = self.__share_text(uniques)
+                    uniques = None
+            self.columns.append(
+                {
+                    "column": column,
+                    "block": self.__share(array),
+                    "dtype": array.dtype.str,
+                    "original_dtype": dtype,
+                    "uniques": uniques,
+                    "text": text,
+                }
+            )
+
+    def __share(self, array):
+        # copy an array into a new block of shared memory
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        self.blocks.append(block)
+        return block.name
+
+    def __share_text(self, uniques):
+        # the utf-8 bytes of the distinct values one after another and the offsets of the
+        # values among the bytes
+        encoded = [value.encode("utf-8", "surrogatepass") for value in uniques]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return {
+            "bytes": self.__share(np.frombuffer(b"".join(encoded), dtype=np.uint8)),
+            "offsets": self.__share(offsets),
+            "uniques": len(uniques),
+        }
+
+    def description(self):
+        """
+        This function returns the description of the shared columns for attach_frame.
+        """
+        return {"rows": self.rows, "columns": self.columns}
+
+    def close(self):
+        """
+        This function frees the shared memory.
+        """
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def attach_frame(description):
+    """
+    This function opens the shared columns of a SharedFrame in a worker process.
+    Input:  - description(dict): The result of SharedFrame.description
+    Output: - columns(list): The column name, the shared array, the distinct values (an
+              array or SharedUniques) and the original dtype of every column, for read_rows
+            - blocks(list): The opened shared memory blocks, which have to be kept open as
+              long as the arrays are used
+    Raises: - FileNotFoundError if the SharedFrame was already closed
+    """
+    columns = []
+    blocks = []
+    for entry in description["columns"]:
+        # the workers of a process pool share the resource tracker of the process, which
+        # created the block, so the block is freed only once, by SharedFrame.close
+        array, block = __attach_array(
+            entry["block"], entry["dtype"], description["rows"]
+        )
+        blocks.append(block)
+        uniques = entry["uniques"]
+        if entry["text"] is not None:
+            offsets, block = __attach_array(
+                entry["text"]["offsets"], "<i8", entry["text"]["uniques"] + 1
+            )
+            blocks.append(block)
+            text, block = __attach_array(entry["text"]["bytes"], "|u1", offsets[-1])
+            blocks.append(block)
+            uniques = SharedUniques(text, offsets)
+        columns.append((entry["column"], array, uniques, entry["original_dtype"]))
+    return columns, blocks
+
+
+def __attach_array(name, dtype, length):
+    # open a shared block and view its first values as an array
+    block = shared_memory.SharedMemory(name=name)
+    return np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf), block
+
+
+class SharedUniques:
+    """
+    This class gives the distinct values of a text column, which are stored in shared
+    memory by SharedFrame, for attach_frame. Only the values, which are indexed, are
+    decoded.
+
+    Input:  - text(np.array): The utf-8 bytes of the values
+            - offsets(np.array): The start of every value among the bytes and the end
+    Raises: None
+    """
+
+    def __init__(self, text, offsets):
+        self.text = text
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, codes):
+        # decode every distinct code once, like uniques[codes] of an array of values
+        distinct, inverse = np.unique(np.asarray(codes), return_inverse=True)
+        values = np.empty(len(distinct), dtype=object)
+        for i, code in enumerate(distinct):
+            values[i] = (
+                self.text[self.offsets[code] : self.offsets[code + 1]]
+                .tobytes()
+                .decode("utf-8", "surrogatepass")
+            )
+        return values[inverse.reshape(-1)]
+
+
+def read_rows(columns, start, stop):
+    """
+    This function builds the dataframe of a range of rows from the shared columns.
+    Input:  - columns(list): The result of attach_frame
+            - start, stop(int): The positions of the first and after the last row
+    Output: - data(pd.df): The rows with their positions as index and the dtypes of the
+              original dataframe. Missing values of coded columns are np.nan.
+    Raises: None
+    """
+    index = pd.RangeIndex(start, stop)
+    values = {}
+    for column, array, uniques, dtype in columns:
+        part = array[start:stop]
+        if uniques is None:
+            values[column] = part.copy()
+            continue
+        decoded = np.empty(len(part), dtype=object)
+        missing = part < 0
+        decoded[~missing] = uniques[part[~missing]]
+        decoded[missing] = np.nan
+        values[column] = pd.Series(decoded, index=index).astype(dtype, copy=False)
+    return pd.DataFrame(values, index=index)
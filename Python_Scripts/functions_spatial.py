@@ -0,0 +1,96 @@
+# Import the required libraries
+import numpy as np
+from fuzzywuzzy import fuzz
+import functions_geodesic as fg
+
+
+def unit_vectors(latitudes, longitudes):
+    """
+    This function converts coordinates in degrees to points on the unit sphere, in which
+    the euclidean (chord) distance grows with the great circle distance.
+    Input:  - latitudes, longitudes(np.array): The coordinates in degrees
+    Output: - points(np.array): The points as an array with three columns
+    Raises: None
+    """
+    latitudes = np.radians(np.asarray(latitudes, dtype=np.float64))
+    longitudes = np.radians(np.asarray(longitudes, dtype=np.float64))
+    return np.column_stack(
+        [
+            np.cos(latitudes) * np.cos(longitudes),
+            np.cos(latitudes) * np.sin(longitudes),
+            np.sin(latitudes),
+        ]
+    )
+
+
+class GazetteerIndex:
+    """
+    This class finds the cities of the gazetteer near a point with a KD-tree over the
+    coordinates of the cities. The coordinates are put on the unit sphere, so that a
+    radius in km is one chord length for the whole gazetteer, also far from the equator.
+    The radius is measured on the sphere with the mean earth radius.
+
+    Input:  - names(list or pd.Series): The city names of the gazetteer
+            - latitudes, longitudes(list or pd.Series): The coordinates of the cities in degrees
+    Raises: None
+    """
+
+    def __init__(self, names, latitudes, longitudes):
+        # scipy takes long to import, it is only imported when the fallback is used
+        from scipy.spatial import cKDTree
+
+        self.names = [str(name) for name in names]
+        points = unit_vectors(latitudes, longitudes)
+        # cities without coordinates can not be found
+        self.positions = np.flatnonzero(np.isfinite(points).all(axis=1))
+        self.tree = cKDTree(points[self.positions])
+
+    def nearby(self, latitudes, longitudes, radius_km):
+        """
+        This function returns the cities within radius_km of every point.
+        Input:  - latitudes, longitudes(np.array): The coordinates of the points in degrees
+                - radius_km(float): The radius around the points
+        Output: - candidates(list): The positions of the cities in the gazetteer for
+                  every point, in gazetteer order
+        Raises: None
+        """
+        chord = 2 * np.sin(radius_km / (2 * fg.MEAN_EARTH_RADIUS_KM))
+        points = unit_vectors(latitudes, longitudes)
+        candidates = []
+        for point in points:
+            if not np.isfinite(point).all():
+                candidates.append(np.array([], dtype=np.int64))
+                continue
+            found = self.tree.query_ball_point(point, r=chord)
+            candidates.append(np.sort(self.positions[found]))
+        return candidates
+
+    def match_nearby(
+        self, names, latitudes, longitudes, radius_km, scorer=fuzz.token_set_ratio
+    ):
+        """
+        This function finds the best fuzzy match for every name among the cities near its
+        point. Since there are only a few candidates, a scorer can be used, which is too
+        slow or too loose for the whole gazetteer: fuzz.token_set_ratio also rates names
+        like "bonn gmbh standort" 100 for "bonn". Like the CityMatcher, the candidate with
+        the highest rating wins and the first city in the gazetteer wins ties.
+        Input:  - names(list or pd.Series): The city names to be matched
+                - latitudes, longitudes(np.array): The coordinates of the points in degrees
+                - radius_km(float): The radius around the points
+                - scorer(function): Rates two strings from 0 to 100
+        Output: - indices(np.array): The positions of the best matches in the gazetteer,
+                  -1 if no city near the point has a rating above 0
+                - ratings(np.array): The fuzzy ratings of the best matches
+        Raises: None
+        """
+        candidates = self.nearby(latitudes, longitudes, radius_km)
+        indices = np.full(len(candidates), -1, dtype=np.int64)
+        ratings = np.zeros(len(candidates), dtype=np.int64)
+        for i, (name, positions) in enumerate(zip(names, candidates)):
+            name = str(name)
+            for position in positions:
+                rating = scorer(name, self.names[position])
+                if rating > ratings[i]:
+                    ratings[i] = rating
+                    indices[i] = position
+        return indices, ratings
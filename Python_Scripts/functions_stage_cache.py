@@ -0,0 +1,348 @@
+# Import the required libraries
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import tempfile
+import time
+import pandas as pd
+import functions_cleaning as fc
+import functions_codes as fcd
+import functions_distance as dcf
+import functions_dtypes as fd
+import functions_geodesic as fg
+import functions_io as fio
+import functions_matching as fm
+import functions_shared_memory as fsm
+import functions_spatial as fsp
+
+logger = logging.getLogger(__name__)
+
+# the modules, whose source code determines the result of the stages
+CLEANING_MODULES = [fc, fcd, fd, fsm]
+DISTANCE_MODULES = [dcf, fm, fg, fsp, fd]
+
+# the parameters of create_distance_measures, which every stage reads. The other
+# parameters (matcher, cache_path, workers) do not change the result.
+STAGE_OPTIONS = {
+    "harmonize_strings": [],
+    "filter_locations": [],
+    "drop_missing_coordinates": [],
+    "match_city_names": [],
+    "fill_in_coordinates": [],
+    "spatial_fallback": ["spatial_fallback_km", "min_fuzzy_rating"],
+    "filter_fuzzy_rating": ["min_fuzzy_rating"],
+    "job_coordinates": [],
+    "distances": ["distance_method"],
+    "drop_columns": ["used_columns"],
+    "compact_dtypes": ["compact"],
+}
+
+
+# the stages, whose state is stored. The other stages take much less time than storing and
+# loading the whole state, they are computed again from the last stored stage.
+CACHED_STAGES = ["match_city_names", "distances"]
+
+
+def stage_key(*parts):
+    """
+    This function computes the key of a stage from its inputs: the key of the stage
+    before (or the hash of the input data), the name, the parameters and the source code.
+    Input:  - parts: Strings or json serializable parameters
+    Output: - key(string): The hex digest of the parts
+    Raises: - TypeError if a part can not be serialized
+    """
+    content = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def file_hash(path, block_size=2**24):
+    """
+    This function computes the hash of the content of a file, read in blocks.
+    Input:  - path(string): The path of the file
+            - block_size(int): The number of bytes read at once
+    Output: - hash(string): The hex digest of the content
+    Raises: - FileNotFoundError if the file does not exist
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def frame_hash(data):
+    """
+    This function computes the hash of a dataframe: its values, index, columns and dtypes.
+    Input:  - data(pd.df): The dataframe
+    Output: - hash(string): The hex digest of the dataframe
+    Raises: None
+    """
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    digest.update(repr(list(zip(data.columns, data.dtypes.astype(str)))).encode())
+    return digest.hexdigest()
+
+
+def source_hash(modules):
+    """
+    This function computes the hash of the source code of modules, so that cached results
+    are not used after the code of a stage changed. The pandas version is part of the
+    hash, since the results are stored as pickles.
+    Input:  - modules(list): The modules
+    Output: - hash(string): The hex digest of the source code
+    Raises: None
+    """
+    return stage_key(pd.__version__, *[inspect.getsource(module) for module in modules])
+
+
+class StageCache:
+    """
+    This class stores the results of pipeline stages on disk, keyed by the hash of their
+    inputs (see stage_key), so a stage whose inputs did not change is loaded instead of
+    computed. The results are stored as pickles, which keep the dtypes and the index exactly.
+    If the files take more than max_size_mb, the results, which were used least recently,
+    are deleted.
+
+    Input:  - directory(string): The directory of the cache, created if it does not exist
+            - max_size_mb(float): The maximal size of the cache, not limited if None
+    Raises: None
+    """
+
+    def __init__(self, directory, max_size_mb=5000):
+        self.directory = directory
+        self.max_size_mb = max_size_mb
+        os.makedirs(directory, exist_ok=True)
+
+    def __path(self, key):
+        return os.path.join(self.directory, key + ".pickle")
+
+    def __contains__(self, key):
+        return os.path.exists(self.__path(key))
+
+    def get(self, key):
+        """
+        This function returns the result stored under key.
+        Input:  - key(string): The key of the stage
+        Output: - result: The stored result
+        Raises: - KeyError if the key is not in the cache
+        """
+        path = self.__path(key)
+        try:
+            with open(path, "rb") as file:
+                result = pickle.load(file)
+        except FileNotFoundError:
+            raise KeyError(key) from None
+        # the modification time is the time of the last use, used by the eviction
+        os.utime(path)
+        return result
+
+    def put(self, key, result):
+        """
+        This function stores a result under key and deletes the results, which were used
+        least recently, until the cache is not larger than max_size_mb.
+        Input:  - key(string): The key of the stage
+                - result: The result, it has to be picklable
+        Output: None
+        Raises: None
+        """
+        # written to a temporary file first, so that a crash leaves no broken result
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as file:
+            pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, self.__path(key))
+        self.__evict(keep=key)
+
+    def __evict(self, keep):
+        if self.max_size_mb is None:
+            return
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pickle"):
+                status = os.stat(os.path.join(self.directory, name))
+                entries.append((status.st_mtime, status.st_size, name))
+        size = sum(entry[1] for entry in entries)
+        for mtime, entry_size, name in sorted(entries):
+            if size <= self.max_size_mb * 1024**2:
+                break
+            if name == keep + ".pickle":
+                continue
+            os.remove(os.path.join(self.directory, name))
+            size -= entry_size
+            logger.info("Stage cache: %s evicted", name)
+
+    def size_mb(self):
+        """
+        This function returns the size of the stored results in MB.
+        """
+        return (
+            sum(
+                os.path.getsize(os.path.join(self.directory, name))
+                for name in os.listdir(self.directory)
+                if name.endswith(".pickle")
+            )
+            / 1024**2
+        )
+
+
+def cached_dataset_cleaning(
+    cache,
+    input_path,
+    columns=None,
+    stats=None,
+    compact=True,
+    firm_sizes=None,
+    workers=1,
+):
+    """
+    This function reads and cleans a dataset like full_dataset_cleaning, if the content
+    of the file, the parameters or the code of the cleaning changed since the last run.
+    Otherwise the cleaned dataset is loaded from the cache.
+    Input:  - cache(StageCache): The cache of the stages
+            - input_path(string): The path of the raw dataset (see functions_io.read_dataset)
+            - columns(list): The columns to read, all columns if None
+            - stats, compact, firm_sizes: see full_dataset_cleaning
+            - workers(int): The number of processes of the cleaning, the result is the
+              same for every number (see parallel_dataset_cleaning)
+    Output: - [cleaned, key]: The cleaned dataset and its key, which can be given to
+              cached_distance_measures instead of hashing the dataset again
+    Raises: - KeyError if a column of the cleaning plan does not exist
+    """
+    key = stage_key(
+        "full_dataset_cleaning",
+        file_hash(input_path),
+        columns,
+        compact,
+        firm_sizes,
+        source_hash(CLEANING_MODULES),
+    )
+    if key in cache:
+        start = time.perf_counter()
+        cleaned = cache.get(key)
+        if stats is not None:
+            stats.add(
+                "cleaning",
+                "cached",
+                time.perf_counter() - start,
+                len(cleaned),
+                len(cleaned),
+            )
+        logger.info("Stage cache: cleaned dataset loaded")
+        return [cleaned, key]
+    dataset = fio.read_dataset(input_path, columns=columns)
+    cleaned = fc.parallel_dataset_cleaning(
+        dataset=dataset,
+        workers=workers,
+        stats=stats,
+        compact=compact,
+        firm_sizes=firm_sizes,
+    )
+    cache.put(key, cleaned)
+    return [cleaned, key]
+
+
+def cached_distance_measures(
+    cache,
+    data,
+    city_gps_match_data,
+    used_columns,
+    data_key=None,
+    matcher=None,
+    distance_method="vincenty",
+    cache_path=None,
+    match_output_path="city_names_match.parquet",
+    workers=1,
+    stats=None,
+    compact=True,
+    spatial_fallback_km=None,
+    min_fuzzy_rating=dcf.MIN_FUZZY_RATING,
+):
+    """
+    This function computes the distances like create_distance_measures, but stores the
+    state after the expensive stages (CACHED_STAGES, the fuzzy matching and the distances)
+    in the cache. The key of a stage is computed from the key of the stage before, the
+    parameters which the stage reads (STAGE_OPTIONS) and the code, so that the computation
+    starts at the last stored stage before the first changed one. A new used_columns list
+    only repeats the stages after the distances and a new fuzzy rating cut-off starts after
+    the fuzzy matching. Unlike create_distance_measures, data is not changed.
+    Input:  - cache(StageCache): The cache of the stages
+            - data(pd.df): The cleaned dataset
+            - city_gps_match_data(pd.df): All german cities with their gps coordinates
+            - used_columns(list): The columns, which are kept in the final dataset
+            - data_key(string): The key of data from cached_dataset_cleaning, the hash of
+              data is computed if None
+            - the other parameters: see create_distance_measures
+    Output: - [data, city_names]: The final dataset and the matched city names
+    Raises: None
+    """
+    options = {
+        "used_columns": used_columns,
+        "matcher": matcher,
+        "distance_method": distance_method,
+        "cache_path": cache_path,
+        "match_output_path": match_output_path,
+        "workers": workers,
+        "compact": compact,
+        "spatial_fallback_km": spatial_fallback_km,
+        "min_fuzzy_rating": min_fuzzy_rating,
+    }
+    if data_key is None:
+        data_key = frame_hash(data)
+    code = source_hash(DISTANCE_MODULES)
+    keys = []
+    key = stage_key(data_key, frame_hash(city_gps_match_data))
+    for name, stage in dcf.DISTANCE_STAGES:
+        parameters = {option: options[option] for option in STAGE_OPTIONS[name]}
+        key = stage_key(key, name, parameters, code)
+        keys.append(key)
+
+    # start after the last stage, whose result is in the cache
+    first = 0
+    state = None
+    for position in range(len(keys) - 1, -1, -1):
+        if (
+            dcf.DISTANCE_STAGES[position][0] in CACHED_STAGES
+            and keys[position] in cache
+        ):
+            start = time.perf_counter()
+            state = dict(cache.get(keys[position]), options=options)
+            first = position + 1
+            if stats is not None:
+                stats.add(
+                    "distance",
+                    "cached",
+                    time.perf_counter() - start,
+                    len(state["data"]),
+                    len(state["data"]),
+                )
+            logger.info(
+                "Stage cache: %d of %d stages loaded", first, len(dcf.DISTANCE_STAGES)
+            )
+            break
+    if state is None:
+        state = dcf.new_distance_state(
+            data=data.copy(), city_gps_match_data=city_gps_match_data.copy(), **options
+        )
+
+    for position in range(first, len(keys)):
+        name, stage = dcf.DISTANCE_STAGES[position]
+        if stats is None:
+            stage(state)
+        else:
+            with stats.measure("distance", name, len(state["data"])) as result:
+                stage(state)
+                result["rows_out"] = len(state["data"])
+        if name not in CACHED_STAGES:
+            continue
+        cache.put(
+            keys[position],
+            {entry: value for entry, value in state.items() if entry != "options"},
+        )
+
+    # the matched city names are written, also if the matching was loaded
+    loaded = [name for name, stage in dcf.DISTANCE_STAGES[:first]]
+    if "match_city_names" in loaded and match_output_path is not None:
+        fio.write_dataset(data=state["city_names"], path=match_output_path)
+    return [state["data"], state["city_names"]]
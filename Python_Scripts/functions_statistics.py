@@ -0,0 +1,330 @@
+# Import the required libraries
+import numpy as np
+import pandas as pd
+import functions_io as fio
+
+
+class QuantileSketch:
+    """
+    This class estimates the quantiles of a column, which is read chunk by chunk, with the
+    DDSketch algorithm: the values are counted in buckets, whose bounds grow by the factor
+    (1 + relative_accuracy) / (1 - relative_accuracy), so every estimated quantile is within
+    relative_accuracy of a value of the column at the right rank. Two sketches of different
+    chunks are combined by adding the counts of the buckets.
+
+    Input:  - relative_accuracy(float): The relative error of the estimated quantiles
+    Raises: None
+    """
+
+    # values with a smaller absolute value are counted as zero
+    MIN_VALUE = 1e-9
+
+    def __init__(self, relative_accuracy=0.005):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.positive = pd.Series(dtype="int64")
+        self.negative = pd.Series(dtype="int64")
+        self.zeros = 0
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def __buckets(self, values):
+        indices = np.ceil(np.log(values) / np.log(self.gamma)).astype(np.int64)
+        return pd.Series(indices).value_counts()
+
+    def update(self, values):
+        """
+        This function adds the values of a chunk to the sketch, missing values are ignored.
+        Input:  - values(np.array or pd.Series): The values
+        Output: None
+        Raises: None
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        positive = values > self.MIN_VALUE
+        negative = values < -self.MIN_VALUE
+        self.positive = self.positive.add(
+            self.__buckets(values[positive]), fill_value=0
+        ).astype("int64")
+        self.negative = self.negative.add(
+            self.__buckets(-values[negative]), fill_value=0
+        ).astype("int64")
+        self.zeros += int(len(values) - positive.sum() - negative.sum())
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    def merge(self, other):
+        """
+        This function adds the counts of another sketch with the same relative accuracy.
+        """
+        self.positive = self.positive.add(other.positive, fill_value=0).astype("int64")
+        self.negative = self.negative.add(other.negative, fill_value=0).astype("int64")
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantiles(self, probabilities):
+        """
+        This function estimates the quantiles of the values added so far.
+        Input:  - probabilities(list): The probabilities of the quantiles, from 0 to 1
+        Output: - quantiles(np.array): The estimated quantiles, nan if no value was added
+        Raises: None
+        """
+        if self.count == 0:
+            return np.full(len(probabilities), np.nan)
+        # the buckets from the smallest to the largest values with their estimates
+        negative = self.negative.sort_index(ascending=False)
+        positive = self.positive.sort_index()
+        estimates = np.concatenate(
+            [
+                -2 * self.gamma ** negative.index.to_numpy() / (self.gamma + 1),
+                [0.0],
+                2 * self.gamma ** positive.index.to_numpy() / (self.gamma + 1),
+            ]
+        )
+        counts = np.concatenate(
+            [negative.to_numpy(), [self.zeros], positive.to_numpy()]
+        ).cumsum()
+        ranks = np.asarray(probabilities, dtype=np.float64) * (self.count - 1)
+        # the first bucket, which contains more values than the rank
+        positions = np.searchsorted(counts, ranks, side="right")
+        return np.clip(estimates[positions], self.min, self.max)
+
+
+class SummaryStatistics:
+    """
+    This class computes the tables of the analysis notebook in one pass over the dataset,
+    which can be given in chunks: the descriptive statistics of the numeric columns (like
+    describe, with the quantiles of QuantileSketch), the relative shares of the categories
+    of the cluster columns (like get_category_counts) and the correlation matrix (like
+    corr, with the pairwise complete rows).
+    The moments are combined over the chunks with the formulas of Chan et al., which are
+    as exact as the computation on the whole column.
+
+    Input:  - numeric_columns(list): The columns of the descriptive statistics
+            - category_columns(list): The columns of the category shares
+            - correlation_columns(list): The columns of the correlation matrix,
+              numeric_columns if None
+            - relative_accuracy(float): The relative error of the quantiles
+    Raises: None
+    """
+
+    def __init__(
+        self,
+        numeric_columns,
+        category_columns=(),
+        correlation_columns=None,
+        relative_accuracy=0.005,
+    ):
+        self.numeric_columns = list(numeric_columns)
+        self.category_columns = list(category_columns)
+        if correlation_columns is None:
+            correlation_columns = numeric_columns
+        self.correlation_columns = list(correlation_columns)
+        self.rows = 0
+        self.sketches = {
+            column: QuantileSketch(relative_accuracy) for column in self.numeric_columns
+        }
+        self.category_counts = {
+            column: pd.Series(dtype="int64") for column in self.category_columns
+        }
+        # the moments of every pair of correlation columns, over the rows where both
+        # are not missing: count, means, sums of squared deviations and co-moments
+        size = len(self.correlation_columns)
+        self.pair_count = np.zeros((size, size))
+        self.pair_mean = np.zeros((size, size))
+        self.pair_m2 = np.zeros((size, size))
+        self.pair_comoment = np.zeros((size, size))
+        # the moments of every numeric column
+        size = len(self.numeric_columns)
+        self.count = np.zeros(size)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    def columns(self):
+        """
+        This function returns the columns, which are needed for the statistics.
+        """
+        return list(
+            dict.fromkeys(
+                self.numeric_columns + self.category_columns + self.correlation_columns
+            )
+        )
+
+    def update(self, chunk):
+        """
+        This function adds the rows of a chunk to the statistics.
+        Input:  - chunk(pd.df): The rows, with the columns of the statistics
+        Output: None
+        Raises: - KeyError if a column does not exist
+        """
+        self.rows += len(chunk)
+        values = self.__numeric(chunk, self.numeric_columns)
+        present = ~np.isnan(values)
+        count = present.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nansum(values, axis=0) / count
+            m2 = np.nansum((values - mean) ** 2, axis=0)
+        self.count, self.mean, self.m2 = self.__combine(
+            (self.count, self.mean, self.m2), (count, np.nan_to_num(mean), m2)
+        )
+        for position, column in enumerate(self.numeric_columns):
+            self.sketches[column].update(values[:, position])
+
+        for column in self.category_columns:
+            self.category_counts[column] = (
+                self.category_counts[column]
+                .add(chunk[column].value_counts(sort=False), fill_value=0)
+                .astype("int64")
+            )
+
+        self.__update_pairs(self.__numeric(chunk, self.correlation_columns))
+
+    def __numeric(self, chunk, columns):
+        # the columns as float64, booleans as 0 and 1 and missing values as nan
+        return np.column_stack(
+            [
+                pd.to_numeric(chunk[column], errors="coerce")
+                .astype(np.float64)
+                .to_numpy()
+                for column in columns
+            ]
+            or [np.empty((len(chunk), 0))]
+        )
+
+    def __combine(self, first, second):
+        # the moments of two parts with the formulas of Chan et al.
+        count_a, mean_a, m2_a = first
+        count_b, mean_b, m2_b = second
+        count = count_a + count_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean_b - mean_a
+            share = np.where(count > 0, count_b / count, 0)
+            mean = mean_a + delta * share
+            m2 = m2_a + m2_b + delta**2 * count_a * share
+        return count, mean, m2
+
+    def __update_pairs(self, values):
+        present = ~np.isnan(values)
+        mask = present.astype(np.float64)
+        # the deviations from the column means of the chunk keep the sums small
+        with np.errstate(invalid="ignore"):
+            shift = np.nan_to_num(np.nanmean(values, axis=0))
+        filled = np.where(present, values - shift, 0.0)
+        count = mask.T @ mask
+        # sums[i, j]: the sum of column i over the rows where column j is present
+        sums = filled.T @ mask
+        squares = (filled**2).T @ mask
+        products = filled.T @ filled
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, sums / count, 0.0)
+            m2 = squares - sums * mean
+            comoment = products - sums * mean.T
+        mean = mean + shift[:, None]
+        # the co-moment of two parts gets the product of the deviations of both means
+        count_a = self.pair_count
+        total = count_a + count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            share = np.where(total > 0, count / total, 0)
+        delta = mean - self.pair_mean
+        self.pair_comoment = (
+            self.pair_comoment + comoment + delta * delta.T * count_a * share
+        )
+        self.pair_count, self.pair_mean, self.pair_m2 = self.__combine(
+            (self.pair_count, self.pair_mean, self.pair_m2), (count, mean, m2)
+        )
+
+    def describe(self):
+        """
+        This function returns the descriptive statistics of the numeric columns, with the
+        rows of describe: count, mean, std, min, 25%, 50%, 75% and max.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(self.m2 / (self.count - 1))
+        table = {}
+        for position, column in enumerate(self.numeric_columns):
+            sketch = self.sketches[column]
+            table[column] = [
+                self.count[position],
+                self.mean[position] if self.count[position] > 0 else np.nan,
+                std[position],
+                sketch.min if sketch.count > 0 else np.nan,
+                *sketch.quantiles([0.25, 0.5, 0.75]),
+                sketch.max if sketch.count > 0 else np.nan,
+            ]
+        return pd.DataFrame(
+            table, index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+        )
+
+    def category_shares(self):
+        """
+        This function returns the relative shares of the categories of every category
+        column, like get_category_counts of the notebook: the number of rows of a category
+        divided by the number of rows, in the order of value_counts.
+        """
+        tables = []
+        for column in self.category_columns:
+            counts = self.category_counts[column].sort_values(
+                ascending=False, kind="stable"
+            )
+            tables.append(
+                pd.DataFrame(
+                    {
+                        "Category": counts.index,
+                        "Column": column,
+                        "Relative Share": counts / self.rows,
+                    }
+                )
+            )
+        return pd.concat(tables, ignore_index=True)
+
+    def correlation(self):
+        """
+        This function returns the pearson correlation matrix of the correlation columns,
+        every correlation over the rows, where both columns are not missing.
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            matrix = self.pair_comoment / np.sqrt(self.pair_m2 * self.pair_m2.T)
+        # at least two rows are needed, as for corr
+        matrix[self.pair_count < 2] = np.nan
+        return pd.DataFrame(
+            np.clip(matrix, -1, 1),
+            index=self.correlation_columns,
+            columns=self.correlation_columns,
+        )
+
+
+def summarize_dataset(
+    path,
+    numeric_columns,
+    category_columns=(),
+    correlation_columns=None,
+    relative_accuracy=0.005,
+    chunksize=500000,
+):
+    """
+    This function computes the summary statistics of a dataset file chunk by chunk, only
+    the needed columns are read (see functions_io.iter_dataset).
+    Input:  - path(string): The path of the dataset, like dataset_final.parquet
+            - the other parameters: see SummaryStatistics
+            - chunksize(int): The number of rows read at once
+    Output: - statistics(SummaryStatistics): The statistics, see describe, category_shares
+              and correlation
+    Raises: - KeyError if a column does not exist
+    """
+    statistics = SummaryStatistics(
+        numeric_columns=numeric_columns,
+        category_columns=category_columns,
+        correlation_columns=correlation_columns,
+        relative_accuracy=relative_accuracy,
+    )
+    for chunk in fio.iter_dataset(
+        path, columns=statistics.columns(), chunksize=chunksize
+    ):
+        statistics.update(chunk)
+    return statistics
@@ -0,0 +1,302 @@
+# Import the required libraries
+import numpy as np
+import pandas as pd
+import functions_geodesic as fg
+
+# the length of one degree of latitude on the sphere with the mean earth radius
+KM_PER_DEGREE = np.pi * fg.MEAN_EARTH_RADIUS_KM / 180
+# the latitude, at which the longitudes are scaled to km, the middle of germany
+REFERENCE_LATITUDE = 51.0
+
+
+def __project(latitudes, longitudes, reference_latitude):
+    # equirectangular projection in km, exact enough for cells of a few km in germany
+    y = np.asarray(latitudes, dtype=np.float64) * KM_PER_DEGREE
+    x = (
+        np.asarray(longitudes, dtype=np.float64)
+        * KM_PER_DEGREE
+        * np.cos(np.radians(reference_latitude))
+    )
+    return x, y
+
+
+def __unproject(x, y, reference_latitude):
+    latitudes = y / KM_PER_DEGREE
+    longitudes = x / (KM_PER_DEGREE * np.cos(np.radians(reference_latitude)))
+    return latitudes, longitudes
+
+
+def grid_cells(latitudes, longitudes, cell_km, reference_latitude=REFERENCE_LATITUDE):
+    """
+    This function assigns every point to a square cell with a side of cell_km.
+    Input:  - latitudes, longitudes(np.array): The coordinates in degrees
+            - cell_km(float): The side of a cell in km
+            - reference_latitude(float): The latitude, at which the cells are squares
+    Output: - columns, rows(np.array): The cell of every point as int64
+    Raises: None
+    """
+    x, y = __project(latitudes, longitudes, reference_latitude)
+    return (
+        np.floor(x / cell_km).astype(np.int64),
+        np.floor(y / cell_km).astype(np.int64),
+    )
+
+
+def hex_cells(latitudes, longitudes, cell_km, reference_latitude=REFERENCE_LATITUDE):
+    """
+    This function assigns every point to a hexagon (with a corner at the top) with a
+    width of cell_km, the distance between the centers of two neighbouring hexagons.
+    The hexagons are given in axial coordinates, the point is rounded to the nearest
+    hexagon center in cube coordinates.
+    Input:  - latitudes, longitudes(np.array): The coordinates in degrees
+            - cell_km(float): The width of a hexagon in km
+            - reference_latitude(float): The latitude, at which the hexagons are regular
+    Output: - columns, rows(np.array): The axial coordinates q and r of every point as int64
+    Raises: None
+    """
+    x, y = __project(latitudes, longitudes, reference_latitude)
+    size = cell_km / np.sqrt(3)
+    q = (np.sqrt(3) / 3 * x - y / 3) / size
+    r = 2 / 3 * y / size
+    s = -q - r
+    rounded_q, rounded_r, rounded_s = np.round(q), np.round(r), np.round(s)
+    q_diff = np.abs(rounded_q - q)
+    r_diff = np.abs(rounded_r - r)
+    s_diff = np.abs(rounded_s - s)
+    # the coordinate with the largest rounding error is given by the other two
+    fix_q = (q_diff > r_diff) & (q_diff > s_diff)
+    fix_r = ~fix_q & (r_diff > s_diff)
+    rounded_q = np.where(fix_q, -rounded_r - rounded_s, rounded_q)
+    rounded_r = np.where(fix_r, -rounded_q - rounded_s, rounded_r)
+    return rounded_q.astype(np.int64), rounded_r.astype(np.int64)
+
+
+def __cell_centers(columns, rows, cell_km, shape):
+    columns = np.asarray(columns, dtype=np.float64)
+    rows = np.asarray(rows, dtype=np.float64)
+    if shape == "grid":
+        x, y = (columns + 0.5) * cell_km, (rows + 0.5) * cell_km
+    else:
+        size = cell_km / np.sqrt(3)
+        x = size * np.sqrt(3) * (columns + rows / 2)
+        y = size * 1.5 * rows
+    return x, y
+
+
+def aggregate_tiles(
+    data,
+    latitude_column,
+    longitude_column,
+    value_column="log_duration",
+    cell_km=10,
+    shape="hex",
+    reference_latitude=REFERENCE_LATITUDE,
+):
+    """
+    This function counts the rows in every cell of a square grid or of hexagons and
+    computes the mean of a value per cell, for maps, which draw one shape per cell instead
+    of one marker per vacancy. Rows without coordinates are left out, rows without a value
+    are counted, but not used for the mean. The tiles of several chunks of a dataset can
+    be put together with combine_tiles.
+    Input:  - data(pd.df): The dataset, like the final dataset
+            - latitude_column, longitude_column(string): The columns with the coordinates
+              in degrees, like "latitudal_coordinates_job"
+            - value_column(string): The column, whose mean is computed, no mean if None
+            - cell_km(float): The side of a square or the width of a hexagon in km
+            - shape(string): "hex" for hexagons or "grid" for squares
+            - reference_latitude(float): The latitude, at which the cells are not distorted
+    Output: - tiles(pd.df): One row per cell with at least one row: the cell ("column",
+              "row"), the center ("latitude", "longitude"), "count", "value_count",
+              "value_sum" and "mean"
+    Raises: - ValueError if the shape is unknown
+    """
+    if shape not in ("hex", "grid"):
+        raise ValueError("Unknown shape: " + str(shape))
+    latitudes = pd.to_numeric(data[latitude_column], errors="coerce").to_numpy(
+        dtype=np.float64
+    )
+    longitudes = pd.to_numeric(data[longitude_column], errors="coerce").to_numpy(
+        dtype=np.float64
+    )
+    located = np.isfinite(latitudes) & np.isfinite(longitudes)
+    cells = hex_cells if shape == "hex" else grid_cells
+    columns, rows = cells(
+        latitudes[located], longitudes[located], cell_km, reference_latitude
+    )
+    if value_column is None:
+        values = np.full(len(columns), np.nan)
+    else:
+        values = pd.to_numeric(data[value_column], errors="coerce").to_numpy(
+            dtype=np.float64
+        )[located]
+    # one int64 key per cell, np.unique of a 2d array is much slower
+    low_column = columns.min() if len(columns) > 0 else 0
+    low_row = rows.min() if len(rows) > 0 else 0
+    span = (rows.max() - low_row + 1) if len(rows) > 0 else 1
+    keys, inverse = np.unique(
+        (columns - low_column) * span + (rows - low_row), return_inverse=True
+    )
+    has_value = ~np.isnan(values)
+    tiles = pd.DataFrame(
+        {
+            "column": keys // span + low_column,
+            "row": keys % span + low_row,
+            "count": np.bincount(inverse, minlength=len(keys)),
+            "value_count": np.bincount(
+                inverse, weights=has_value, minlength=len(keys)
+            ).astype(np.int64),
+            "value_sum": np.bincount(
+                inverse, weights=np.where(has_value, values, 0), minlength=len(keys)
+            ),
+        }
+    )
+    return __finish_tiles(tiles, cell_km, shape, reference_latitude)
+
+
+def __finish_tiles(tiles, cell_km, shape, reference_latitude):
+    # the centers and the means of the cells, with the parameters kept for the map
+    x, y = __cell_centers(tiles["column"], tiles["row"], cell_km, shape)
+    latitudes, longitudes = __unproject(x, y, reference_latitude)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = tiles["value_sum"] / tiles["value_count"]
+    tiles = tiles.assign(latitude=latitudes, longitude=longitudes, mean=mean)
+    tiles.attrs = {
+        "cell_km": cell_km,
+        "shape": shape,
+        "reference_latitude": reference_latitude,
+    }
+    return tiles
+
+
+def combine_tiles(tiles):
+    """
+    This function puts the tiles of several chunks of a dataset together, the counts and
+    sums of the same cell are added.
+    Input:  - tiles(list): The results of aggregate_tiles with the same cells
+    Output: - tiles(pd.df): The tiles of all chunks, like aggregate_tiles on the whole dataset
+    Raises: - ValueError if the tiles have different cells
+    """
+    settings = tiles[0].attrs
+    if any(part.attrs != settings for part in tiles):
+        raise ValueError("The tiles have different cells")
+    combined = (
+        pd.concat(tiles)
+        .groupby(["column", "row"], as_index=False, sort=True)[
+            ["count", "value_count", "value_sum"]
+        ]
+        .sum()
+    )
+    return __finish_tiles(
+        combined,
+        settings["cell_km"],
+        settings["shape"],
+        settings["reference_latitude"],
+    )
+
+
+def tile_polygons(tiles):
+    """
+    This function returns the corners of every cell for drawing.
+    Input:  - tiles(pd.df): The result of aggregate_tiles
+    Output: - corners(np.array): The corners (latitude, longitude) of every cell in degrees,
+              with the shape (cells, corners, 2)
+    Raises: None
+    """
+    settings = tiles.attrs
+    cell_km = settings["cell_km"]
+    x, y = __cell_centers(tiles["column"], tiles["row"], cell_km, settings["shape"])
+    if settings["shape"] == "grid":
+        offsets_x = np.array([-0.5, 0.5, 0.5, -0.5]) * cell_km
+        offsets_y = np.array([-0.5, -0.5, 0.5, 0.5]) * cell_km
+    else:
+        angles = np.radians(60 * np.arange(6) - 30)
+        offsets_x = np.cos(angles) * cell_km / np.sqrt(3)
+        offsets_y = np.sin(angles) * cell_km / np.sqrt(3)
+    latitudes, longitudes = __unproject(
+        x[:, None] + offsets_x[None, :],
+        y[:, None] + offsets_y[None, :],
+        settings["reference_latitude"],
+    )
+    return np.stack([latitudes, longitudes], axis=-1)
+
+
+def tiles_geojson(tiles, colors=None):
+    """
+    This function converts the tiles to a GeoJSON feature collection, one polygon per cell
+    with the count and the mean as properties.
+    Input:  - tiles(pd.df): The result of aggregate_tiles
+            - colors(list): The fill color of every cell as hex string, no color if None
+    Output: - geojson(dict): The feature collection
+    Raises: None
+    """
+    corners = tile_polygons(tiles)
+    counts = tiles["count"].to_numpy()
+    means = tiles["mean"].to_numpy(dtype=np.float64)
+    features = []
+    for i in range(len(tiles)):
+        ring = [[float(lon), float(lat)] for lat, lon in corners[i]]
+        ring.append(ring[0])
+        properties = {
+            "count": int(counts[i]),
+            "mean": None if np.isnan(means[i]) else round(float(means[i]), 3),
+        }
+        if colors is not None:
+            properties["color"] = colors[i]
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+                "properties": properties,
+            }
+        )
+    return {"type": "FeatureCollection", "features": features}
+
+
+def tile_map(
+    tiles,
+    color_column="mean",
+    location=(51.0, 9.0),
+    zoom_start=6,
+    tiles_layer="cartodbpositron",
+    opacity=0.7,
+):
+    """
+    This function draws the tiles on a folium map, one polygon per cell, so the size of
+    the map grows with the number of cells and not with the number of vacancies. The cells
+    are colored by color_column, the tooltip shows the count and the mean.
+    folium is only imported, when a map is drawn.
+    Input:  - tiles(pd.df): The result of aggregate_tiles or combine_tiles
+            - color_column(string): "mean" or "count"
+            - location(tuple): The center of the map
+            - zoom_start(int): The zoom of the map
+            - tiles_layer(string): The background map of folium
+            - opacity(float): The opacity of the cells
+    Output: - m(folium.Map): The map, which can be saved as html with m.save(path)
+    Raises: - ImportError if folium is not installed
+    """
+    import folium
+    import branca.colormap as cm
+
+    values = tiles[color_column].to_numpy(dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    low, high = (finite.min(), finite.max()) if len(finite) > 0 else (0.0, 1.0)
+    colormap = cm.LinearColormap(
+        ["#f7fcfd", "#8c96c6", "#4d004b"],
+        vmin=low,
+        vmax=high if high > low else low + 1,
+        caption=color_column,
+    )
+    colors = [colormap(value) if np.isfinite(value) else "#cccccc" for value in values]
+    m = folium.Map(location=list(location), zoom_start=zoom_start, tiles=tiles_layer)
+    folium.GeoJson(
+        tiles_geojson(tiles, colors=colors),
+        style_function=lambda feature: {
+            "fillColor": feature["properties"]["color"],
+            "color": feature["properties"]["color"],
+            "weight": 0.5,
+            "fillOpacity": opacity,
+        },
+        tooltip=folium.GeoJsonTooltip(fields=["count", "mean"]),
+    ).add_to(m)
+    colormap.add_to(m)
+    return m
@@ -0,0 +1,11 @@
+# The pipeline modules import each other by their names, so the tests import them from
+# the directory of the scripts, like the notebooks and scripts do.
+import os
+import sys
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Python_Scripts"
+    ),
+)
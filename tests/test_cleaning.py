@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+
+import functions_benchmark as fb
+import functions_cleaning as fc
+import functions_io as fio
+import functions_shared_memory as fsm
+
+
+@pytest.fixture(scope="module")
+def vacancies_csv(tmp_path_factory):
+    gazetteer = fb.generate_gazetteer(200)
+    data = fb.generate_vacancies(6000, gazetteer)
+    # a column, which is not used by the pipeline
+    data["unused"] = "text"
+    path = tmp_path_factory.mktemp("raw") / "vacancies.csv"
+    data.to_csv(path, index=False)
+    return str(path)
+
+
+def test_stream_reads_only_the_given_columns(vacancies_csv, tmp_path, monkeypatch):
+    calls = []
+    read_csv = pd.read_csv
+
+    def recording_read_csv(*args, **kwargs):
+        calls.append(kwargs.get("usecols"))
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_csv", recording_read_csv)
+    output_path = str(tmp_path / "cleaned.parquet")
+    fc.stream_dataset_cleaning(
+        vacancies_csv,
+        output_path,
+        columns=list(fc.RAW_DTYPES),
+        dtypes=fc.RAW_DTYPES,
+        chunksize=1000,
+    )
+    # the first pass only needs the location names
+    assert calls == [["organization_location_name"], list(fc.RAW_DTYPES)]
+    monkeypatch.undo()
+
+    expected = fc.full_dataset_cleaning(
+        pd.read_csv(vacancies_csv, usecols=list(fc.RAW_DTYPES), dtype=fc.RAW_DTYPES)
+    )
+    pd.testing.assert_frame_equal(
+        fio.read_dataset(output_path),
+        expected,
+        check_dtype=False,
+        check_categorical=False,
+    )
+
+
+@pytest.mark.parametrize(
+    "column, value",
+    [("hours_per_week_from", 37.5), ("organization_ID", 3_000_000_000)],
+)
+def test_stream_widens_the_dtypes_of_later_chunks(tmp_path, column, value):
+    gazetteer = fb.generate_gazetteer(200)
+    data = fb.generate_vacancies(6000, gazetteer)
+    # only the last chunk has fractional hours or an ID, which does not fit into Int32
+    data[column] = data[column].astype(object)
+    data.loc[data.index[-1500:], column] = value
+    input_path = str(tmp_path / "vacancies.csv")
+    data.to_csv(input_path, index=False)
+    output_path = str(tmp_path / "cleaned.parquet")
+    fc.stream_dataset_cleaning(
+        input_path,
+        output_path,
+        columns=list(fc.RAW_DTYPES),
+        dtypes=fc.RAW_DTYPES,
+        chunksize=1000,
+    )
+
+    expected_path = str(tmp_path / "expected.parquet")
+    fio.write_dataset(
+        fc.full_dataset_cleaning(
+            pd.read_csv(input_path, usecols=list(fc.RAW_DTYPES), dtype=fc.RAW_DTYPES)
+        ),
+        expected_path,
+    )
+    streamed = fio.read_dataset(output_path)
+    expected = fio.read_dataset(expected_path)
+    assert (streamed[column] == value).any()
+    pd.testing.assert_frame_equal(streamed, expected, check_categorical=False)
+
+
+def test_parallel_equals_full_cleaning(vacancies_csv, monkeypatch):
+    # the location coordinates have more distinct values, their text is shared
+    monkeypatch.setattr(fsm, "MAX_SENT_UNIQUES", 100)
+    dataset = pd.read_csv(
+        vacancies_csv, usecols=list(fc.RAW_DTYPES), dtype=fc.RAW_DTYPES
+    )
+    with fsm.SharedFrame(dataset) as shared:
+        shared_text = [
+            entry["column"]
+            for entry in shared.description()["columns"]
+            if entry["text"] is not None
+        ]
+    assert "location_coordinates" in shared_text
+    pd.testing.assert_frame_equal(
+        fc.parallel_dataset_cleaning(dataset, workers=2),
+        fc.full_dataset_cleaning(dataset),
+    )
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import functions_codes as fcd
+
+
+def sliced_prefix(values, length):
+    # the string slicing, which the cleaning used before. It raised for missing codes
+    # ("nan"), here they stay missing.
+    return pd.to_numeric(
+        values.apply(lambda x: str(x)[:length] if pd.notna(x) else np.nan)
+    )
+
+
+@pytest.fixture
+def codes():
+    rng = np.random.default_rng(0)
+    # codes with 1 to 10 digits, like the ISCO codes and their placeholders
+    digits = rng.integers(1, 11, 2000)
+    low = np.where(digits == 1, 0, 10 ** (digits - 1))
+    values = rng.integers(low, 10**digits)
+    return pd.Series(
+        values, index=np.arange(2000) * 3, name="profession_isco_code_value"
+    )
+
+
+@pytest.mark.parametrize("length", [1, 2, 3, 4])
+def test_prefixes_equal_the_string_slicing(codes, length):
+    prefix = fcd.code_prefixes(codes, [length])[length]
+    assert prefix.dtype == np.int64
+    pd.testing.assert_series_equal(
+        prefix, sliced_prefix(codes, length), check_names=False
+    )
+
+
+@pytest.mark.parametrize("length", [2, 3])
+def test_prefixes_of_missing_codes_equal_the_string_slicing(codes, length):
+    # with missing codes, the column is float64 and the string slicing sees "2512.0"
+    values = codes.astype(np.float64)
+    values.iloc[::7] = np.nan
+    prefix = fcd.code_prefixes(values, [length])[length]
+    assert prefix.isna().sum() == values.isna().sum()
+    pd.testing.assert_series_equal(
+        prefix, sliced_prefix(values, length), check_names=False
+    )
+
+
+def test_code_aggregation_names_the_levels(codes):
+    aggregated = fcd.code_aggregation({1: 3, 2: 2})(codes)
+    assert list(aggregated) == [
+        "profession_isco_code_value_agg_1",
+        "profession_isco_code_value_agg_2",
+    ]
+    pd.testing.assert_series_equal(
+        aggregated["profession_isco_code_value_agg_2"],
+        sliced_prefix(codes, 2),
+        check_names=False,
+    )
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import functions_cube as fcu
+
+
+@pytest.fixture
+def final_dataset():
+    rng = np.random.default_rng(0)
+    n = 5000
+    data = pd.DataFrame(
+        {
+            "log_duration": rng.normal(3, 1, n),
+            # distances past the last edge have no bin
+            "distance_between_job_and_organization": rng.uniform(0, 1000, n),
+            "Applicant_language_cluster": rng.choice(["German", "International"], n),
+            "contract_type_label_cluster": pd.Categorical(
+                rng.choice(["Permanent", "Non_Permanent", None], n)
+            ),
+            "education_level_cluster": rng.choice(["University", "Other"], n),
+            "salary_dummy": rng.random(n) < 0.3,
+            "region_value": pd.array(rng.integers(1, 17, n), dtype="Int16"),
+            "quarter_of_date": rng.integers(1, 5, n),
+            "profession_isco_code_value_agg_2": pd.array(
+                rng.integers(10, 99, n), dtype="Int16"
+            ),
+            "organization_ID": rng.integers(0, 300, n),
+        }
+    )
+    data.loc[data.index[::97], "region_value"] = pd.NA
+    data.loc[data.index[::89], "log_duration"] = np.nan
+    return fcu.add_distance_bins(data)
+
+
+@pytest.mark.parametrize(
+    "grouping",
+    [
+        [],
+        ["salary_dummy"],
+        ["distance_bins"],
+        ["Applicant_language_cluster", "salary_dummy"],
+        ["distance_bins", "contract_type_label_cluster"],
+        ["region_value"],
+        ["quarter_of_date"],
+    ],
+)
+def test_cube_table_equals_groupby(final_dataset, grouping):
+    assert final_dataset["distance_bins"].isna().any()
+    table = fcu.cube_table(fcu.build_cube(final_dataset), grouping)
+    rows = final_dataset[final_dataset["log_duration"].notna()]
+    if grouping:
+        expected = (
+            rows.groupby(grouping, observed=True, sort=True)["log_duration"]
+            .agg(["count", "mean", "var"])
+            .reset_index()
+        )
+    else:
+        expected = rows["log_duration"].agg(["count", "mean", "var"]).to_frame().T
+    assert table["count"].tolist() == expected["count"].tolist()
+    np.testing.assert_allclose(table["mean"], expected["mean"])
+    np.testing.assert_allclose(table["variance"], expected["var"])
+    for column in grouping:
+        assert (
+            table[column].astype(object).tolist()
+            == expected[column].astype(object).tolist()
+        )
+
+
+def test_written_cube_keeps_the_dtypes(final_dataset, tmp_path):
+    cube = fcu.build_cube(final_dataset)
+    path = str(tmp_path / "cube.parquet")
+    fcu.write_cube(cube, path)
+    read = fcu.read_cube(path)
+    assert str(read["region_value"].dtype) == "Int16"
+    assert str(read["quarter_of_date"].dtype) == "Int64"
+    assert str(read["salary_dummy"].dtype) == "boolean"
+    table = fcu.cube_table(read, ["quarter_of_date"])
+    assert [str(value) for value in table["quarter_of_date"]] == ["1", "2", "3", "4"]
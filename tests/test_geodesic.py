@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from geopy import distance
+
+import functions_geodesic as fg
+
+
+@pytest.fixture
+def german_pairs():
+    rng = np.random.default_rng(0)
+    n = 500
+    lat1, lat2 = rng.uniform(47.3, 55.0, (2, n))
+    lon1, lon2 = rng.uniform(5.9, 15.0, (2, n))
+    expected = np.array(
+        [
+            distance.geodesic((a, b), (c, d)).km
+            for a, b, c, d in zip(lat1, lon1, lat2, lon2)
+        ]
+    )
+    return (lat1, lon1, lat2, lon2), expected
+
+
+def test_vincenty_agrees_with_geopy_to_a_millimetre(german_pairs):
+    points, expected = german_pairs
+    np.testing.assert_allclose(fg.vincenty_distances(*points), expected, atol=1e-6)
+    lat, lon = np.array([50.7]), np.array([7.1])
+    assert fg.vincenty_distances(lat, lon, lat, lon)[0] == 0
+
+
+def test_haversine_error_is_below_the_documented_bound(german_pairs):
+    points, expected = german_pairs
+    relative_error = np.abs(fg.haversine_distances(*points) / expected - 1)
+    assert relative_error.max() < 0.006
+
+
+def test_nearly_antipodal_points_fall_back_to_geopy(monkeypatch):
+    calls = []
+    geodesic = distance.geodesic
+
+    def counting_geodesic(*args, **kwargs):
+        calls.append(args)
+        return geodesic(*args, **kwargs)
+
+    monkeypatch.setattr(distance, "geodesic", counting_geodesic)
+    lat1, lon1 = np.array([0.0, 50.7]), np.array([0.0, 7.1])
+    lat2, lon2 = np.array([0.5, 52.5]), np.array([179.7, 13.4])
+    distances = fg.vincenty_distances(lat1, lon1, lat2, lon2)
+    # only the antipodal pair is computed by geopy
+    assert len(calls) == 1
+    np.testing.assert_allclose(
+        distances,
+        [geodesic((0.0, 0.0), (0.5, 179.7)).km, geodesic((50.7, 7.1), (52.5, 13.4)).km],
+        atol=1e-6,
+    )
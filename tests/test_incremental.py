@@ -0,0 +1,53 @@
+import pandas as pd
+
+import functions_benchmark as fb
+import functions_cleaning as fc
+import functions_distance as dcf
+import functions_incremental as finc
+
+
+def test_two_drops_equal_the_full_recompute(tmp_path):
+    gazetteer = fb.generate_gazetteer(100)
+    data = fb.generate_vacancies(3000, gazetteer)
+    # postings without job_id are not kept by the store
+    data = data[data["job_id"].notna()]
+    first_drop = data.iloc[:2000]
+    second_drop = data.iloc[1500:].copy()
+    # replaced postings: one moves to a location name, which appears only once, the
+    # salary of the other changes
+    moved, other = second_drop.index[:2]
+    second_drop.loc[moved, "organization_location_name"] = "Neustadt am Test"
+    second_drop.loc[other, "salary"] = 12345.0
+    assert (data["organization_location_name"] != "Neustadt am Test").all()
+
+    store = finc.IncrementalStore(str(tmp_path / "store"))
+    store.add_postings(first_drop)
+    store.update_distances(gazetteer, dcf.USED_COLUMNS)
+    store.save()
+    # the second drop is added to the store read back from its files
+    store = finc.IncrementalStore(str(tmp_path / "store"))
+    new = ~second_drop["job_id"].isin(first_drop["job_id"])
+    assert store.add_postings(second_drop) == new.sum() + 2
+    final = store.update_distances(gazetteer, dcf.USED_COLUMNS)[0]
+
+    latest = pd.concat(
+        [first_drop[~first_drop["job_id"].isin(second_drop["job_id"])], second_drop]
+    )
+    latest.index = pd.to_numeric(latest["job_id"]).to_numpy()
+    cleaned = fc.full_dataset_cleaning(latest)
+    expected = dcf.create_distance_measures(
+        cleaned.copy(), gazetteer, dcf.USED_COLUMNS, match_output_path=None
+    )[0]
+    assert moved not in expected.index
+    pd.testing.assert_frame_equal(
+        store.cleaned_dataset().sort_index(),
+        cleaned.sort_index(),
+        check_dtype=False,
+        check_categorical=False,
+    )
+    pd.testing.assert_frame_equal(
+        final.sort_index(),
+        expected.sort_index(),
+        check_dtype=False,
+        check_categorical=False,
+    )
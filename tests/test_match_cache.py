@@ -0,0 +1,90 @@
+import pandas as pd
+
+import functions_benchmark as fb
+import functions_distance as dcf
+import functions_match_cache as fmc
+
+resolve_city_names = getattr(dcf, "__resolve_city_names")
+find_gps_coordinates = getattr(dcf, "__find_gps_coordinates")
+
+
+def city_names(gazetteer):
+    names = list(gazetteer["Stadt"].iloc[:20]) + ["münchenx", "nowhere at all"]
+    return pd.DataFrame({"organization_location_name": names})
+
+
+def test_match_cache_round_trip(tmp_path):
+    cache = fmc.MatchCache(str(tmp_path / "matches.sqlite"))
+    matches = pd.DataFrame(
+        {
+            "organization_location_name": ["köln", "bonn"],
+            "Latitudal_coordinates_organization": [50.94, 50.73],
+            "Longitudinal_coordinates_organization": [6.96, 7.1],
+            "best_match_name": ["köln", "bonn"],
+            "fuzzy_rating": [100, 100],
+        }
+    )
+    cache.store(matches=matches, gazetteer_hash="a")
+    found = cache.lookup(["bonn", "köln", "berlin"], "a")
+    pd.testing.assert_frame_equal(
+        found.sort_values("organization_location_name").reset_index(drop=True),
+        matches.sort_values("organization_location_name").reset_index(drop=True),
+    )
+    # the matches of another gazetteer are never returned
+    assert len(cache.lookup(["bonn", "köln"], "b")) == 0
+
+
+def test_resolve_city_names_reuses_the_cache_of_the_same_gazetteer(
+    tmp_path, monkeypatch
+):
+    gazetteer = fb.generate_gazetteer(100)
+    names = city_names(gazetteer)
+    cache_path = str(tmp_path / "matches.sqlite")
+    expected = find_gps_coordinates(
+        df=names.copy(),
+        gps_df=gazetteer,
+        column_name_df="organization_location_name",
+        column_name_gps="Stadt",
+    )
+    first = resolve_city_names(names.copy(), gazetteer, cache_path=cache_path)
+    pd.testing.assert_frame_equal(first, expected, check_dtype=False)
+
+    matched = []
+
+    def recording_find_gps_coordinates(df, **kwargs):
+        matched.append(list(df["organization_location_name"]))
+        return find_gps_coordinates(df=df, **kwargs)
+
+    monkeypatch.setattr(dcf, "__find_gps_coordinates", recording_find_gps_coordinates)
+    second = resolve_city_names(names.copy(), gazetteer, cache_path=cache_path)
+    assert matched == []
+    pd.testing.assert_frame_equal(second, expected, check_dtype=False)
+    # without the cache, all names are matched again
+    resolve_city_names(names.copy(), gazetteer, cache_path=str(tmp_path / "new.sqlite"))
+    assert matched == [list(names["organization_location_name"])]
+
+
+def test_resolve_city_names_does_not_use_matches_of_a_changed_gazetteer(tmp_path):
+    gazetteer = fb.generate_gazetteer(100)
+    names = city_names(gazetteer)
+    cache_path = str(tmp_path / "matches.sqlite")
+    resolve_city_names(names.copy(), gazetteer, cache_path=cache_path)
+
+    # the first city moved, its cached coordinates are stale
+    changed = gazetteer.copy()
+    changed.loc[changed.index[0], "Breitengrad"] += 1.0
+    assert fmc.gazetteer_hash(changed, "Stadt") != fmc.gazetteer_hash(
+        gazetteer, "Stadt"
+    )
+    resolved = resolve_city_names(names.copy(), changed, cache_path=cache_path)
+    expected = find_gps_coordinates(
+        df=names.copy(),
+        gps_df=changed,
+        column_name_df="organization_location_name",
+        column_name_gps="Stadt",
+    )
+    pd.testing.assert_frame_equal(resolved, expected, check_dtype=False)
+    assert (
+        resolved.loc[0, "Latitudal_coordinates_organization"]
+        == changed.loc[changed.index[0], "Breitengrad"]
+    )
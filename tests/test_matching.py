@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from fuzzywuzzy import fuzz
+
+import functions_matching as fm
+
+
+def brute_force_match(name, names):
+    # the nested loop, which was replaced by CityMatcher
+    index_highest_fuzzy_ratio = -1
+    highest_fuzz = 0
+    for j, name_gps in enumerate(names):
+        ratio = fuzz.ratio(str(name), str(name_gps))
+        if ratio > highest_fuzz:
+            highest_fuzz = ratio
+            index_highest_fuzzy_ratio = j
+    return index_highest_fuzzy_ratio, highest_fuzz
+
+
+GAZETTEER = [
+    "berlin",
+    "bernau",
+    "bremen",
+    "bremerhaven",
+    "münchen",
+    "muenchen",
+    "köln",
+    "koeln",
+    "frankfurt am main",
+    "frankfurt oder",
+    "düsseldorf",
+    "",
+    "halle",
+    "hallea",
+    "ahalle",
+    "görlitz",
+    "straßburg",
+    "strassburg",
+    "ab",
+    "ba",
+]
+
+
+def assert_same_match(names, gazetteer):
+    matcher = fm.CityMatcher(gazetteer)
+    for name in names:
+        assert matcher.match(name) == brute_force_match(name, gazetteer), name
+
+
+def test_exact_and_fuzzy_names():
+    assert_same_match(
+        ["berlin", "berli", "bremn", "frankfurt", "frankfurt/main", "hamburg", "xyz"],
+        GAZETTEER,
+    )
+
+
+def test_ties_resolve_to_first_city():
+    # "halle" + one character has the same rating with hallea and ahalle
+    assert_same_match(["hallex", "xhalle", "ab", "ba", "aa", "b"], GAZETTEER)
+    matcher = fm.CityMatcher(["ab", "ba", "ab"])
+    assert matcher.match("ab") == (0, 100)
+    assert matcher.match("a") == brute_force_match("a", ["ab", "ba", "ab"])
+
+
+def test_empty_strings():
+    assert_same_match([""], GAZETTEER)
+    assert_same_match(["", "a"], ["berlin", "köln"])
+    assert fm.CityMatcher([]).match("berlin") == (-1, 0)
+
+
+def test_non_ascii_names():
+    assert_same_match(
+        ["munchen", "münchen", "muenchen", "kóln", "strasburg", "straßbürg", "görlitz"],
+        GAZETTEER,
+    )
+    # characters, which do not appear in the gazetteer
+    assert_same_match(["łódź", "日本", "ççç"], GAZETTEER)
+
+
+def test_cutoff_at_the_bound():
+    # names, whose upper bound equals the best rating, must still be compared
+    gazetteer = ["abcd", "abdc", "dcba", "abc", "abcde", "bcda"]
+    assert_same_match(["abcd", "abdc", "bacd", "abce", "dabc", "a", "abcdx"], gazetteer)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_names(seed):
+    rng = np.random.default_rng(seed)
+    alphabet = list("abeilnorstuäöü ")
+
+    def random_names(count):
+        return [
+            "".join(rng.choice(alphabet, size=rng.integers(0, 9))) for _ in range(count)
+        ]
+
+    gazetteer = random_names(200)
+    names = random_names(100) + gazetteer[:20]
+    matcher = fm.CityMatcher(gazetteer)
+    indices, ratings = matcher.match_many(names)
+    expected = [brute_force_match(name, gazetteer) for name in names]
+    assert list(indices) == [index for index, _ in expected]
+    assert list(ratings) == [rating for _, rating in expected]
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+import functions_profiling as fp
+
+
+def test_memory_of_a_step_does_not_carry_over():
+    stats = fp.PipelineStats()
+    with stats.measure("test", "large", 1):
+        values = np.ones(20_000_000)
+        values[:] = 2
+        del values
+    with stats.measure("test", "small", 1):
+        values = np.ones(10)
+    table = stats.to_frame().set_index("step")
+    if table["memory_increase_mb"].isna().any():
+        pytest.skip("the memory can not be measured on this system")
+    # the large step allocates 150 MB, the small step after it almost nothing
+    assert table.loc["large", "memory_increase_mb"] > 100
+    assert table.loc["small", "memory_increase_mb"] < 20
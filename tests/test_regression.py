@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import functions_regression as freg
+
+linearmodels = pytest.importorskip("linearmodels")
+from linearmodels.iv.absorbing import AbsorbingLS  # noqa: E402
+
+
+def data_preparation(data, specifications):
+    # the function of the analysis notebook
+    column_names = specifications["to_categorize"]
+    for columnname in column_names:
+        data[columnname] = data[columnname].astype("category")
+    # interaction terms
+    to_interact = specifications["to_interact"]
+    interactions = specifications["interactions"]
+    dummylist = []
+    for interaction_term in interactions:
+        interaction_value = data[interaction_term]
+        data = pd.get_dummies(data, columns=[interaction_term], prefix=interaction_term)
+        data[interaction_term] = interaction_value
+        interaction_dummies = data.columns[
+            data.columns.str.startswith(interaction_term)
+        ].tolist()
+        interaction_dummies = interaction_dummies[:-1]
+        for interaction_dummy in interaction_dummies:
+            for interaction_partner in to_interact:
+                new_string = interaction_dummy + "*" + interaction_partner
+                data[new_string] = data[interaction_dummy] * data[interaction_partner]
+            dummylist.append(new_string)
+
+    return [data, dummylist]
+
+
+def notebook_fit(data, specification):
+    # the steps of the notebook cells of the third specification
+    specification = dict(specification, covariates=list(specification["covariates"]))
+    interaction_dummy = data_preparation(data=data, specifications=specification)[1]
+    data_spec = data_preparation(data=data, specifications=specification)[0]
+    for interaction in specification["interactions"]:
+        for interaction_dummy_value in interaction_dummy:
+            if interaction_dummy_value.startswith(interaction):
+                interaction_dummy.remove(interaction_dummy_value)
+                break
+    specification["covariates"] += interaction_dummy
+    model = AbsorbingLS(
+        data_spec["log_duration"],
+        data_spec[specification["covariates"]].astype(
+            {column: float for column in interaction_dummy}
+        ),
+        absorb=data_spec[specification["fixed_effects"]],
+    )
+    return model.fit()
+
+
+@pytest.fixture
+def vacancies():
+    rng = np.random.default_rng(0)
+    n = 3000
+    data = pd.DataFrame(
+        {
+            "organization_ID": rng.integers(0, 80, n),
+            "quarter_of_date": rng.integers(1, 5, n),
+            "distance_between_job_and_organization": rng.gamma(2, 60, n),
+            "posting_count": rng.integers(1, 21, n).astype(float),
+            "salary_dummy": rng.random(n) < 0.3,
+            "education_level_cluster": rng.choice(
+                ["Non university degree", "University degree"], n
+            ),
+            "contract_type_label_cluster": rng.choice(
+                ["Non_Permanent", "Permanent"], n
+            ),
+            "Applicant_language_cluster": rng.choice(["German", "International"], n),
+        }
+    )
+    data["log_duration"] = (
+        3
+        + 0.001 * data["distance_between_job_and_organization"]
+        + 0.0005
+        * data["distance_between_job_and_organization"]
+        * (data["contract_type_label_cluster"] == "Permanent")
+        + 0.2 * data["salary_dummy"]
+        + 0.01 * data["organization_ID"] % 7
+        + rng.normal(0, 1, n)
+    )
+    return data
+
+
+SPECIFICATION = {
+    "dependent_variable": "log_duration",
+    "covariates": [
+        "distance_between_job_and_organization",
+        "posting_count",
+        "salary_dummy",
+        "education_level_cluster",
+        "contract_type_label_cluster",
+        "Applicant_language_cluster",
+    ],
+    "fixed_effects": ["organization_ID", "quarter_of_date"],
+    "to_categorize": [
+        "organization_ID",
+        "quarter_of_date",
+        "salary_dummy",
+        "Applicant_language_cluster",
+        "contract_type_label_cluster",
+    ],
+    "to_interact": ["distance_between_job_and_organization"],
+    "interactions": [
+        "contract_type_label_cluster",
+        "Applicant_language_cluster",
+        "education_level_cluster",
+    ],
+    "clustering": [],
+}
+
+
+def test_batch_reproduces_the_notebook_estimation(vacancies):
+    expected = notebook_fit(vacancies.copy(), SPECIFICATION)
+    # the notebook fits the batch on the data changed by data_preparation
+    data = data_preparation(vacancies.copy(), SPECIFICATION)[0]
+    result = freg.fit_specifications(data=data, specifications=[SPECIFICATION])[0]
+
+    assert sorted(result["params"].index) == sorted(expected.params.index)
+    names = list(expected.params.index)
+    assert (
+        "contract_type_label_cluster_Permanent*distance_between_job_and_organization"
+        in (names)
+    )
+    np.testing.assert_allclose(
+        result["params"][names], expected.params[names], rtol=1e-6, atol=1e-10
+    )
+    np.testing.assert_allclose(
+        result["std_errors"][names], expected.std_errors[names], rtol=1e-6
+    )
+    np.testing.assert_allclose(
+        result["pvalues"][names], expected.pvalues[names], rtol=1e-5, atol=1e-12
+    )
+    assert result["nobs"] == expected.nobs
+
+
+def test_debiased_standard_errors_are_larger(vacancies):
+    data = data_preparation(vacancies.copy(), SPECIFICATION)[0]
+    plain, debiased = [
+        freg.fit_specifications(
+            data=data, specifications=[SPECIFICATION], debiased=debiased
+        )[0]
+        for debiased in (False, True)
+    ]
+    correction = np.sqrt(plain["nobs"] / plain["df_resid"])
+    np.testing.assert_allclose(
+        debiased["std_errors"], plain["std_errors"] * correction, rtol=1e-10
+    )
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+import functions_robustness as frob
+
+EDGES = [0, 100, 200, 300]
+
+
+def robustness_base():
+    rng = np.random.default_rng(0)
+    n = 2000
+    base = pd.DataFrame(
+        {
+            "organization_location_name": rng.choice(["bonn", "köln", "berlin"], n),
+            "organization_size_label": "large",
+            "Fuzzy_Rating": 100,
+            # the last rows are further away than the last edge
+            frob.DISTANCE_COLUMN: np.r_[
+                rng.uniform(0, 300, n - 20), np.full(20, 450.0)
+            ],
+            "organization_ID": rng.integers(0, 50, n),
+            "log_duration": rng.normal(3, 1, n),
+        }
+    )
+    location_counts = base.groupby(
+        ["organization_location_name", "organization_size_label"]
+    ).size()
+    return base, location_counts
+
+
+def test_distance_bins_are_ordered_and_in_range():
+    base, location_counts = robustness_base()
+    data = frob.select_grid_point(base, location_counts, distance_bins=EDGES)
+    assert len(data) == len(base) - 20
+    bins = data["distance_bin"]
+    assert isinstance(bins.dtype, pd.CategoricalDtype)
+    assert [interval.right for interval in bins.cat.categories] == EDGES[1:]
+    assert bins.notna().all()
+
+
+def test_robustness_has_no_dummy_of_missing_bins():
+    base, location_counts = robustness_base()
+    specification = {
+        "dependent_variable": "log_duration",
+        "covariates": [frob.DISTANCE_COLUMN],
+        "fixed_effects": ["organization_ID"],
+        "to_categorize": [],
+        "interactions": [],
+        "to_interact": [],
+        "clustering": [],
+    }
+    results = frob.run_robustness(
+        base, location_counts, [specification], grid={"distance_bins": [EDGES]}
+    )
+    # the first bin is the reference, the others follow the order of the edges
+    assert results["regressor"].tolist() == [
+        "distance_bin.(100.0, 200.0]",
+        "distance_bin.(200.0, 300.0]",
+    ]
+    assert (results["nobs"] == len(base) - 20).all()
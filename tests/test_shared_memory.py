@@ -0,0 +1,32 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+import functions_shared_memory as fsm
+
+
+def test_read_rows_decodes_shared_text():
+    rng = np.random.default_rng(0)
+    rows = 3 * fsm.MAX_SENT_UNIQUES
+    titles = np.array([f"Köchin/Koch {i} – 東京" for i in range(rows)], dtype=object)
+    titles[rng.choice(rows, 50, replace=False)] = np.nan
+    data = pd.DataFrame(
+        {
+            "job_title": titles,
+            "label": pd.Series(rng.choice(["a", "b", "c"], rows)).replace("c", np.nan),
+            "category": pd.Categorical(rng.choice(["x", "y"], rows)),
+            "value": rng.random(rows),
+        },
+        index=np.arange(rows) * 2,
+    )
+    with fsm.SharedFrame(data) as shared:
+        description = shared.description()
+        # only the codes of the job titles are shared with their text, not their values
+        assert len(pickle.dumps(description)) < 10000
+        columns, blocks = fsm.attach_frame(description)
+        for start, stop in [(0, rows), (5, 17), (rows - 3, rows), (7, 7)]:
+            expected = data.iloc[start:stop].set_axis(pd.RangeIndex(start, stop))
+            pd.testing.assert_frame_equal(fsm.read_rows(columns, start, stop), expected)
+        for block in blocks:
+            block.close()
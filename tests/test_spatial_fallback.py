@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import functions_benchmark as fb
+import functions_cleaning as fc
+import functions_distance as dcf
+
+RESCUED_NAME = "Bad Steiningen Logistik Standort Süd"
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    gazetteer = fb.generate_gazetteer(100)
+    assert "Bad Steiningen" in set(gazetteer["Stadt"])
+    return gazetteer
+
+
+@pytest.fixture(scope="module")
+def cleaned(gazetteer):
+    cleaned = fc.full_dataset_cleaning(fb.generate_vacancies(2000, gazetteer))
+    # two postings of a misspelled location name, with the jobs a few km from the city
+    city = gazetteer[gazetteer["Stadt"] == "Bad Steiningen"].iloc[0]
+    extra = cleaned.iloc[:2].copy()
+    extra["organization_location_name"] = RESCUED_NAME
+    extra["location_coordinates"] = [
+        f"{city['Breitengrad'] + 0.03},{city['Längengrad']}",
+        f"{city['Breitengrad']},{city['Längengrad'] - 0.05}",
+    ]
+    extra.index = [-1, -2]
+    return pd.concat([cleaned, extra])
+
+
+def test_without_radius_the_fallback_is_not_used(gazetteer, cleaned):
+    data = dcf.create_distance_measures(
+        cleaned.copy(),
+        gazetteer.copy(),
+        dcf.USED_COLUMNS,
+        match_output_path=None,
+        spatial_fallback_km=None,
+    )[0]
+    # the stages of the pipeline without the fallback
+    state = dcf.new_distance_state(
+        data=cleaned.copy(),
+        city_gps_match_data=gazetteer.copy(),
+        used_columns=dcf.USED_COLUMNS,
+        matcher=None,
+        distance_method="vincenty",
+        cache_path=None,
+        match_output_path=None,
+        workers=1,
+        compact=True,
+        spatial_fallback_km=None,
+        min_fuzzy_rating=dcf.MIN_FUZZY_RATING,
+    )
+    for name, stage in dcf.DISTANCE_STAGES:
+        if name != "spatial_fallback":
+            stage(state)
+    pd.testing.assert_frame_equal(data, state["data"])
+    assert not data.index.isin([-1, -2]).any()
+
+
+def test_misspelled_name_is_rescued_by_a_nearby_city(gazetteer, cleaned):
+    without = dcf.create_distance_measures(
+        cleaned.copy(), gazetteer.copy(), dcf.USED_COLUMNS, match_output_path=None
+    )[0]
+    data = dcf.create_distance_measures(
+        cleaned.copy(),
+        gazetteer.copy(),
+        dcf.USED_COLUMNS,
+        match_output_path=None,
+        spatial_fallback_km=20,
+    )[0]
+    city = gazetteer[gazetteer["Stadt"] == "Bad Steiningen"].iloc[0]
+    rescued = data.loc[[-1, -2]]
+    # the coordinates are float32 in the compact dtypes
+    np.testing.assert_allclose(
+        rescued["Latitudal_coordinates_organization"], city["Breitengrad"], rtol=1e-6
+    )
+    np.testing.assert_allclose(
+        rescued["Longitudinal_coordinates_organization"], city["Längengrad"], rtol=1e-6
+    )
+    assert (rescued["Fuzzy_Rating"] == 100).all()
+    assert (rescued["distance_between_job_and_organization"] < 20).all()
+    # the rows, which were kept without the fallback, are not changed
+    pd.testing.assert_frame_equal(
+        data.loc[without.index], without, check_categorical=False
+    )
@@ -0,0 +1,40 @@
+import os
+
+import pandas as pd
+
+import functions_benchmark as fb
+import functions_cleaning as fc
+import functions_distance as dcf
+import functions_profiling as fp
+import functions_stage_cache as fsc
+
+
+def test_only_the_expensive_stages_are_stored(tmp_path):
+    gazetteer = fb.generate_gazetteer(100)
+    cleaned = fc.full_dataset_cleaning(fb.generate_vacancies(2000, gazetteer))
+    options = {
+        "city_gps_match_data": gazetteer,
+        "used_columns": dcf.USED_COLUMNS,
+        "match_output_path": None,
+    }
+    expected = dcf.create_distance_measures(data=cleaned.copy(), **options)[0]
+
+    cache = fsc.StageCache(str(tmp_path / "stages"))
+    computed = fsc.cached_distance_measures(cache=cache, data=cleaned, **options)[0]
+    stored = [name for name in os.listdir(cache.directory) if name.endswith(".pickle")]
+    assert len(stored) == len(fsc.CACHED_STAGES)
+    pd.testing.assert_frame_equal(computed, expected)
+
+    # a new cut-off of the fuzzy rating starts after the stored matching
+    stats = fp.PipelineStats()
+    loaded = fsc.cached_distance_measures(
+        cache=cache, data=cleaned, stats=stats, min_fuzzy_rating=95, **options
+    )[0]
+    names = [name for name, stage in dcf.DISTANCE_STAGES]
+    after_matching = names[names.index("match_city_names") + 1 :]
+    assert list(stats.to_frame()["step"]) == ["cached"] + after_matching
+    expected = dcf.create_distance_measures(
+        data=cleaned.copy(), min_fuzzy_rating=95, **options
+    )[0]
+    pd.testing.assert_frame_equal(loaded, expected)
+    assert len(os.listdir(cache.directory)) == len(fsc.CACHED_STAGES) + 1
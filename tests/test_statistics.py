@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+import functions_io as fio
+import functions_statistics as fs
+
+NUMERIC = ["log_duration", "distance_between_job_and_organization", "salary_dummy"]
+CATEGORIES = ["education_level_cluster", "contract_type_label_cluster"]
+
+
+def test_summary_equals_pandas(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 20000
+    data = pd.DataFrame(
+        {
+            "log_duration": rng.normal(3, 1, n),
+            "distance_between_job_and_organization": rng.gamma(1.5, 80, n),
+            "salary_dummy": rng.random(n) < 0.3,
+            "education_level_cluster": pd.Categorical(
+                rng.choice(["University degree", "Non university degree"], n)
+            ),
+            "contract_type_label_cluster": pd.Categorical(
+                rng.choice(["Permanent", "Non_Permanent", None], n, p=[0.6, 0.3, 0.1])
+            ),
+        }
+    )
+    data["log_duration"] += 0.002 * data["distance_between_job_and_organization"]
+    data.loc[data.index[::37], "log_duration"] = np.nan
+    data.loc[data.index[::53], "distance_between_job_and_organization"] = np.nan
+    path = str(tmp_path / "dataset_final.parquet")
+    fio.write_dataset(data, path)
+
+    accuracy = 0.005
+    statistics = fs.summarize_dataset(
+        path,
+        numeric_columns=NUMERIC,
+        category_columns=CATEGORIES,
+        relative_accuracy=accuracy,
+        chunksize=3000,
+    )
+    expected = data[NUMERIC].astype(float)
+
+    describe = statistics.describe()
+    moments = ["count", "mean", "std", "min", "max"]
+    pd.testing.assert_frame_equal(
+        describe.loc[moments], expected.describe().loc[moments], rtol=1e-10
+    )
+    # the estimated quartile is within the accuracy of the value at the rank
+    for column in NUMERIC:
+        exact = expected[column].quantile([0.25, 0.5, 0.75], interpolation="lower")
+        estimated = describe.loc[["25%", "50%", "75%"], column].to_numpy()
+        assert (np.abs(estimated - exact.to_numpy()) <= accuracy * exact.abs()).all()
+
+    shares = statistics.category_shares()
+    for column in CATEGORIES:
+        table = shares[shares["Column"] == column]
+        counts = data[column].value_counts()
+        assert table["Category"].tolist() == counts.index.tolist()
+        np.testing.assert_allclose(table["Relative Share"], counts / n)
+
+    pd.testing.assert_frame_equal(statistics.correlation(), expected.corr(), rtol=1e-10)
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import functions_tiles as ft
+
+project = getattr(ft, "__project")
+cell_centers = getattr(ft, "__cell_centers")
+
+# the axial offsets of the six neighbours of a hexagon
+NEIGHBOURS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, -1), (-1, 1)]
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    n = 100000
+    data = pd.DataFrame(
+        {
+            "latitudal_coordinates_job": rng.uniform(47.3, 55.0, n),
+            "longitudinal_coordinates_job": rng.uniform(5.9, 15.0, n),
+            "log_duration": rng.normal(3, 1, n),
+        }
+    )
+    data.loc[data.index[::101], "log_duration"] = np.nan
+    data.loc[data.index[::211], "latitudal_coordinates_job"] = np.nan
+    return data
+
+
+def test_points_fall_into_the_nearest_hexagon(points):
+    located = points.dropna(subset=["latitudal_coordinates_job"])
+    latitudes = located["latitudal_coordinates_job"].to_numpy()
+    longitudes = located["longitudinal_coordinates_job"].to_numpy()
+    columns, rows = ft.hex_cells(latitudes, longitudes, 10)
+    x, y = project(latitudes, longitudes, ft.REFERENCE_LATITUDE)
+    center_x, center_y = cell_centers(columns, rows, 10, "hex")
+    own = np.hypot(x - center_x, y - center_y)
+    for dq, dr in NEIGHBOURS:
+        other_x, other_y = cell_centers(columns + dq, rows + dr, 10, "hex")
+        assert (own <= np.hypot(x - other_x, y - other_y) + 1e-9).all()
+    # no point is further from its center than the corners of the hexagon
+    assert own.max() <= 10 / np.sqrt(3) + 1e-9
+
+
+def test_grid_cells_contain_their_points(points):
+    located = points.dropna(subset=["latitudal_coordinates_job"])
+    latitudes = located["latitudal_coordinates_job"].to_numpy()
+    longitudes = located["longitudinal_coordinates_job"].to_numpy()
+    columns, rows = ft.grid_cells(latitudes, longitudes, 5)
+    x, y = project(latitudes, longitudes, ft.REFERENCE_LATITUDE)
+    assert ((x >= columns * 5) & (x < (columns + 1) * 5)).all()
+    assert ((y >= rows * 5) & (y < (rows + 1) * 5)).all()
+
+
+@pytest.mark.parametrize("shape", ["hex", "grid"])
+def test_tiles_equal_groupby_and_combine_equals_one_pass(points, shape):
+    arguments = {
+        "latitude_column": "latitudal_coordinates_job",
+        "longitude_column": "longitudinal_coordinates_job",
+        "cell_km": 10,
+        "shape": shape,
+    }
+    tiles = ft.aggregate_tiles(points, **arguments)
+
+    located = points.dropna(subset=["latitudal_coordinates_job"])
+    cells = ft.hex_cells if shape == "hex" else ft.grid_cells
+    column, row = cells(
+        located["latitudal_coordinates_job"].to_numpy(),
+        located["longitudinal_coordinates_job"].to_numpy(),
+        10,
+    )
+    expected = (
+        located.assign(column=column, row=row)
+        .groupby(["column", "row"])["log_duration"]
+        .agg(["size", "count", "mean"])
+        .reset_index()
+    )
+    assert tiles["count"].sum() == len(located)
+    np.testing.assert_array_equal(tiles["column"], expected["column"])
+    np.testing.assert_array_equal(tiles["row"], expected["row"])
+    np.testing.assert_array_equal(tiles["count"], expected["size"])
+    np.testing.assert_array_equal(tiles["value_count"], expected["count"])
+    np.testing.assert_allclose(tiles["mean"], expected["mean"])
+
+    chunks = [
+        ft.aggregate_tiles(points.iloc[start : start + 30000], **arguments)
+        for start in range(0, len(points), 30000)
+    ]
+    combined = ft.combine_tiles(chunks)
+    pd.testing.assert_frame_equal(combined, tiles, check_dtype=False, rtol=1e-12)
+    assert combined.attrs == tiles.attrs
+    assert len(ft.tiles_geojson(combined)["features"]) == len(tiles)